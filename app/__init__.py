@@ -1,5 +0,0 @@
-from .api import create_app
-from .db import create_bd
-
-app = create_app()
-create_bd()
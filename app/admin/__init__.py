@@ -1,3 +1,3 @@
 from .main import create_admin
 
-admin = create_admin()
+__all__ = ['create_admin']
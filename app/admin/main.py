@@ -1,3 +1,5 @@
+from typing import Optional
+
 from flask import Flask
 from flask_admin import Admin
 from sqlalchemy.orm import scoped_session
@@ -7,11 +9,19 @@ from app.db import Session, create_bd
 from app.db.models import Movie, Review, User
 
 
-def create_admin() -> Flask:
+def create_admin(mode: Optional[str] = None) -> Flask:
+    """
+    Creates the admin app and sets up the database::
+
+        FLASK_APP='app.admin:create_admin()' flask run
+
+    :param mode: 'TESTING' for the database of the tests
+    """
+
     app = Flask(__name__)
     app.secret_key = 'super secret key'
 
-    create_bd()
+    create_bd(mode)
 
     app.config['FLASK_ADMIN_SWATCH'] = 'cerulean'
 
@@ -1,15 +1,84 @@
+from typing import Any, Optional
+
 from flask_admin.contrib.sqla import ModelView
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import Query, load_only
+from sqlalchemy.sql import Select
+
+from app.api.cache import TTLCache
+from app.config import settings
+from app.db.models import Movie, Review
+
+# numbers of rows of unfiltered lists by tables, shown by the pagers
+admin_counts = TTLCache(maxsize=16, ttl=settings.admin_count_ttl)
+
+
+class ListView(ModelView):
+    """
+    Lists load only the columns they show. Filtered lists are paged by
+    'next' links instead of counting their rows, numbers of all rows
+    are cached in ``admin_counts``
+    """
+
+    simple_list_pager = True
+    page_size = 50
+
+    def get_query(self) -> Query:
+        columns = inspect(self.model).column_attrs.keys()
+
+        return (
+            super()
+            .get_query()
+            .options(
+                load_only(
+                    *(
+                        getattr(self.model, name)
+                        for name in self.column_list or ()
+                        if name in columns
+                    )
+                )
+            )
+        )
+
+    def get_list(
+        # pylint: disable=too-many-arguments
+        # signature of ModelView.get_list
+        self,
+        page: int,
+        sort_column: Optional[str],
+        sort_desc: bool,
+        search: Optional[str],
+        filters: Any,
+        execute: bool = True,
+        page_size: Optional[int] = None,
+    ) -> tuple[Optional[int], Any]:
+        _, rows = super().get_list(
+            page, sort_column, sort_desc, search, filters, execute, page_size
+        )
 
-from app.db.models import Review
+        return None if search or filters else self.count_rows(), rows
 
+    def count_rows(self) -> int:
+        count = admin_counts.get(self.model.__tablename__)
+        if count is None:
+            count = self.session.execute(self.count_query()).scalar_one()
+            admin_counts.set(self.model.__tablename__, count)
 
-class UserView(ModelView):
+        return count
+
+    def count_query(self) -> Select:
+        return select(func.count()).select_from(self.model)
+
+
+class UserView(ListView):
     can_edit = True
     can_create = False
     can_delete = False
     can_view_details = True
 
-    column_list = ['name', 'reviews']
+    column_list = ['name', 'reviews_count']
+    column_labels = {'reviews_count': 'Reviews'}
+    column_sortable_list = ['name']
 
     form_excluded_columns = ['password', 'salt', 'name']
     form_columns = ('reviews',)
@@ -22,19 +91,53 @@ class UserView(ModelView):
         ),
     )
 
+    def get_list(self, *args: Any, **kwargs: Any) -> tuple[Optional[int], Any]:
+        """
+        Reviews of the users of the page are counted with one query
+        over the index on ``reviews.user_id``
+        """
+
+        count, users = super().get_list(*args, **kwargs)
+        if not isinstance(users, list):
+            return count, users
+
+        reviews = dict(
+            self.session.execute(
+                select(Review.user_id, func.count())
+                .filter(Review.user_id.in_([user.id for user in users]))
+                .group_by(Review.user_id)
+            ).all()
+        )
+        for user in users:
+            user.reviews_count = reviews.get(user.id, 0)
 
-class MovieModel(ModelView):
+        return count, users
+
+
+class MovieModel(ListView):
     can_create = True
     can_edit = True
 
+    # the counters of the movies are shown instead of their reviews
+    column_list = ['title', 'realise_date', 'ratings_avg', 'ratings_count']
+    column_sortable_list = ['title', 'realise_date', 'ratings_avg']
+    column_filters = ['realise_date', 'ratings_avg']
+
     form_columns = ('title',)
 
 
-class ReviewModel(ModelView):
+class ReviewModel(ListView):
     can_delete = False
     can_create = False
     can_edit = True
 
     column_list = ['comment', 'rating', 'user_id', 'movie_id']
+    column_sortable_list: list[str] = []
+    column_default_sort = ('id', True)
+    column_filters = ['movie_id', 'user_id']
 
     form_columns = ['comment']
+
+    def count_query(self) -> Select:
+        # the counters of the movies add up to the number of reviews
+        return select(func.coalesce(func.sum(Movie.ratings_count), 0))
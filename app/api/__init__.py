@@ -1,12 +1,64 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from fastapi import FastAPI
+from loguru import logger
+
+from app.config import settings
+from app.db import create_bd
+
+from .metrics import MetricsMiddleware
+from .routers import async_movies, async_users, ingest, monitoring, movies, users
+from .services import review_writer
+
+
+def create_app(async_mode: Optional[bool] = None) -> FastAPI:
+    """
+    Creates the app without touching the database, it is set up when
+    the server starts the app::
 
-from .routers import movies, users
+        uvicorn app.api:create_app --factory
 
+    :param async_mode: serve the API with async routers, by default
+        it is taken from settings
+    """
+
+    use_async = settings.async_mode if async_mode is None else async_mode
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        create_bd(async_mode=use_async)
+        if not settings.token_secret:
+            logger.warning(
+                'KINOAPP_TOKEN_SECRET is not set, tokens are accepted only by '
+                'the worker issuing them'
+            )
+        if settings.review_group_commit:
+            review_writer.start()
+
+        try:
+            yield
+        finally:
+            review_writer.stop()
 
-def create_app() -> FastAPI:
     app = FastAPI()
+    app.router.lifespan_context = lifespan
+
+    if use_async:
+        app.include_router(async_users.router)
+        app.include_router(async_movies.router)
+    else:
+        app.include_router(users.router)
+        app.include_router(movies.router)
+
+    app.include_router(ingest.router)
 
-    app.include_router(users.router)
-    app.include_router(movies.router)
+    if settings.metrics:
+        app.include_router(monitoring.router)
+        app.add_middleware(
+            MetricsMiddleware,
+            routes=app.routes,
+            add_server_timing=settings.server_timing,
+        )
 
     return app
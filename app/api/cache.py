@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Protocol
+
+
+class CacheBackend(Protocol):
+    """
+    Storage of cached values. TTLCache keeps them in the process, a shared
+    backend has to implement the same methods
+    """
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ...
+
+    def invalidate(self, key: Hashable) -> None:
+        ...
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+    @property
+    def stats(self) -> dict[str, int]:
+        ...
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache. Entries expire ``ttl`` seconds after
+    insertion, and the least recently used entry is evicted once the cache
+    holds ``maxsize`` entries
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        :param key: key of the entry
+        :return: cached value or None if it is missing or expired
+        """
+
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Removes every entry for which ``predicate(key, value)`` is true
+
+        :return: number of removed entries
+        """
+
+        with self._lock:
+            keys = [
+                key for key, (_, value) in self._data.items() if predicate(key, value)
+            ]
+            for key in keys:
+                del self._data[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+        }
+
+
+class QueryCache:
+    """
+    Results of queries kept in a backend. A result loaded while it was
+    invalidated is not stored, so a stale result can not replace a fresh one
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """
+        Number of invalidations so far, taken before a result is loaded
+        """
+
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.backend.get(key)
+
+    def set(self, key: Hashable, value: Any, generation: int) -> None:
+        """
+        :param key: key of the result
+        :param value: result
+        :param generation: generation taken before the result was loaded
+        """
+
+        with self._lock:
+            if generation == self._generation:
+                self.backend.set(key, value)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        with self._lock:
+            self._generation += 1
+
+            return self.backend.invalidate_where(predicate)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.backend.clear()
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """
+        :return: stats of the backend and the share of lookups found in it
+        """
+
+        stats: dict[str, float] = dict(self.backend.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+
+        return stats
@@ -0,0 +1,55 @@
+import json
+from hashlib import sha256
+
+from fastapi import Request, Response
+
+from app.api import streaming
+
+ETAG_HEADER = 'ETag'
+
+
+def listing_etag(request: Request, versions: dict[str, int]) -> str:
+    """
+    :param request: request of a listing
+    :param versions: versions of the data shown by the listing
+    :return: weak ETag, which changes with the data, the query
+        parameters and the media type of the listing
+    """
+
+    data = json.dumps(
+        [
+            request.url.path,
+            sorted(request.query_params.multi_items()),
+            streaming.accepts_ndjson(request),
+            sorted(versions.items()),
+        ]
+    )
+
+    return f'W/"{sha256(data.encode()).hexdigest()[:32]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    :param request: conditional request
+    :param etag: current ETag of the listing
+    :return: whether the client already has the current listing
+    """
+
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+
+    # weak comparison, as If-None-Match requires
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={ETAG_HEADER: etag})
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    response.headers[ETAG_HEADER] = etag
+
+    return response
@@ -0,0 +1,101 @@
+from dataclasses import asdict
+from datetime import date
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from fastapi import Depends, Query
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBasic,
+    HTTPBasicCredentials,
+    HTTPBearer,
+)
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api import pagination, schemas
+from app.api.exceptions import NotAuthenticated
+from app.api.services import SecurityService, TokenService
+from app.api.services.aio import AsyncSecurityService
+from app.db.utils import create_async_session, create_session
+
+security = HTTPBasic()
+# routes of signed in users take either credentials or an access token
+optional_basic = HTTPBasic(auto_error=False)
+optional_bearer = HTTPBearer(auto_error=False)
+
+
+def get_session() -> Iterator[SessionType]:
+    """
+    One session per request, services commit their changes in it
+    """
+
+    with create_session(expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_session() -> AsyncIterator[AsyncSessionType]:
+    async with create_async_session() as session:
+        yield session
+
+
+def get_current_user(
+    token: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+    credentials: Optional[HTTPBasicCredentials] = Depends(optional_basic),
+    session: SessionType = Depends(get_session),
+) -> schemas.User:
+    """
+    :return: user of the access token of the request, which is checked
+        without the database, or of the verified credentials
+    :raises InvalidToken: if the token is malformed, forged or expired
+    :raises InvalidCredentials: if the user does not exist or password is wrong
+    :raises NotAuthenticated: if the request has neither
+    """
+
+    if token is not None:
+        return TokenService.verify(token.credentials)
+
+    if credentials is None:
+        raise NotAuthenticated()
+
+    return SecurityService.authenticate_user(credentials, session)
+
+
+async def get_current_user_async(
+    token: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+    credentials: Optional[HTTPBasicCredentials] = Depends(optional_basic),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> schemas.User:
+    if token is not None:
+        return TokenService.verify(token.credentials)
+
+    if credentials is None:
+        raise NotAuthenticated()
+
+    return await AsyncSecurityService.authenticate_user(credentials, session)
+
+
+def movie_filters(
+    # pylint: disable=too-many-arguments
+    # every filter is a separate query parameter
+    top: Optional[int] = None,
+    substr: Optional[str] = None,
+    # the year and the next one must be valid dates
+    year: Optional[int] = Query(None, ge=1, le=9998),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    relevance: bool = False,
+    page: pagination.Page = Depends(),
+) -> dict[str, Any]:
+    """
+    Query parameters of movie listings, passed to ``MovieService.get_all``
+    """
+
+    return {
+        'top': top,
+        'substr': substr,
+        'year': year,
+        'date_from': date_from,
+        'date_to': date_to,
+        'relevance': relevance,
+        **asdict(page),
+    }
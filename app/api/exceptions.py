@@ -12,6 +12,15 @@ class ResourceAlreadyExists(HTTPException):
         super().__init__(status_code=409, detail=f'{entity} already exists')
 
 
+class ResourceNotFound(HTTPException):
+    """
+    Raises in case of reference to a not existing entity
+    """
+
+    def __init__(self, entity: Optional[str] = 'Resource') -> None:
+        super().__init__(status_code=404, detail=f'{entity} not found')
+
+
 class InvalidCredentials(HTTPException):
     """
     Raises in case of invalid credentials
@@ -19,3 +28,47 @@ class InvalidCredentials(HTTPException):
 
     def __init__(self) -> None:
         super().__init__(status_code=401, detail='Invalid password or name')
+
+
+class NotAuthenticated(HTTPException):
+    """
+    Raises in case of a request without credentials or a token
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=401,
+            detail='Not authenticated',
+            headers={'WWW-Authenticate': 'Basic'},
+        )
+
+
+class InvalidToken(HTTPException):
+    """
+    Raises in case of a malformed, forged or expired access token
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=401,
+            detail='Invalid or expired token',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+
+class InvalidCursor(HTTPException):
+    """
+    Raises in case of malformed pagination cursor
+    """
+
+    def __init__(self) -> None:
+        super().__init__(status_code=400, detail='Invalid cursor')
+
+
+class UnsupportedMediaType(HTTPException):
+    """
+    Raises in case of a request body in an unsupported format
+    """
+
+    def __init__(self) -> None:
+        super().__init__(status_code=415, detail='Unsupported media type')
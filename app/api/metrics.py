@@ -0,0 +1,300 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# label of requests, which match no route, so unknown paths do not add series
+UNMATCHED_ROUTE = '<unmatched>'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# key of the start of the current statement in Connection.info
+_STATEMENT_STARTED = 'metrics_statement_started'
+
+
+@dataclass
+class RequestStats:
+    """
+    Work done by the current request
+    """
+
+    statements: int = 0
+    db_seconds: float = 0.0
+    hash_seconds: float = 0.0
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    'current_stats', default=None
+)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """
+    :return: stats of the current request, None outside of requests
+    """
+
+    return _current_stats.get()
+
+
+@contextmanager
+def password_hashing() -> Iterator[None]:
+    """
+    Adds the time of the block to the password hashing of the current request
+    """
+
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        if (stats := current_stats()) is not None:
+            stats.hash_seconds += perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: Iterable[float]) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+
+        # counts of the buckets and of +Inf, and the sum, by values of labels
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        with self._lock:
+            counts, total = self._series.setdefault(
+                labels, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self, label_names: tuple[str, ...]) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+
+        with self._lock:
+            series = sorted(
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._series.items()
+            )
+
+        for labels, counts, total in series:
+            names = format_labels(zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = format_labels([*zip(label_names, labels), ('le', str(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{names} {total}')
+            lines.append(f'{self.name}_count{names} {cumulative}')
+
+        return lines
+
+
+def format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels
+    )
+
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    Per-route metrics of requests of the process
+    """
+
+    labels = ('method', 'route')
+
+    def __init__(self) -> None:
+        self.latency = Histogram(
+            'kinoapp_request_duration_seconds',
+            'Time of requests until the last byte of the response',
+            LATENCY_BUCKETS,
+        )
+        self.statements = Histogram(
+            'kinoapp_request_db_statements',
+            'SQL statements executed by requests',
+            STATEMENT_BUCKETS,
+        )
+        self.db_time = Histogram(
+            'kinoapp_request_db_seconds',
+            'Time of requests spent executing SQL statements',
+            LATENCY_BUCKETS,
+        )
+        self.hash_time = Histogram(
+            'kinoapp_request_password_hash_seconds',
+            'Time of requests spent hashing passwords',
+            LATENCY_BUCKETS,
+        )
+
+        self._responses: dict[tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        # pylint: disable=too-many-arguments
+        # labels and measurements of one request
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        stats: RequestStats,
+    ) -> None:
+        labels = (method, route)
+        self.latency.observe(labels, seconds)
+        self.statements.observe(labels, stats.statements)
+        self.db_time.observe(labels, stats.db_seconds)
+        self.hash_time.observe(labels, stats.hash_seconds)
+
+        with self._lock:
+            key = (method, route, str(status))
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def render(self, caches: Optional[Mapping[str, Mapping[str, float]]] = None) -> str:
+        """
+        :param caches: stats of caches by their names
+        :return: metrics in the Prometheus text format
+        """
+
+        lines = [
+            '# HELP kinoapp_requests_total Responses by route and status',
+            '# TYPE kinoapp_requests_total counter',
+        ]
+        with self._lock:
+            responses = sorted(self._responses.items())
+        for labels, count in responses:
+            names = format_labels(zip((*self.labels, 'status'), labels))
+            lines.append(f'kinoapp_requests_total{names} {count}')
+
+        for histogram in (self.latency, self.statements, self.db_time, self.hash_time):
+            lines.extend(histogram.render(self.labels))
+
+        lines.extend(render_caches(caches or {}))
+
+        return '\n'.join(lines) + '\n'
+
+
+def render_caches(caches: Mapping[str, Mapping[str, float]]) -> list[str]:
+    lines = []
+    for stat, kind in (
+        ('hits', 'counter'),
+        ('misses', 'counter'),
+        ('evictions', 'counter'),
+        ('size', 'gauge'),
+    ):
+        name = f'kinoapp_cache_{stat}' + ('_total' if kind == 'counter' else '')
+        lines.append(f'# TYPE {name} {kind}')
+        for cache, stats in sorted(caches.items()):
+            lines.append(f'{name}{format_labels([("cache", cache)])} {stats[stat]}')
+
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+def route_name(routes: Iterable[BaseRoute], scope: Scope) -> str:
+    """
+    :return: path template of the route of the request
+    """
+
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, 'path', UNMATCHED_ROUTE)
+
+    return UNMATCHED_ROUTE
+
+
+def server_timing(stats: RequestStats, seconds: float) -> str:
+    """
+    :return: value of the Server-Timing header, durations are in milliseconds
+    """
+
+    return (
+        f'db;dur={stats.db_seconds * 1000:.3f};desc="{stats.statements} statements", '
+        f'hash;dur={stats.hash_seconds * 1000:.3f}, '
+        f'app;dur={seconds * 1000:.3f}'
+    )
+
+
+class MetricsMiddleware:
+    """
+    Records metrics of every request in ``registry``. Work done while
+    a response is streamed is recorded too, but the Server-Timing header
+    covers only the work before the response starts
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Iterable[BaseRoute],
+        add_server_timing: bool = False,
+    ) -> None:
+        self.app = app
+        self.routes = routes
+        self.add_server_timing = add_server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = perf_counter()
+        status = 500
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if self.add_server_timing:
+                    timing = server_timing(stats, perf_counter() - started)
+                    message['headers'] = [
+                        *message.get('headers', []),
+                        (b'server-timing', timing.encode()),
+                    ]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current_stats.reset(token)
+            registry.observe(
+                scope['method'],
+                route_name(self.routes, scope),
+                status,
+                perf_counter() - started,
+                stats,
+            )
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _statement_started(conn: Any, *_: Any) -> None:
+    if current_stats() is not None:
+        conn.info[_STATEMENT_STARTED] = perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _statement_finished(conn: Any, *_: Any) -> None:
+    started = conn.info.pop(_STATEMENT_STARTED, None)
+    if started is not None and (stats := current_stats()) is not None:
+        stats.statements += 1
+        stats.db_seconds += perf_counter() - started
@@ -0,0 +1,186 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Response
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+
+from app.api.exceptions import InvalidCursor
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+# sort orders of listings and the columns of their sort keys,
+# listings by id are ascending, top listings are descending
+ORDER_BY_ID = 'id'
+ORDER_BY_TOP = 'top'
+SORT_KEYS = {
+    ORDER_BY_ID: ('id',),
+    ORDER_BY_TOP: ('ratings_avg', 'id'),
+}
+# a top returns at most top rows over all its pages, so cursors of top
+# listings also hold the number of rows served by the previous pages
+CURSOR_KEYS = {
+    ORDER_BY_ID: SORT_KEYS[ORDER_BY_ID],
+    ORDER_BY_TOP: (*SORT_KEYS[ORDER_BY_TOP], 'served'),
+}
+# json types of the values of cursors
+KEY_TYPES: dict[str, tuple[type, ...]] = {
+    'id': (int,),
+    'ratings_avg': (int, float),
+    'served': (int,),
+}
+
+
+@dataclass
+class Page:
+    """
+    Query parameters selecting a page of a listing, either by offset
+    or by the cursor of the previous page
+    """
+
+    offset: Optional[int] = None
+    limit: Optional[int] = None
+    after: Optional[str] = None
+
+
+def encode_cursor(order: str, *values: Any) -> str:
+    """
+    :param order: name of the sort order of the listing
+    :param values: sort key of the last returned row, followed by the number
+        of served rows in a top listing
+    :return: opaque cursor pointing right after the row
+    """
+
+    data = json.dumps([order, *values], separators=(',', ':')).encode()
+
+    return urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, order: str) -> list[Any]:
+    """
+    :param cursor: cursor received from a client
+    :param order: sort order of the requested listing
+    :return: sort key of the row after which the page starts, followed
+        by the number of served rows in a top listing
+    :raises InvalidCursor: if cursor is malformed, made for another order
+        or holds values of wrong types
+    """
+
+    try:
+        data = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise InvalidCursor() from e
+
+    if (
+        not isinstance(data, list)
+        or data[:1] != [order]
+        or len(data) != len(CURSOR_KEYS[order]) + 1
+    ):
+        raise InvalidCursor()
+
+    values = data[1:]
+
+    # bool is an int to isinstance, but never a value of a sort key
+    for key, value in zip(CURSOR_KEYS[order], values):
+        if isinstance(value, bool) or not isinstance(value, KEY_TYPES[key]):
+            raise InvalidCursor()
+
+    return values
+
+
+def seek(query: Select, after: str, order: str, model: Any) -> Select:
+    """
+    :param query: query of the listing, sorted by the order
+    :param after: cursor of the page
+    :param order: sort order of the listing
+    :param model: model with the columns of the sort key
+    :return: query of rows following the cursor
+    :raises InvalidCursor: if cursor is malformed, made for another order
+        or holds values of wrong types
+    """
+
+    values = decode_cursor(after, order)
+
+    if order == ORDER_BY_ID:
+        return query.filter(model.id > values[0])
+
+    key, tie_breaker = (getattr(model, column) for column in SORT_KEYS[order])
+
+    return query.filter(
+        or_(key < values[0], and_(key == values[0], tie_breaker < values[1]))
+    )
+
+
+def top_left(top: int, offset: Optional[int], after: Optional[str]) -> int:
+    """
+    :param top: number of rows of the top listing
+    :param offset: number of skipped rows
+    :param after: cursor of the page
+    :return: number of rows of the top, which the page may still return
+    :raises InvalidCursor: if cursor is malformed or made for another order
+    """
+
+    served = decode_cursor(after, ORDER_BY_TOP)[-1] if after is not None else 0
+
+    return max(top - served - (offset or 0), 0)
+
+
+def next_cursor(rows: list[Any], limit: Optional[int], order: str) -> Optional[str]:
+    """
+    :param rows: returned page
+    :param limit: requested size of the page
+    :param order: sort order of the listing
+    :return: cursor of the next page or None if the listing is exhausted
+    """
+
+    if not rows or limit is None or len(rows) < limit:
+        return None
+
+    return encode_cursor(order, *(getattr(rows[-1], key) for key in SORT_KEYS[order]))
+
+
+def next_movies_cursor(movies: list[Any], filters: dict[str, Any]) -> Optional[str]:
+    """
+    :param movies: returned page of movies
+    :param filters: filters of the listing, see ``movie_filters``
+    :return: cursor of the next page or None
+    """
+
+    top, limit = filters.get('top'), filters.get('limit')
+
+    # relevance order has no stable sort key to continue from
+    if not top and filters.get('substr') and filters.get('relevance'):
+        return None
+
+    if not top:
+        return next_cursor(movies, limit=limit, order=ORDER_BY_ID)
+
+    # the page is the last one once the rows of the top are served
+    left = top_left(top, filters.get('offset'), filters.get('after'))
+    if not movies or limit is None or len(movies) < limit or len(movies) >= left:
+        return None
+
+    last = movies[-1]
+    served = top - left + len(movies)
+
+    return encode_cursor(ORDER_BY_TOP, last.ratings_avg, last.id, served)
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    """
+    Passes cursor of the next page in the response header, so listings
+    keep returning plain lists
+    """
+
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def set_page_cursor(response: Response, rows: list[Any], page: Page) -> None:
+    """
+    Passes cursor of the page following ``rows`` of a listing ordered by id
+    """
+
+    set_next_cursor(response, next_cursor(rows, limit=page.limit, order=ORDER_BY_ID))
@@ -0,0 +1,175 @@
+from functools import partial
+from typing import Any
+
+import anyio
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+
+from app.api import conditional, pagination, responses, schemas, streaming
+from app.api.dependencies import (
+    get_async_session,
+    get_current_user_async,
+    movie_filters,
+)
+from app.api.services import (
+    RatingService,
+    ReviewService,
+    SimilarMovieService,
+    review_writer,
+)
+from app.api.services.aio import (
+    AsyncMovieService,
+    AsyncReviewService,
+    AsyncVersionService,
+)
+from app.api.services.batch import MAX_BATCH_REVIEWS
+from app.api.services.versions import CATALOG, reviews_key
+from app.config import settings
+
+router = APIRouter(prefix='/movies', tags=['movies'])
+
+
+@router.get(
+    '/',
+    response_model=list[schemas.Movie],
+    dependencies=[Depends(get_current_user_async)],
+    responses=streaming.NDJSON_RESPONSES,
+)
+async def fetch_movies(
+    request: Request,
+    filters: dict[str, Any] = Depends(movie_filters),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> Response:
+    versions = await AsyncVersionService.get([CATALOG], session)
+    etag = conditional.listing_etag(request, versions)
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+
+    if streaming.accepts_ndjson(request):
+        stream = AsyncMovieService.stream_all(**filters, session=session)
+        return conditional.set_etag(
+            streaming.ndjson_response(stream, schemas.Movie), etag
+        )
+
+    movies = await AsyncMovieService.get_rows(
+        **filters, version=versions[CATALOG], session=session
+    )
+
+    response = responses.rows_response(movies, responses.MOVIE_FORMATTERS)
+    pagination.set_next_cursor(response, pagination.next_movies_cursor(movies, filters))
+
+    return conditional.set_etag(response, etag)
+
+
+@router.post(
+    '/', response_model=schemas.Movie, dependencies=[Depends(get_current_user_async)]
+)
+async def create_movie(
+    movie: schemas.MovieCreate,
+    session: AsyncSessionType = Depends(get_async_session),
+) -> schemas.Movie:
+    movie = await AsyncMovieService.create(movie, session=session)
+
+    return schemas.Movie.from_orm(movie)
+
+
+@router.post('/{movie_id}/reviews', response_model=schemas.Review)
+async def create_movie_review(
+    movie_id: int,
+    review: schemas.ReviewCreate,
+    user: schemas.User = Depends(get_current_user_async),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> schemas.Review:
+    if review_writer.running:
+        created = await review_writer.create_async(
+            review, movie_id=movie_id, user_id=user.id
+        )
+        if created is not None:
+            return created
+
+        # the stalled writer may still commit the review, the rare fallback
+        # runs the sync service in a worker thread with its own session
+        review = await anyio.to_thread.run_sync(
+            ReviewService.create_or_get, review, movie_id, user.id
+        )
+        return schemas.Review.from_orm(review)
+
+    review = await AsyncReviewService.create(review, movie_id, user.id, session)
+
+    return schemas.Review.from_orm(review)
+
+
+@router.post('/reviews/batch', response_model=list[schemas.ReviewBatchResult])
+async def create_reviews(
+    reviews: list[schemas.ReviewBatchItem] = Body(
+        ..., min_items=1, max_items=MAX_BATCH_REVIEWS
+    ),
+    user: schemas.User = Depends(get_current_user_async),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> list[schemas.ReviewBatchResult]:
+    return await AsyncReviewService.create_many(
+        reviews, user_id=user.id, session=session
+    )
+
+
+@router.get(
+    '/{movie_id}/reviews',
+    response_model=list[schemas.Review],
+    dependencies=[Depends(get_current_user_async)],
+    responses=streaming.NDJSON_RESPONSES,
+)
+async def get_movie_reviews(
+    movie_id: int,
+    request: Request,
+    page: pagination.Page = Depends(),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> Response:
+    versions = await AsyncVersionService.get([reviews_key(movie_id)], session)
+    etag = conditional.listing_etag(request, versions)
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+
+    if streaming.accepts_ndjson(request):
+        stream = AsyncReviewService.stream_by_movie_id(movie_id, page, session=session)
+        return conditional.set_etag(
+            streaming.ndjson_response(stream, schemas.Review), etag
+        )
+
+    reviews = await AsyncReviewService.get_rows_by_movie_id(
+        movie_id, page, session=session
+    )
+
+    response = responses.rows_response(reviews)
+    pagination.set_page_cursor(response, reviews, page)
+
+    return conditional.set_etag(response, etag)
+
+
+@router.get(
+    '/{movie_id}/ratings',
+    response_model=schemas.RatingHistogram,
+    dependencies=[Depends(get_current_user_async)],
+)
+async def get_movie_ratings(
+    movie_id: int, session: AsyncSessionType = Depends(get_async_session)
+) -> schemas.RatingHistogram:
+    # the sync session of the async one shares the histogram logic
+    return await session.run_sync(
+        lambda sync_session: RatingService.get_histogram(movie_id, sync_session)
+    )
+
+
+@router.get(
+    '/{movie_id}/similar',
+    response_model=list[schemas.SimilarMovie],
+    dependencies=[Depends(get_current_user_async)],
+)
+async def get_similar_movies(
+    movie_id: int,
+    limit: int = Query(10, ge=1, le=settings.similar_movies_top_k),
+) -> list[schemas.SimilarMovie]:
+    # AsyncSession.run_sync runs on the event loop, so the index is computed
+    # by NumPy in a worker thread, which opens its own sync session
+    return await anyio.to_thread.run_sync(
+        partial(SimilarMovieService.get_similar, movie_id, limit=limit)
+    )
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Response
+from fastapi.security import HTTPBasicCredentials
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+
+from app.api import pagination, schemas
+from app.api.dependencies import get_async_session, get_current_user_async, security
+from app.api.services import TokenService
+from app.api.services.aio import AsyncSecurityService, AsyncUserService
+
+router = APIRouter(prefix='/users', tags=['users'])
+
+
+@router.get(
+    '/',
+    response_model=list[schemas.User],
+    dependencies=[Depends(get_current_user_async)],
+)
+async def fetch_users(
+    response: Response,
+    page: pagination.Page = Depends(),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> list[schemas.User]:
+    users = await AsyncUserService.get_all(page, session=session)
+
+    pagination.set_page_cursor(response, users, page)
+
+    return [schemas.User.from_orm(user) for user in users]
+
+
+@router.post('/', response_model=schemas.User)
+async def create_user(
+    user: schemas.UserCreate, session: AsyncSessionType = Depends(get_async_session)
+) -> schemas.User:
+    user = await AsyncUserService.create(user, session=session)
+
+    return schemas.User.from_orm(user)
+
+
+@router.post('/token', response_model=schemas.Token)
+async def create_token(
+    credentials: HTTPBasicCredentials = Depends(security),
+    session: AsyncSessionType = Depends(get_async_session),
+) -> schemas.Token:
+    user = await AsyncSecurityService.authenticate_user(credentials, session)
+
+    return TokenService.create(user)
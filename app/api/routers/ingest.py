@@ -0,0 +1,73 @@
+from typing import AsyncIterator, Iterator
+
+import anyio
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.api import schemas
+from app.api.dependencies import get_current_user
+from app.api.exceptions import UnsupportedMediaType
+from app.api.services import IngestService
+from app.api.services.ingest import BATCH_SIZE, CSV, MAX_BATCH_SIZE, NDJSON
+
+router = APIRouter(
+    prefix='/movies',
+    tags=['movies'],
+)
+
+MEDIA_TYPES = {'application/x-ndjson': NDJSON, 'text/csv': CSV}
+
+
+@router.post(
+    '/bulk',
+    response_model=schemas.IngestReport,
+    dependencies=[Depends(get_current_user)],
+)
+async def import_movies(
+    request: Request, batch_size: int = Query(BATCH_SIZE, gt=0, le=MAX_BATCH_SIZE)
+) -> schemas.IngestReport:
+    """
+    Imports movies and reviews from NDJSON or CSV body, rows with a rating
+    are reviews of the movie with the title by the user with the name
+    """
+
+    media_type = request.headers.get('content-type', 'application/x-ndjson')
+    media_type = media_type.split(';')[0].strip()
+    if media_type not in MEDIA_TYPES:
+        raise UnsupportedMediaType()
+
+    # the body is read while it is imported, not loaded into memory at once
+    return await anyio.to_thread.run_sync(
+        IngestService.import_lines,
+        body_lines(request.stream()),
+        MEDIA_TYPES[media_type],
+        batch_size,
+    )
+
+
+def body_lines(stream: AsyncIterator[bytes]) -> Iterator[str]:
+    """
+    Reads lines of the request body from a worker thread
+
+    :param stream: chunks of the body, ``Request.stream()``
+    :return: lines of the body
+    """
+
+    async def next_chunk() -> bytes:
+        # pylint: disable=unnecessary-dunder-call
+        # the anext builtin needs Python 3.10
+        return await stream.__anext__()
+
+    buffer = b''
+
+    while True:
+        try:
+            chunk = anyio.from_thread.run(next_chunk)
+        except StopAsyncIteration:
+            break
+
+        *lines, buffer = (buffer + chunk).split(b'\n')
+        for line in lines:
+            yield line.decode(errors='replace') + '\n'
+
+    if buffer:
+        yield buffer.decode(errors='replace')
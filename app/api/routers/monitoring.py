@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response
+
+from app.api.metrics import PROMETHEUS_MEDIA_TYPE, registry
+from app.api.services import credentials_cache, movie_queries
+
+router = APIRouter(tags=['metrics'])
+
+
+@router.get('/metrics', include_in_schema=False)
+def get_metrics() -> Response:
+    """
+    Metrics of requests and caches in the Prometheus text format
+    """
+
+    content = registry.render(
+        caches={'credentials': credentials_cache.stats, 'movies': movie_queries.stats}
+    )
+
+    return Response(content, media_type=PROMETHEUS_MEDIA_TYPE)
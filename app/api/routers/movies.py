@@ -1,46 +1,68 @@
-from typing import Optional
-
-from fastapi import APIRouter, Depends
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-
-from app.api import schemas
-from app.api.services import MovieService, ReviewService, SecurityService, UserService
+from typing import Any
+
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api import conditional, pagination, responses, schemas, streaming
+from app.api.dependencies import get_current_user, get_session, movie_filters
+from app.api.services import (
+    MovieService,
+    RatingService,
+    ReviewBatchService,
+    ReviewService,
+    SimilarMovieService,
+    VersionService,
+    review_writer,
+)
+from app.api.services.batch import MAX_BATCH_REVIEWS
+from app.api.services.versions import CATALOG, reviews_key
+from app.config import settings
 
 router = APIRouter(
     prefix='/movies',
     tags=['movies'],
 )
 
-security = HTTPBasic()
 
-
-@router.get('/', response_model=list[schemas.Movie])
+@router.get(
+    '/',
+    response_model=list[schemas.Movie],
+    responses=streaming.NDJSON_RESPONSES,
+    dependencies=[Depends(get_current_user)],
+)
 def fetch_movies(
-    # pylint: disable=too-many-arguments
-    # task requires 5 filters
-    top: Optional[int] = None,
-    substr: Optional[str] = None,
-    year: Optional[int] = None,
-    offset: Optional[int] = None,
-    limit: Optional[int] = None,
-    credentials: HTTPBasicCredentials = Depends(security),
-) -> list[schemas.Movie]:
-    SecurityService.authenticate_user(credentials)
-
-    movies = MovieService.get_all(
-        year=year, substr=substr, offset=offset, limit=limit, top=top
+    request: Request,
+    filters: dict[str, Any] = Depends(movie_filters),
+    session: SessionType = Depends(get_session),
+) -> Response:
+    versions = VersionService.get([CATALOG], session)
+    etag = conditional.listing_etag(request, versions)
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+
+    if streaming.accepts_ndjson(request):
+        stream = MovieService.stream_all(**filters, session=session)
+        return conditional.set_etag(
+            streaming.ndjson_response(stream, schemas.Movie), etag
+        )
+
+    movies = MovieService.get_rows(
+        **filters, version=versions[CATALOG], session=session
     )
 
-    return [schemas.Movie.from_orm(movie) for movie in movies]
+    response = responses.rows_response(movies, responses.MOVIE_FORMATTERS)
+    pagination.set_next_cursor(response, pagination.next_movies_cursor(movies, filters))
 
+    return conditional.set_etag(response, etag)
 
-@router.post('/', response_model=schemas.Movie)
+
+@router.post(
+    '/', response_model=schemas.Movie, dependencies=[Depends(get_current_user)]
+)
 def create_movie(
-    movie: schemas.MovieCreate, credentials: HTTPBasicCredentials = Depends(security)
+    movie: schemas.MovieCreate, session: SessionType = Depends(get_session)
 ) -> schemas.Movie:
-    SecurityService.authenticate_user(credentials)
-
-    movie = MovieService.create(movie)
+    movie = MovieService.create(movie, session=session)
 
     return schemas.Movie.from_orm(movie)
 
@@ -49,28 +71,106 @@ def create_movie(
 def create_movie_review(
     movie_id: int,
     review: schemas.ReviewCreate,
-    credentials: HTTPBasicCredentials = Depends(security),
+    user: schemas.User = Depends(get_current_user),
+    session: SessionType = Depends(get_session),
 ) -> schemas.Review:
-    SecurityService.authenticate_user(credentials)
-
-    user = UserService.find_by_name(credentials.username)
-
-    review = ReviewService.create(review=review, movie_id=movie_id, user_id=user.id)
+    if review_writer.running:
+        created = review_writer.create(review, movie_id=movie_id, user_id=user.id)
+        if created is not None:
+            return created
+
+        # the stalled writer may still commit the review
+        review = ReviewService.create_or_get(
+            review=review, movie_id=movie_id, user_id=user.id, session=session
+        )
+        return schemas.Review.from_orm(review)
+
+    review = ReviewService.create(
+        review=review, movie_id=movie_id, user_id=user.id, session=session
+    )
 
     return schemas.Review.from_orm(review)
 
 
-@router.get('/{movie_id}/reviews', response_model=list[schemas.Review])
+@router.post('/reviews/batch', response_model=list[schemas.ReviewBatchResult])
+def create_reviews(
+    reviews: list[schemas.ReviewBatchItem] = Body(
+        ..., min_items=1, max_items=MAX_BATCH_REVIEWS
+    ),
+    user: schemas.User = Depends(get_current_user),
+    session: SessionType = Depends(get_session),
+) -> list[schemas.ReviewBatchResult]:
+    """
+    Creates reviews of the user on several movies at once, every review
+    gets its own result: 201, 404 if the movie does not exist or 409 if
+    it is already reviewed
+    """
+
+    return ReviewBatchService.create_many(reviews, user_id=user.id, session=session)
+
+
+@router.get(
+    '/{movie_id}/reviews',
+    response_model=list[schemas.Review],
+    responses=streaming.NDJSON_RESPONSES,
+    dependencies=[Depends(get_current_user)],
+)
 def get_movie_reviews(
     movie_id: int,
-    offset: Optional[int] = None,
-    limit: Optional[int] = None,
-    credentials: HTTPBasicCredentials = Depends(security),
-) -> list[schemas.Review]:
-    SecurityService.authenticate_user(credentials)
-
-    reviews = ReviewService.get_by_movie_id(
-        movie_id=movie_id, offset=offset, limit=limit
+    request: Request,
+    page: pagination.Page = Depends(),
+    session: SessionType = Depends(get_session),
+) -> Response:
+    versions = VersionService.get([reviews_key(movie_id)], session)
+    etag = conditional.listing_etag(request, versions)
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+
+    if streaming.accepts_ndjson(request):
+        stream = ReviewService.stream_by_movie_id(
+            movie_id=movie_id,
+            offset=page.offset,
+            limit=page.limit,
+            after=page.after,
+            session=session,
+        )
+        return conditional.set_etag(
+            streaming.ndjson_response(stream, schemas.Review), etag
+        )
+
+    reviews = ReviewService.get_rows_by_movie_id(
+        movie_id=movie_id,
+        offset=page.offset,
+        limit=page.limit,
+        after=page.after,
+        session=session,
     )
 
-    return [schemas.Review.from_orm(rev) for rev in reviews]
+    response = responses.rows_response(reviews)
+    pagination.set_page_cursor(response, reviews, page)
+
+    return conditional.set_etag(response, etag)
+
+
+@router.get(
+    '/{movie_id}/ratings',
+    response_model=schemas.RatingHistogram,
+    dependencies=[Depends(get_current_user)],
+)
+def get_movie_ratings(
+    movie_id: int, session: SessionType = Depends(get_session)
+) -> schemas.RatingHistogram:
+    return RatingService.get_histogram(movie_id, session=session)
+
+
+@router.get(
+    '/{movie_id}/similar',
+    response_model=list[schemas.SimilarMovie],
+    dependencies=[Depends(get_current_user)],
+)
+def get_similar_movies(
+    movie_id: int,
+    limit: int = Query(10, ge=1, le=settings.similar_movies_top_k),
+    session: SessionType = Depends(get_session),
+) -> list[schemas.SimilarMovie]:
+    return SimilarMovieService.get_similar(movie_id, limit=limit, session=session)
@@ -1,34 +1,56 @@
-from typing import Optional
+from fastapi import APIRouter, Depends, Response
+from fastapi.security import HTTPBasicCredentials
+from sqlalchemy.orm.session import Session as SessionType
 
-from fastapi import APIRouter, Depends
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-
-from app.api import schemas
-from app.api.services import SecurityService, UserService
+from app.api import pagination, schemas
+from app.api.dependencies import get_current_user, get_session, security
+from app.api.services import SecurityService, TokenService, UserService
 
 router = APIRouter(
     prefix='/users',
     tags=['users'],
 )
 
-security = HTTPBasic()
-
 
-@router.get('/', response_model=list[schemas.User])
+@router.get(
+    '/',
+    response_model=list[schemas.User],
+    dependencies=[Depends(get_current_user)],
+)
 def fetch_users(
-    offset: Optional[int] = None,
-    limit: Optional[int] = None,
-    credentials: HTTPBasicCredentials = Depends(security),
+    response: Response,
+    page: pagination.Page = Depends(),
+    session: SessionType = Depends(get_session),
 ) -> list[schemas.User]:
-    SecurityService.authenticate_user(credentials)
+    users = UserService.get_all(
+        offset=page.offset, limit=page.limit, after=page.after, session=session
+    )
 
-    users = UserService.get_all(offset=offset, limit=limit)
+    pagination.set_page_cursor(response, users, page)
 
     return [schemas.User.from_orm(user) for user in users]
 
 
 @router.post('/', response_model=schemas.User)
-def create_user(user: schemas.UserCreate) -> schemas.User:
-    user = UserService.create(user)
+def create_user(
+    user: schemas.UserCreate, session: SessionType = Depends(get_session)
+) -> schemas.User:
+    user = UserService.create(user, session=session)
 
     return schemas.User.from_orm(user)
+
+
+@router.post('/token', response_model=schemas.Token)
+def create_token(
+    credentials: HTTPBasicCredentials = Depends(security),
+    session: SessionType = Depends(get_session),
+) -> schemas.Token:
+    """
+    Exchanges credentials for an access token, which is sent as
+    ``Authorization: Bearer <token>`` instead of the credentials,
+    so the password is hashed once per token rather than per request
+    """
+
+    user = SecurityService.authenticate_user(credentials, session)
+
+    return TokenService.create(user)
@@ -1,7 +1,14 @@
 from datetime import date
+from typing import Optional
 
 from pydantic import BaseModel, validator
 
+MAX_RATING = 10
+
+
+def format_rating(value: float) -> str:
+    return str(round(float(value), 1))
+
 
 class ReviewBase(BaseModel):
     rating: int
@@ -9,8 +16,8 @@ class ReviewBase(BaseModel):
 
     @validator('rating')
     def range_rating(cls, v: int) -> int:
-        if v < 0 or v > 10:
-            raise ValueError('rating must be from 0 to 10')
+        if v < 0 or v > MAX_RATING:
+            raise ValueError(f'rating must be from 0 to {MAX_RATING}')
         return v
 
 
@@ -27,6 +34,23 @@ class ReviewCreate(ReviewBase):
     pass
 
 
+class ReviewBatchItem(ReviewBase):
+    movie_id: int
+
+
+class ReviewBatchResult(BaseModel):
+    # HTTP status of the item: 201, 404 or 409
+    status: int
+    detail: Optional[str] = None
+    review: Optional[Review] = None
+
+
+class ReviewImport(ReviewBase):
+    title: str
+    user: str
+    comment: str = ''
+
+
 class UserBase(BaseModel):
     name: str
 
@@ -42,6 +66,13 @@ class User(UserBase):
         orm_mode = True
 
 
+class Token(BaseModel):
+    access_token: str
+    token_type: str = 'bearer'
+    # seconds the token is valid
+    expires_in: int
+
+
 class MovieBase(BaseModel):
     title: str
 
@@ -50,6 +81,10 @@ class MovieCreate(MovieBase):
     pass
 
 
+class MovieImport(MovieBase):
+    realise_date: Optional[date] = None
+
+
 class Movie(MovieBase):
     id: int
     realise_date: date
@@ -57,9 +92,35 @@ class Movie(MovieBase):
     ratings_count: int
     comments_count: int
 
+    @validator('ratings_avg', pre=True)
+    def format_ratings_avg(cls, v: float) -> str:
+        return format_rating(v)
+
     class Config:
         orm_mode = True
 
 
 class MovieReviews(Movie):
     reviews: list[Review]
+
+
+class SimilarMovie(Movie):
+    # cosine similarity of the ratings of the movies, from 0 to 1
+    similarity: float
+
+
+class RatingHistogram(BaseModel):
+    movie_id: int
+    # numbers of reviews by ratings from 0 to MAX_RATING
+    counts: list[int]
+    total: int
+
+
+class IngestReport(BaseModel):
+    rows: int = 0
+    movies: int = 0
+    reviews: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
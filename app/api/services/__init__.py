@@ -0,0 +1,28 @@
+from .batch import ReviewBatchService
+from .ingest import IngestService
+from .movie_cache import movie_queries
+from .movies import MovieService
+from .ratings import RatingService
+from .reviews import ReviewService
+from .similar import SimilarMovieService, similar_movies
+from .tokens import TokenService
+from .users import SecurityService, UserService, credentials_cache
+from .versions import VersionService
+from .writer import review_writer
+
+__all__ = [
+    'IngestService',
+    'MovieService',
+    'RatingService',
+    'ReviewBatchService',
+    'ReviewService',
+    'SecurityService',
+    'SimilarMovieService',
+    'TokenService',
+    'UserService',
+    'VersionService',
+    'credentials_cache',
+    'movie_queries',
+    'review_writer',
+    'similar_movies',
+]
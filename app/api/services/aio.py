@@ -0,0 +1,296 @@
+import asyncio
+import contextvars
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from fastapi.security import HTTPBasicCredentials
+from loguru import logger
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+
+from app.api import pagination, schemas
+from app.api.exceptions import InvalidCredentials, ResourceAlreadyExists
+from app.api.services.batch import ReviewBatchService
+from app.api.services.movie_cache import listing_key, movie_queries
+from app.api.services.movies import MOVIE_COLUMNS, MovieService, detached_movie
+from app.api.services.reviews import REVIEW_COLUMNS, ReviewService, unique_reviews
+from app.api.services.users import SecurityService, UserService, credentials_cache
+from app.api.services.versions import CATALOG, VersionService
+from app.api.streaming import STREAM_BATCH_SIZE
+from app.config import settings
+from app.db import models, search
+from app.db.utils import use_async_session
+
+# pbkdf2 releases the GIL, so hashing in threads keeps the event loop free
+hash_executor = ThreadPoolExecutor(
+    max_workers=settings.hash_workers, thread_name_prefix='hash'
+)
+
+
+class AsyncUserService:
+    @staticmethod
+    async def get_all(
+        page: pagination.Page, session: Optional[AsyncSessionType] = None
+    ) -> list[models.User]:
+        async with use_async_session(session) as db_session:
+            result = await db_session.execute(
+                UserService.select_all(page.offset, page.limit, page.after)
+            )
+
+            return result.scalars().all()
+
+    @staticmethod
+    async def find_by_name(
+        name: str, session: Optional[AsyncSessionType] = None
+    ) -> Optional[models.User]:
+        async with use_async_session(session) as db_session:
+            result = await db_session.execute(UserService.select_by_name(name))
+
+            return result.scalar()
+
+    @staticmethod
+    async def create(
+        user: schemas.UserCreate, session: Optional[AsyncSessionType] = None
+    ) -> models.User:
+        """
+        :raises ResourceAlreadyExists: if user already exists
+        """
+
+        async with use_async_session(session) as db_session:
+            if await AsyncUserService.find_by_name(user.name, db_session):
+                raise ResourceAlreadyExists(entity='user')
+
+            salt = SecurityService.generate_random_string()
+            hashed_password = await AsyncSecurityService.hash_password(
+                user.password, salt
+            )
+
+            user = models.User(name=user.name, password=hashed_password, salt=salt)
+
+            db_session.add(user)
+            await db_session.commit()
+
+        return UserService.created(user)
+
+
+class AsyncMovieService:
+    @staticmethod
+    async def get_all(
+        session: Optional[AsyncSessionType] = None, **filters: Any
+    ) -> list[models.Movie]:
+        """
+        :param session: session of the request, a new one is opened if not given
+        :param filters: filters of MovieService.get_all
+        :return: list of detached movies, only MOVIE_COLUMNS are loaded
+        """
+
+        rows = await AsyncMovieService.get_rows(session=session, **filters)
+
+        return [detached_movie(row) for row in rows]
+
+    @staticmethod
+    async def get_rows(
+        session: Optional[AsyncSessionType] = None,
+        version: Optional[int] = None,
+        **filters: Any,
+    ) -> list[Row]:
+        async with use_async_session(session) as db_session:
+            if version is None:
+                versions = await AsyncVersionService.get([CATALOG], db_session)
+                version = versions[CATALOG]
+
+            key = listing_key(version, **filters)
+            if (cached := movie_queries.get(key)) is not None:
+                return list(cached)
+
+            generation = movie_queries.generation
+            statement = MovieService.select_all(
+                **filters,
+                title_search=search.title_search_available(db_session.bind.sync_engine),
+            ).with_only_columns(*MOVIE_COLUMNS)
+            result = await db_session.execute(statement)
+            rows = result.all()
+
+        movie_queries.set(key, tuple(rows), generation)
+
+        return rows
+
+    @staticmethod
+    async def stream_all(
+        session: Optional[AsyncSessionType] = None, **filters: Any
+    ) -> AsyncIterator[models.Movie]:
+        async with use_async_session(session) as db_session:
+            statement = MovieService.select_all(
+                **filters,
+                title_search=search.title_search_available(db_session.bind.sync_engine),
+            ).execution_options(yield_per=STREAM_BATCH_SIZE)
+            result = await db_session.stream(statement)
+
+            async for movie in result.scalars():
+                yield movie
+
+    @staticmethod
+    async def create(
+        movie: schemas.MovieCreate, session: Optional[AsyncSessionType] = None
+    ) -> models.Movie:
+        """
+        :raises ResourceAlreadyExists: if movie already exists
+        """
+
+        async with use_async_session(session) as db_session:
+            result = await db_session.execute(MovieService.select_by_title(movie.title))
+            if result.scalar():
+                raise ResourceAlreadyExists(entity='movie')
+
+            movie = models.Movie(title=movie.title)
+            db_session.add(movie)
+            await db_session.commit()
+
+        logger.info(f'{movie} was created')
+        return movie
+
+
+class AsyncReviewService:
+    @staticmethod
+    async def create(
+        review: schemas.ReviewCreate,
+        movie_id: int,
+        user_id: int,
+        session: Optional[AsyncSessionType] = None,
+    ) -> models.Review:
+        """
+        :raises ResourceAlreadyExists: if the movie has already been reviewed by a user.
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        with unique_reviews():
+            async with use_async_session(session) as db_session:
+                # the sync session of the async one shares the review logic
+                created_review = await db_session.run_sync(
+                    ReviewService.add, review, movie_id, user_id
+                )
+                await db_session.commit()
+
+        logger.info(f'{created_review} was created')
+        return created_review
+
+    @staticmethod
+    async def create_many(
+        reviews: list[schemas.ReviewBatchItem],
+        user_id: int,
+        session: Optional[AsyncSessionType] = None,
+    ) -> list[schemas.ReviewBatchResult]:
+        """
+        :raises ResourceAlreadyExists: if a review of the batch was created
+            concurrently, nothing is created then
+        """
+
+        with unique_reviews():
+            async with use_async_session(session) as db_session:
+                results = await db_session.run_sync(
+                    ReviewBatchService.add_many, reviews, user_id
+                )
+                await db_session.commit()
+
+        logger.info(f'{len(reviews)} reviews of user-id={user_id} were processed')
+        return results
+
+    @staticmethod
+    async def get_by_movie_id(
+        movie_id: int,
+        page: pagination.Page,
+        session: Optional[AsyncSessionType] = None,
+    ) -> list[models.Review]:
+        async with use_async_session(session) as db_session:
+            result = await db_session.execute(
+                ReviewService.select_by_movie_id(
+                    movie_id, page.offset, page.limit, page.after
+                )
+            )
+
+            return result.scalars().all()
+
+    @staticmethod
+    async def get_rows_by_movie_id(
+        movie_id: int,
+        page: pagination.Page,
+        session: Optional[AsyncSessionType] = None,
+    ) -> list[Row]:
+        async with use_async_session(session) as db_session:
+            result = await db_session.execute(
+                ReviewService.select_by_movie_id(
+                    movie_id, page.offset, page.limit, page.after
+                ).with_only_columns(*REVIEW_COLUMNS)
+            )
+
+            return result.all()
+
+    @staticmethod
+    async def stream_by_movie_id(
+        movie_id: int,
+        page: pagination.Page,
+        session: Optional[AsyncSessionType] = None,
+    ) -> AsyncIterator[models.Review]:
+        async with use_async_session(session) as db_session:
+            statement = ReviewService.select_by_movie_id(
+                movie_id, page.offset, page.limit, page.after
+            ).execution_options(yield_per=STREAM_BATCH_SIZE)
+            result = await db_session.stream(statement)
+
+            async for review in result.scalars():
+                yield review
+
+
+class AsyncVersionService:
+    @staticmethod
+    async def get(
+        keys: Iterable[str], session: Optional[AsyncSessionType] = None
+    ) -> dict[str, int]:
+        keys = list(keys)
+        async with use_async_session(session) as db_session:
+            result = await db_session.execute(VersionService.select(keys))
+            versions = dict(result.all())
+
+        return {key: versions.get(key, 0) for key in keys}
+
+
+class AsyncSecurityService:
+    @staticmethod
+    async def authenticate_user(
+        credentials: HTTPBasicCredentials, session: Optional[AsyncSessionType] = None
+    ) -> schemas.User:
+        """
+        Same as SecurityService.authenticate_user, but the password is hashed
+        in ``hash_executor``
+
+        :return: authenticated user
+        :raises InvalidCredentials: if the user does not exist or password is wrong
+        """
+
+        key = SecurityService.credentials_digest(credentials)
+
+        if (cached_user := credentials_cache.get(key)) is not None:
+            return cached_user
+
+        user = await AsyncUserService.find_by_name(credentials.username, session)
+
+        if not user or not secrets.compare_digest(
+            user.password,
+            await AsyncSecurityService.hash_password(credentials.password, user.salt),
+        ):
+            raise InvalidCredentials()
+
+        logger.info(f'{user} passed authentication')
+
+        return SecurityService.remember_user(key, user)
+
+    @staticmethod
+    async def hash_password(password: str, salt: str) -> str:
+        loop = asyncio.get_running_loop()
+        # the executor does not copy the context, metrics of the request live in it
+        context = contextvars.copy_context()
+
+        return await loop.run_in_executor(
+            hash_executor, context.run, SecurityService.hash_password, password, salt
+        )
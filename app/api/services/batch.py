@@ -0,0 +1,157 @@
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import insert, select
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api import schemas
+from app.api.services.movie_cache import mark_changed_movies
+from app.api.services.pending_ratings import mark_new_ratings
+from app.api.services.ratings import RatingService
+from app.api.services.reviews import REVIEW_COLUMNS, unique_reviews
+from app.api.services.versions import CATALOG, VersionService, reviews_key
+from app.db import models
+from app.db.utils import use_session
+
+# reviews of a batch are looked up with one bound variable per review
+MAX_BATCH_REVIEWS = 1000
+
+
+class ReviewBatchService:
+    @staticmethod
+    def create_many(
+        reviews: list[schemas.ReviewBatchItem],
+        user_id: int,
+        session: Optional[SessionType] = None,
+    ) -> list[schemas.ReviewBatchResult]:
+        """
+        Creates reviews of the user on several movies in one transaction
+
+        :param reviews: reviews with ids of the movies, at most MAX_BATCH_REVIEWS
+        :param user_id: id of reviewer
+        :param session: session of the request, a new one is opened if not given
+        :return: results of the reviews in their order
+        :raises ResourceAlreadyExists: if a review of the batch was created
+            concurrently, nothing is created then
+        """
+
+        with unique_reviews(), use_session(session) as db_session:
+            results = ReviewBatchService.add_many(db_session, reviews, user_id)
+            db_session.commit()
+
+        logger.info(f'{len(reviews)} reviews of user-id={user_id} were processed')
+        return results
+
+    @staticmethod
+    def add_many(
+        session: SessionType, reviews: list[schemas.ReviewBatchItem], user_id: int
+    ) -> list[schemas.ReviewBatchResult]:
+        """
+        Adds new reviews of existing movies. Missing movies and already
+        reviewed ones are found with one query each, the first review
+        of a movie in the batch wins
+
+        :param session: session of the transaction, which creates the reviews
+        :return: results of the reviews in their order
+        """
+
+        movie_ids = {review.movie_id for review in reviews}
+        movies = set(
+            session.execute(
+                select(models.Movie.id).filter(models.Movie.id.in_(movie_ids))
+            ).scalars()
+        )
+        reviewed = set(
+            session.execute(
+                select(models.Review.movie_id).filter(
+                    models.Review.user_id == user_id,
+                    models.Review.movie_id.in_(movies),
+                )
+            ).scalars()
+        )
+
+        new: dict[int, schemas.ReviewBatchItem] = {}
+        for review in reviews:
+            if review.movie_id in movies and review.movie_id not in reviewed:
+                new.setdefault(review.movie_id, review)
+
+        ReviewBatchService.insert_many(
+            session,
+            [{**review.dict(), 'user_id': user_id} for review in new.values()],
+        )
+        created = {
+            row.movie_id: schemas.Review.from_orm(row)
+            for row in session.execute(
+                select(*REVIEW_COLUMNS).filter(
+                    models.Review.user_id == user_id,
+                    models.Review.movie_id.in_(new),
+                )
+            )
+        }
+
+        return [
+            batch_result(review, new, created.get(review.movie_id), movies)
+            for review in reviews
+        ]
+
+    @staticmethod
+    def insert_many(session: SessionType, rows: list[dict[str, Any]]) -> None:
+        """
+        Inserts reviews with one INSERT and adds their ratings to the movie
+        counters with one UPDATE per movie and to the histograms with one upsert
+
+        :param session: session of the transaction, which creates the reviews
+        :param rows: values of the reviews, their movies must exist
+        """
+
+        if not rows:
+            return
+
+        session.execute(insert(models.Review), rows)
+
+        ratings: dict[int, list[int]] = defaultdict(list)
+        for row in rows:
+            ratings[row['movie_id']].append(row['rating'])
+
+        for movie_id, movie_ratings in ratings.items():
+            RatingService.add_counters(
+                session,
+                movie_id=movie_id,
+                ratings_sum=sum(movie_ratings),
+                ratings_count=len(movie_ratings),
+            )
+        RatingService.add(
+            session, Counter((row['movie_id'], row['rating']) for row in rows)
+        )
+        mark_new_ratings(
+            session, [(row['user_id'], row['movie_id'], row['rating']) for row in rows]
+        )
+
+        # the reviews are not flushed by the ORM, so its hooks do not see them
+        VersionService.bump(
+            session, [CATALOG, *(reviews_key(movie_id) for movie_id in ratings)]
+        )
+        mark_changed_movies(session, ratings)
+
+
+def batch_result(
+    review: schemas.ReviewBatchItem,
+    new: dict[int, schemas.ReviewBatchItem],
+    created: Optional[schemas.Review],
+    movies: set[int],
+) -> schemas.ReviewBatchResult:
+    """
+    :param review: review of the batch
+    :param new: inserted reviews by ids of their movies
+    :param created: inserted review of the movie
+    :param movies: ids of the existing movies of the batch
+    """
+
+    if review.movie_id not in movies:
+        return schemas.ReviewBatchResult(status=404, detail='movie not found')
+
+    if new.get(review.movie_id) is not review or created is None:
+        return schemas.ReviewBatchResult(status=409, detail='review already exists')
+
+    return schemas.ReviewBatchResult(status=201, review=created)
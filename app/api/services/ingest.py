@@ -0,0 +1,234 @@
+import csv
+import json
+from itertools import islice
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api import schemas
+from app.api.services.batch import ReviewBatchService
+from app.api.services.movie_cache import mark_changed_movies
+from app.api.services.versions import CATALOG, VersionService
+from app.db import models
+from app.db.utils import use_session
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+BATCH_SIZE = 2000
+# existing reviews of a batch are looked up with two bound variables per
+# review and SQLite allows 32766 in a statement, the bound leaves a margin
+MAX_BATCH_SIZE = 5000
+
+ImportRow = Union[schemas.MovieImport, schemas.ReviewImport]
+
+
+class IngestService:
+    @staticmethod
+    def import_lines(
+        lines: Iterable[str],
+        fmt: str = NDJSON,
+        batch_size: int = BATCH_SIZE,
+        session: Optional[SessionType] = None,
+    ) -> schemas.IngestReport:
+        """
+        Imports movies and reviews. Lines are read lazily and every batch
+        is written in one transaction, duplicates are skipped
+
+        :param lines: lines of NDJSON or CSV, rows with a rating are reviews
+        :param fmt: format of the lines, ndjson or csv
+        :param batch_size: number of rows written in one transaction
+        :param session: session of the import, a new one is opened if not given
+        :return: counts of imported and skipped rows
+        """
+
+        report = schemas.IngestReport()
+        started = perf_counter()
+
+        rows = IngestService.read_rows(lines, fmt)
+        with use_session(session) as db_session:
+            while batch := list(islice(rows, batch_size)):
+                IngestService.import_batch(db_session, batch, report)
+                db_session.commit()
+
+        report.seconds = perf_counter() - started
+        if report.seconds:
+            report.rows_per_second = report.rows / report.seconds
+
+        logger.info(f'imported {report}')
+
+        return report
+
+    @staticmethod
+    def read_rows(lines: Iterable[str], fmt: str = NDJSON) -> Iterator[Any]:
+        """
+        :param lines: lines of NDJSON or CSV with a header
+        :param fmt: format of the lines, ndjson or csv
+        :return: parsed rows, a malformed NDJSON line is returned as None
+        """
+
+        if fmt == CSV:
+            for row in csv.DictReader(lines):
+                # empty cells are missing values
+                yield {key: value for key, value in row.items() if value}
+            return
+
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+    @staticmethod
+    def parse_row(row: Any) -> Optional[ImportRow]:
+        """
+        :param row: parsed line
+        :return: movie or review to import, None if the row is invalid
+        """
+
+        if not isinstance(row, dict):
+            return None
+
+        try:
+            if 'rating' in row:
+                return schemas.ReviewImport.parse_obj(row)
+            return schemas.MovieImport.parse_obj(row)
+        except ValidationError:
+            return None
+
+    @staticmethod
+    def import_batch(
+        session: SessionType, batch: list[Any], report: schemas.IngestReport
+    ) -> None:
+        """
+        Writes a batch of rows with one INSERT of movies, one INSERT of reviews
+        and one UPDATE of ratings per reviewed movie
+
+        :param session: session of the transaction
+        :param batch: parsed rows
+        :param report: counters updated with the results of the batch
+        """
+
+        movies: dict[str, schemas.MovieImport] = {}
+        reviews: list[schemas.ReviewImport] = []
+
+        for row in map(IngestService.parse_row, batch):
+            if row is None:
+                report.invalid += 1
+            elif isinstance(row, schemas.ReviewImport):
+                reviews.append(row)
+            elif row.title in movies:
+                report.duplicates += 1
+            else:
+                movies[row.title] = row
+
+        report.rows += len(batch)
+
+        # movies go first, so reviews can refer to movies of the same batch
+        IngestService.insert_movies(session, movies, report)
+        IngestService.insert_reviews(session, reviews, report)
+
+    @staticmethod
+    def insert_movies(
+        session: SessionType,
+        movies: dict[str, schemas.MovieImport],
+        report: schemas.IngestReport,
+    ) -> None:
+        if not movies:
+            return
+
+        existing = set(
+            session.execute(
+                select(models.Movie.title).filter(models.Movie.title.in_(movies))
+            ).scalars()
+        )
+        default_date = models.Movie.realise_date.default.arg
+
+        values = [
+            {'title': title, 'realise_date': movie.realise_date or default_date}
+            for title, movie in movies.items()
+            if title not in existing
+        ]
+        if values:
+            session.execute(insert(models.Movie), values)
+
+        report.movies += len(values)
+        report.duplicates += len(existing)
+
+        if values:
+            VersionService.bump(session, [CATALOG])
+            mark_changed_movies(session, created=True)
+
+    @staticmethod
+    def insert_reviews(
+        session: SessionType,
+        reviews: list[schemas.ReviewImport],
+        report: schemas.IngestReport,
+    ) -> None:
+        if not reviews:
+            return
+
+        movie_ids = dict(
+            session.execute(
+                select(models.Movie.title, models.Movie.id).filter(
+                    models.Movie.title.in_({review.title for review in reviews})
+                )
+            ).all()
+        )
+        user_ids = dict(
+            session.execute(
+                select(models.User.name, models.User.id).filter(
+                    models.User.name.in_({review.user for review in reviews})
+                )
+            ).all()
+        )
+
+        resolved: dict[tuple[int, int], schemas.ReviewImport] = {}
+        for review in reviews:
+            movie_id = movie_ids.get(review.title)
+            user_id = user_ids.get(review.user)
+            if movie_id is None or user_id is None:
+                report.invalid += 1
+            elif (movie_id, user_id) in resolved:
+                report.duplicates += 1
+            else:
+                resolved[movie_id, user_id] = review
+
+        existing: set[tuple[int, int]] = set()
+        if resolved:
+            existing = set(
+                (row.movie_id, row.user_id)
+                for row in session.execute(
+                    select(models.Review.movie_id, models.Review.user_id).filter(
+                        tuple_(models.Review.movie_id, models.Review.user_id).in_(
+                            list(resolved)
+                        )
+                    )
+                )
+            )
+
+        values = []
+        for (movie_id, user_id), review in resolved.items():
+            if (movie_id, user_id) in existing:
+                continue
+
+            values.append(
+                {
+                    'movie_id': movie_id,
+                    'user_id': user_id,
+                    'rating': review.rating,
+                    'comment': review.comment,
+                }
+            )
+
+        ReviewBatchService.insert_many(session, values)
+
+        report.reviews += len(values)
+        report.duplicates += len(existing)
@@ -0,0 +1,122 @@
+from itertools import chain
+from typing import Any, Iterable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api.cache import QueryCache, TTLCache
+from app.config import settings
+from app.db import models
+
+# rows of listings by listing_key and rows of movies by movie_key, keys hold
+# the version of CATALOG, so changes committed by other processes are not
+# served from the cache of this one
+movie_queries = QueryCache(
+    TTLCache(maxsize=settings.movies_cache_size, ttl=settings.movies_cache_ttl)
+)
+
+LISTING = 'movies'
+MOVIE = 'movie'
+
+# filters, which select nothing when they are falsy
+_FALSY_FILTERS = ('year', 'substr', 'top', 'relevance', 'date_from', 'date_to')
+
+# key of changes of movies in session.info, see mark_changed_movies
+_MOVIE_CHANGES = 'movie_changes'
+
+
+def listing_key(
+    version: int, **filters: Any
+) -> tuple[str, tuple[tuple[str, Any], ...], int]:
+    """
+    :param version: version of CATALOG the listing is loaded for
+    :param filters: filters of MovieService.get_all
+    :return: key of the listing, equal for filters selecting the same movies
+    """
+
+    # relevance orders only the results of a title search without top
+    if not filters.get('substr') or filters.get('top'):
+        filters['relevance'] = False
+
+    params = tuple(
+        sorted(
+            (name, value)
+            for name, value in filters.items()
+            if value is not None and (value or name not in _FALSY_FILTERS)
+        )
+    )
+
+    return LISTING, params, version
+
+
+def movie_key(movie_id: int, version: int) -> tuple[str, int, int]:
+    """
+    :param movie_id: id of the movie
+    :param version: version of CATALOG the movie is loaded for
+    """
+
+    return MOVIE, movie_id, version
+
+
+def invalidate_movies(movie_ids: Iterable[int] = (), created: bool = False) -> int:
+    """
+    Drops cached results, which show the movies
+
+    :param movie_ids: ids of the movies, whose ratings changed
+    :param created: whether movies were created or their filtered columns
+        changed, so they may appear in any listing
+    :return: number of dropped results
+    """
+
+    movie_ids = set(movie_ids)
+
+    def stale(key: Any, value: Any) -> bool:
+        kind, params, _ = key
+        if kind == MOVIE:
+            return params in movie_ids
+        if created:
+            return True
+
+        # a movie may enter a top by its new rating
+        return 'top' in dict(params) or any(row.id in movie_ids for row in value)
+
+    return movie_queries.invalidate_where(stale)
+
+
+def mark_changed_movies(
+    session: SessionType, movie_ids: Iterable[int] = (), created: bool = False
+) -> None:
+    """
+    Remembers movies changed in the transaction of the session, their
+    cached results are dropped once it is committed
+
+    :param session: session of the transaction
+    :param movie_ids: ids of the movies, whose ratings changed
+    :param created: see invalidate_movies
+    """
+
+    changes = session.info.setdefault(_MOVIE_CHANGES, {'ids': set(), 'created': False})
+    changes['ids'].update(movie_ids)
+    changes['created'] = changes['created'] or created
+
+
+@event.listens_for(SessionType, 'after_flush')
+def _mark_flushed_movies(session: SessionType, _flush_context: Any) -> None:
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, models.Movie):
+            mark_changed_movies(session, [instance.id], created=True)
+        elif isinstance(instance, models.Review):
+            # a review moved to another movie changes both of them
+            history = inspect(instance).attrs.movie_id.history
+            mark_changed_movies(session, [instance.movie_id, *history.deleted])
+
+
+@event.listens_for(SessionType, 'after_commit')
+def _invalidate_committed_movies(session: SessionType) -> None:
+    if changes := session.info.pop(_MOVIE_CHANGES, None):
+        invalidate_movies(changes['ids'], created=changes['created'])
+
+
+@event.listens_for(SessionType, 'after_rollback')
+def _forget_rolled_back_movies(session: SessionType) -> None:
+    session.info.pop(_MOVIE_CHANGES, None)
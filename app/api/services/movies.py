@@ -0,0 +1,300 @@
+from datetime import date
+from typing import Any, Iterator, Optional
+
+from loguru import logger
+from sqlalchemy import desc, func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import load_only, make_transient_to_detached, raiseload
+from sqlalchemy.orm.session import Session as SessionType
+from sqlalchemy.sql import Select
+
+from app.api import pagination, schemas
+from app.api.exceptions import ResourceAlreadyExists
+from app.api.services.movie_cache import listing_key, movie_key, movie_queries
+from app.api.services.versions import CATALOG, VersionService
+from app.api.streaming import STREAM_BATCH_SIZE
+from app.db import models, search
+from app.db.utils import use_session
+
+# columns serialized by schemas.Movie
+MOVIE_COLUMNS = (
+    models.Movie.id,
+    models.Movie.title,
+    models.Movie.realise_date,
+    models.Movie.ratings_avg,
+    models.Movie.ratings_count,
+    models.Movie.comments_count,
+)
+
+
+class MovieService:
+    @staticmethod
+    def get_all(
+        # pylint: disable=too-many-arguments
+        # every filter is a separate query parameter
+        year: Optional[int] = None,
+        substr: Optional[str] = None,
+        top: Optional[int] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        relevance: bool = False,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        after: Optional[str] = None,
+        session: Optional[SessionType] = None,
+    ) -> list[models.Movie]:
+        """
+        :param top: filter for a top movies by average rating
+        :param substr: filter by substring in title
+        :param relevance: order movies found by substr from the best match
+        :param year: filter by year of realise
+        :param date_from: filter by realise date, inclusive
+        :param date_to: filter by realise date, exclusive
+        :param after: cursor of the page, movies are ordered by id or
+            from the best rated if top is set
+        :param offset: number of skipped elements
+        :param limit: max number of returned elements
+        :param session: session of the request, a new one is opened if not given
+        :return: list of detached movies, only MOVIE_COLUMNS are loaded
+        """
+
+        rows = MovieService.get_rows(
+            year=year,
+            substr=substr,
+            top=top,
+            offset=offset,
+            limit=limit,
+            relevance=relevance,
+            date_from=date_from,
+            date_to=date_to,
+            after=after,
+            session=session,
+        )
+
+        return [detached_movie(row) for row in rows]
+
+    @staticmethod
+    def get_rows(
+        session: Optional[SessionType] = None,
+        version: Optional[int] = None,
+        **filters: Any,
+    ) -> list[Row]:
+        """
+        Same as MovieService.get_all, but movies are returned as rows
+        of MOVIE_COLUMNS, without building ORM entities. Rows are cached
+        in ``movie_queries`` under the version of CATALOG
+
+        :param session: session of the request, a new one is opened if not given
+        :param version: version of CATALOG, which the caller already read,
+            it is loaded if not given
+        :param filters: filters of MovieService.get_all
+        :return: list of rows
+        """
+
+        with use_session(session) as db_session:
+            if version is None:
+                version = VersionService.get([CATALOG], db_session)[CATALOG]
+
+            key = listing_key(version, **filters)
+            if (cached := movie_queries.get(key)) is not None:
+                return list(cached)
+
+            generation = movie_queries.generation
+            statement = MovieService.select_all(
+                **filters,
+                title_search=search.title_search_available(db_session.get_bind()),
+            ).with_only_columns(*MOVIE_COLUMNS)
+            rows = db_session.execute(statement).all()
+
+        movie_queries.set(key, tuple(rows), generation)
+
+        return rows
+
+    @staticmethod
+    def stream_all(
+        session: Optional[SessionType] = None, **filters: Any
+    ) -> Iterator[models.Movie]:
+        """
+        Same as MovieService.get_all, but movies are fetched in batches
+        while they are iterated
+
+        :param session: session of the request, a new one is opened if not given
+        :param filters: filters of MovieService.get_all
+        :return: iterator of movies
+        """
+
+        with use_session(session) as db_session:
+            statement = MovieService.select_all(
+                **filters,
+                title_search=search.title_search_available(db_session.get_bind()),
+            ).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+            yield from db_session.execute(statement).scalars()
+
+    @staticmethod
+    def select_all(
+        # pylint: disable=too-many-arguments
+        year: Optional[int] = None,
+        substr: Optional[str] = None,
+        top: Optional[int] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        relevance: bool = False,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        after: Optional[str] = None,
+        title_search: bool = False,
+    ) -> Select:
+        """
+        Builds the query of MovieService.get_all
+
+        :param title_search: whether the FTS5 index of titles can be used
+        """
+
+        movies = select(models.Movie).options(load_only(*MOVIE_COLUMNS), raiseload('*'))
+        # plain comparisons on realise_date, so the index can be used
+        if year:
+            movies = movies.filter(
+                models.Movie.realise_date >= date(year, 1, 1),
+                models.Movie.realise_date < date(year + 1, 1, 1),
+            )
+        if date_from:
+            movies = movies.filter(models.Movie.realise_date >= date_from)
+        if date_to:
+            movies = movies.filter(models.Movie.realise_date < date_to)
+        if substr:
+            movies = MovieService._search_title(
+                movies,
+                substr=substr,
+                relevance=relevance and not top,
+                title_search=title_search,
+            )
+
+        if after is not None:
+            order = pagination.ORDER_BY_TOP if top else pagination.ORDER_BY_ID
+            movies = pagination.seek(movies, after, order, models.Movie)
+
+        if top:
+            movies = movies.order_by(
+                desc(models.Movie.ratings_avg), desc(models.Movie.id)
+            )
+            left = pagination.top_left(top, offset, after)
+            limit = left if limit is None else min(limit, left)
+        elif not (substr and relevance):
+            movies = movies.order_by(models.Movie.id)
+
+        if limit is not None:
+            movies = movies.limit(limit)
+
+        if offset is not None:
+            movies = movies.offset(offset)
+
+        return movies
+
+    @staticmethod
+    def _search_title(
+        query: Select, substr: str, relevance: bool = False, title_search: bool = False
+    ) -> Select:
+        """
+        Filters movies by substring in title. The FTS5 trigram index is used
+        when it is available, otherwise titles are scanned with LIKE
+
+        :param query: query of movies
+        :param substr: searched substring
+        :param relevance: order movies from the best match
+        :param title_search: whether the FTS5 index of titles can be used
+        :return: filtered query
+        """
+
+        if title_search and len(substr) >= search.MIN_QUERY_LENGTH:
+            query = query.join(
+                search.movies_fts, search.movies_fts.c.rowid == models.Movie.id
+            ).filter(search.movies_fts.c.title.op('MATCH')(search.match_phrase(substr)))
+
+            return query.order_by(search.movies_fts.c.rank) if relevance else query
+
+        query = query.filter(models.Movie.title.contains(substr))
+
+        # without the index, shorter titles are considered closer matches
+        return query.order_by(func.length(models.Movie.title)) if relevance else query
+
+    @staticmethod
+    def create(
+        movie: schemas.MovieCreate, session: Optional[SessionType] = None
+    ) -> models.Movie:
+        """
+        :param movie: entity of MovieCreate schema
+        :param session: session of the request, a new one is opened if not given
+        :return: created movie
+        """
+
+        with use_session(session) as db_session:
+            if MovieService.find_by_title(movie.title, db_session):
+                raise ResourceAlreadyExists(entity='movie')
+
+            movie = models.Movie(title=movie.title)
+            db_session.add(movie)
+            db_session.commit()
+
+        logger.info(f'{movie} was created')
+        return movie
+
+    @staticmethod
+    def find_by_title(
+        title: str, session: Optional[SessionType] = None
+    ) -> Optional[models.Movie]:
+        """
+        :param title: title of searching movie
+        :param session: session of the request, a new one is opened if not given
+        :return: movie
+        """
+
+        with use_session(session) as db_session:
+            movie = db_session.execute(MovieService.select_by_title(title)).scalar()
+
+        return movie
+
+    @staticmethod
+    def select_by_title(title: str) -> Select:
+        return select(models.Movie).filter(models.Movie.title == title).limit(1)
+
+    @staticmethod
+    def find_by_id(
+        movie_id: int, session: Optional[SessionType] = None
+    ) -> Optional[models.Movie]:
+        """
+        :param movie_id: id of searching movie
+        :param session: session of the request, a new one is opened if not given
+        :return: detached movie, its row is cached in ``movie_queries`` under
+            the version of CATALOG
+        """
+
+        with use_session(session) as db_session:
+            version = VersionService.get([CATALOG], db_session)[CATALOG]
+            key = movie_key(movie_id, version)
+            if (row := movie_queries.get(key)) is None:
+                generation = movie_queries.generation
+                row = db_session.execute(MovieService.select_by_id(movie_id)).first()
+                if row is None:
+                    return None
+
+                movie_queries.set(key, row, generation)
+
+        return detached_movie(row)
+
+    @staticmethod
+    def select_by_id(movie_id: int) -> Select:
+        return select(models.Movie.__table__).filter(models.Movie.id == movie_id)
+
+
+def detached_movie(row: Row) -> models.Movie:
+    """
+    :param row: columns of a movie
+    :return: new detached entity of the movie, so cached rows are never
+        shared by sessions, other columns raise DetachedInstanceError
+    """
+
+    movie = models.Movie(**row._mapping)  # pylint: disable=protected-access
+    make_transient_to_detached(movie)
+
+    return movie
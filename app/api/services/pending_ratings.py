@@ -0,0 +1,79 @@
+import threading
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.config import settings
+
+# key of ratings of reviews created in session.info, see mark_new_ratings
+_NEW_RATINGS = 'new_ratings'
+
+# (user_id, movie_id, rating) of reviews
+Rating = tuple[int, int, int]
+
+
+class PendingRatings:
+    """
+    Ratings of committed reviews, which are not in the index of similar
+    movies yet. Folding in many ratings is slower than rebuilding the index,
+    so past ``limit`` ratings they are dropped and a rebuild is requested
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+
+        self._ratings: list[Rating] = []
+        self._overflow = False
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return self._overflow or bool(self._ratings)
+
+    def add(self, ratings: Iterable[Rating]) -> None:
+        with self._lock:
+            if self._overflow:
+                return
+
+            self._ratings.extend(ratings)
+            if len(self._ratings) > self.limit:
+                self._ratings = []
+                self._overflow = True
+
+    def take(self) -> Optional[list[Rating]]:
+        """
+        :return: the pending ratings, None if there were more than ``limit``
+            of them and the index must be rebuilt
+        """
+
+        with self._lock:
+            ratings, overflow = self._ratings, self._overflow
+            self._ratings, self._overflow = [], False
+
+        return None if overflow else ratings
+
+    def clear(self) -> None:
+        self.take()
+
+
+pending_ratings = PendingRatings(limit=settings.similar_movies_fold_in_limit)
+
+
+def mark_new_ratings(session: SessionType, ratings: Iterable[Rating]) -> None:
+    """
+    Remembers ratings of reviews created in the transaction of the session,
+    they are added to ``pending_ratings`` once it is committed
+    """
+
+    session.info.setdefault(_NEW_RATINGS, []).extend(ratings)
+
+
+@event.listens_for(SessionType, 'after_commit')
+def _add_committed_ratings(session: SessionType) -> None:
+    if ratings := session.info.pop(_NEW_RATINGS, None):
+        pending_ratings.add(ratings)
+
+
+@event.listens_for(SessionType, 'after_rollback')
+def _forget_rolled_back_ratings(session: SessionType, *_: Any) -> None:
+    session.info.pop(_NEW_RATINGS, None)
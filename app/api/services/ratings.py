@@ -0,0 +1,136 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import Float, cast, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm.session import Session as SessionType
+from sqlalchemy.sql import Select, Update
+
+from app.api import schemas
+from app.api.exceptions import ResourceNotFound
+from app.api.services.movies import MovieService
+from app.db import models
+from app.db.migrations import count_ratings
+from app.db.utils import upsert, use_session
+
+
+class RatingService:
+    @staticmethod
+    def get_histogram(
+        movie_id: int, session: Optional[SessionType] = None
+    ) -> schemas.RatingHistogram:
+        """
+        :param movie_id: id of the movie
+        :param session: session of the request, a new one is opened if not given
+        :return: numbers of reviews of the movie by ratings
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        with use_session(session) as db_session:
+            rows = db_session.execute(RatingService.select_counts(movie_id)).all()
+
+            if not rows and MovieService.find_by_id(movie_id, db_session) is None:
+                raise ResourceNotFound(entity='movie')
+
+        return histogram(movie_id, rows)
+
+    @staticmethod
+    def select_counts(movie_id: int) -> Select:
+        return select(models.RatingCount.rating, models.RatingCount.count).filter(
+            models.RatingCount.movie_id == movie_id
+        )
+
+    @staticmethod
+    def add(session: SessionType, ratings: Counter[tuple[int, int]]) -> None:
+        """
+        Adds new reviews to the histograms with one statement
+
+        :param session: session of the transaction, which creates the reviews
+        :param ratings: numbers of the new reviews by (movie_id, rating)
+        """
+
+        if not ratings:
+            return
+
+        counts = models.RatingCount
+        session.execute(
+            upsert(
+                counts,
+                [
+                    {'movie_id': movie_id, 'rating': rating, 'count': count}
+                    for (movie_id, rating), count in sorted(ratings.items())
+                ],
+                index_elements=[counts.movie_id, counts.rating],
+                set_=lambda new: {'count': counts.count + new['count']},
+                dialect=session.get_bind().dialect.name,
+            )
+        )
+
+    @staticmethod
+    def add_counters(
+        session: SessionType, movie_id: int, ratings_sum: int, ratings_count: int = 1
+    ) -> bool:
+        """
+        Adds reviews to the movie counters with a single UPDATE, so concurrent
+        reviews of the same movie can not overwrite each other
+
+        :param session: session of the transaction, which creates the reviews
+        :param movie_id: id of the reviewed movie
+        :param ratings_sum: sum of ratings of the new reviews
+        :param ratings_count: number of the new reviews
+        :return: whether the movie exists
+        """
+
+        statement = RatingService.update_counters(movie_id, ratings_sum, ratings_count)
+
+        return bool(session.execute(statement).rowcount)
+
+    @staticmethod
+    def update_counters(
+        movie_id: int, ratings_sum: int, ratings_count: int = 1
+    ) -> Update:
+        movie = models.Movie
+
+        return (
+            update(movie)
+            .where(movie.id == movie_id)
+            .values(
+                {
+                    movie.ratings_sum: movie.ratings_sum + ratings_sum,
+                    movie.ratings_count: movie.ratings_count + ratings_count,
+                    movie.comments_count: movie.comments_count + ratings_count,
+                    # SET expressions see the values from before the update
+                    movie.ratings_avg: func.round(
+                        cast(movie.ratings_sum + ratings_sum, Float)
+                        / (movie.ratings_count + ratings_count),
+                        1,
+                    ),
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def rebuild(
+        movie_ids: Optional[Iterable[int]] = None,
+        session: Optional[SessionType] = None,
+    ) -> None:
+        """
+        Counts histograms from the reviews again, which fixes them after
+        reviews were changed or deleted bypassing the services
+
+        :param movie_ids: ids of the movies, all movies by default
+        :param session: session of the request, a new one is opened if not given
+        """
+
+        with use_session(session) as db_session:
+            count_ratings(db_session.connection(), movie_ids)
+            db_session.commit()
+
+
+def histogram(movie_id: int, rows: Iterable[Row]) -> schemas.RatingHistogram:
+    counts = [0] * (schemas.MAX_RATING + 1)
+    for rating, count in rows:
+        counts[rating] = count
+
+    return schemas.RatingHistogram(movie_id=movie_id, counts=counts, total=sum(counts))
@@ -0,0 +1,253 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from loguru import logger
+from sqlalchemy import exists, select
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.session import Session as SessionType
+from sqlalchemy.sql import Select
+
+from app.api import pagination, schemas
+from app.api.exceptions import ResourceAlreadyExists, ResourceNotFound
+from app.api.services.pending_ratings import mark_new_ratings
+from app.api.services.ratings import RatingService
+from app.api.streaming import STREAM_BATCH_SIZE
+from app.db import models
+from app.db.utils import use_session
+
+# columns serialized by schemas.Review
+REVIEW_COLUMNS = (
+    models.Review.id,
+    models.Review.rating,
+    models.Review.comment,
+    models.Review.user_id,
+    models.Review.movie_id,
+)
+
+
+class ReviewService:
+    @staticmethod
+    def create(
+        review: schemas.ReviewCreate,
+        movie_id: int,
+        user_id: int,
+        session: Optional[SessionType] = None,
+    ) -> models.Review:
+        """
+        Creates a review on the specified movie. Also, this function updates some movie parameters:
+        count of ratings, count of comments, the sum of all ratings, and the average rating
+
+        :param review: entity of ReviewCreate schema
+        :param movie_id: id of the movie being reviewed
+        :param user_id: id of reviewer
+        :param session: session of the request, a new one is opened if not given
+        :return: created review
+        :raises ResourceAlreadyExists: if the movie has already been reviewed by a user.
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        with unique_reviews(), use_session(session) as db_session:
+            review = ReviewService.add(db_session, review, movie_id, user_id)
+            db_session.commit()
+
+        logger.info(f'{review} was created')
+        return review
+
+    @staticmethod
+    def create_or_get(
+        review: schemas.ReviewCreate,
+        movie_id: int,
+        user_id: int,
+        session: Optional[SessionType] = None,
+    ) -> models.Review:
+        """
+        Same as ReviewService.create, but an equal review of the user
+        is returned instead of a conflict. A stalled ``review_writer``
+        may commit the review of the caller after it gave up waiting
+
+        :raises ResourceAlreadyExists: if the movie has been reviewed
+            by the user otherwise
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        try:
+            return ReviewService.create(review, movie_id, user_id, session)
+        except ResourceAlreadyExists:
+            with use_session(session) as db_session:
+                existing = db_session.execute(
+                    select(models.Review).filter(
+                        models.Review.movie_id == movie_id,
+                        models.Review.user_id == user_id,
+                    )
+                ).scalar()
+
+            submitted = review.dict()
+            if existing is None or submitted != {
+                name: getattr(existing, name) for name in submitted
+            }:
+                raise
+
+        logger.info(f'{existing} was already created')
+        return existing
+
+    @staticmethod
+    def add(
+        session: SessionType, review: schemas.ReviewCreate, movie_id: int, user_id: int
+    ) -> models.Review:
+        """
+        Adds the review to the session and its rating to the movie counters
+        and to the histogram of the movie
+
+        :param session: session of the transaction, which creates the review
+        :return: added review
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        review = models.Review(**review.dict(), movie_id=movie_id, user_id=user_id)
+        session.add(review)
+        session.flush()
+
+        if not RatingService.add_counters(
+            session, movie_id=movie_id, ratings_sum=review.rating
+        ):
+            raise ResourceNotFound(entity='movie')
+
+        RatingService.add(session, Counter([(movie_id, review.rating)]))
+        mark_new_ratings(session, [(user_id, movie_id, review.rating)])
+
+        return review
+
+    @staticmethod
+    def get_by_movie_id(
+        movie_id: int,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        session: Optional[SessionType] = None,
+    ) -> list[models.Review]:
+        """
+        :param offset: number of skipped elements
+        :param limit: max number of returned elements
+        :param after: cursor of the page, reviews are ordered by id
+        :param movie_id: id of the movie
+        :param session: session of the request, a new one is opened if not given
+        :return: list of reviews on the specified movie
+        """
+        with use_session(session) as db_session:
+            statement = ReviewService.select_by_movie_id(movie_id, offset, limit, after)
+            reviews = db_session.execute(statement).scalars().all()
+
+        return reviews
+
+    @staticmethod
+    def get_rows_by_movie_id(
+        movie_id: int,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        session: Optional[SessionType] = None,
+    ) -> list[Row]:
+        """
+        Same as ReviewService.get_by_movie_id, but reviews are returned
+        as rows of REVIEW_COLUMNS, without building ORM entities
+        """
+
+        with use_session(session) as db_session:
+            statement = ReviewService.select_by_movie_id(
+                movie_id, offset, limit, after
+            ).with_only_columns(*REVIEW_COLUMNS)
+            rows = db_session.execute(statement).all()
+
+        return rows
+
+    @staticmethod
+    def stream_by_movie_id(
+        movie_id: int,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        session: Optional[SessionType] = None,
+    ) -> Iterator[models.Review]:
+        """
+        Same as ReviewService.get_by_movie_id, but reviews are fetched
+        in batches while they are iterated
+
+        :param movie_id: id of the movie
+        :param offset: number of skipped elements
+        :param limit: max number of returned elements
+        :param after: cursor of the page, reviews are ordered by id
+        :param session: session of the request, a new one is opened if not given
+        :return: iterator of reviews on the specified movie
+        """
+
+        with use_session(session) as db_session:
+            statement = ReviewService.select_by_movie_id(
+                movie_id, offset, limit, after
+            ).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+            yield from db_session.execute(statement).scalars()
+
+    @staticmethod
+    def select_by_movie_id(
+        movie_id: int,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Select:
+        reviews = (
+            select(models.Review)
+            .options(raiseload('*'))
+            .filter(models.Review.movie_id == movie_id)
+            .order_by(models.Review.id)
+        )
+
+        if after is not None:
+            reviews = pagination.seek(
+                reviews, after, pagination.ORDER_BY_ID, models.Review
+            )
+
+        if limit is not None:
+            reviews = reviews.limit(limit)
+
+        if offset is not None:
+            reviews = reviews.offset(offset)
+
+        return reviews
+
+    @staticmethod
+    def movie_reviewed_by_user(
+        movie_id: int, user_id: int, session: Optional[SessionType] = None
+    ) -> bool:
+        """
+        :param movie_id: id of the movie
+        :param user_id: id of the user
+        :param session: session of the request, a new one is opened if not given
+        :return: whether the user has already reviewed the movie
+        """
+
+        with use_session(session) as db_session:
+            reviewed = db_session.query(
+                exists().where(
+                    models.Review.movie_id == movie_id,
+                    models.Review.user_id == user_id,
+                )
+            ).scalar()
+
+        return reviewed
+
+
+@contextmanager
+def unique_reviews() -> Iterator[None]:
+    """
+    Duplicates are rejected by the unique index on (movie_id, user_id)
+
+    :raises ResourceAlreadyExists: if the movie has already been reviewed by the user
+    """
+
+    try:
+        yield
+    except IntegrityError as e:
+        raise ResourceAlreadyExists(entity='review') from e
@@ -0,0 +1,150 @@
+import threading
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api import schemas
+from app.api.exceptions import ResourceNotFound
+from app.api.services.movies import MovieService
+from app.api.services.pending_ratings import PendingRatings, Rating, pending_ratings
+from app.api.streaming import STREAM_BATCH_SIZE
+from app.config import settings
+from app.db import models
+from app.db.utils import use_session
+
+if TYPE_CHECKING:
+    from app.api.services.similar_index import Neighbours, SimilarityIndex
+
+
+class SimilarMovies:
+    """
+    Keeps the index of similar movies up to date. New reviews are folded in
+    before the next lookup, the index is rebuilt from all reviews every
+    ``rebuild_interval`` seconds or when more reviews are pending than
+    folding in handles fast. Updates replace the index, so lookups read it
+    without locks and are answered from the previous index meanwhile
+    """
+
+    def __init__(
+        self, top_k: int, rebuild_interval: float, pending: PendingRatings
+    ) -> None:
+        self.top_k = top_k
+        self.rebuild_interval = rebuild_interval
+        self.pending = pending
+
+        self._index: Optional['SimilarityIndex'] = None
+        # serializes rebuilds and fold-ins
+        self._updating = threading.Lock()
+
+    @property
+    def stale(self) -> bool:
+        return (
+            self._index is None
+            or monotonic() - self._index.built_at > self.rebuild_interval
+        )
+
+    def refresh(self, load: Callable[[], Iterable[Sequence[Rating]]]) -> None:
+        """
+        Rebuilds the stale index or folds pending reviews in, only the first
+        lookup waits for the index to be built
+
+        :param load: loads partitions of (user_id, movie_id, rating) rows
+            of all reviews
+        """
+
+        if not (self.stale or self.pending):
+            return
+
+        # pylint: disable=consider-using-with
+        # a lookup does not wait for the update of another one
+        if not self._updating.acquire(blocking=self._index is None):
+            return
+
+        # pylint: disable=import-outside-toplevel
+        # NumPy and SciPy are imported by the first lookup, not by the app
+        from app.api.services.similar_index import build_index, fold_in
+
+        try:
+            ratings = self.pending.take()
+            if (index := self._index) is None or self.stale or ratings is None:
+                self._index = build_index(load(), self.top_k)
+            elif ratings:
+                self._index = fold_in(index, ratings, self.top_k)
+        finally:
+            self._updating.release()
+
+    def neighbours(self, movie_id: int) -> 'Neighbours':
+        """
+        :return: the most similar movies of the movie
+        """
+
+        if (index := self._index) is None:
+            return []
+
+        return index.neighbours.get(movie_id, [])
+
+    def clear(self) -> None:
+        with self._updating:
+            self._index = None
+            self.pending.clear()
+
+
+similar_movies = SimilarMovies(
+    top_k=settings.similar_movies_top_k,
+    rebuild_interval=settings.similar_movies_rebuild_interval,
+    pending=pending_ratings,
+)
+
+
+class SimilarMovieService:
+    @staticmethod
+    def get_similar(
+        movie_id: int, limit: int = 10, session: Optional[SessionType] = None
+    ) -> list[schemas.SimilarMovie]:
+        """
+        :param movie_id: id of the movie
+        :param limit: max number of returned movies
+        :param session: session of the request, a new one is opened if not given
+        :return: movies reviewed by the users of the movie, the most similar first
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        with use_session(session) as db_session:
+            if MovieService.find_by_id(movie_id, db_session) is None:
+                raise ResourceNotFound(entity='movie')
+
+            similar_movies.refresh(lambda: load_ratings(db_session))
+            neighbours = similar_movies.neighbours(movie_id)[:limit]
+
+            movies = {
+                movie.id: movie
+                for movie in db_session.execute(
+                    select(models.Movie).filter(
+                        models.Movie.id.in_([other for other, _ in neighbours])
+                    )
+                ).scalars()
+            }
+
+        return [
+            schemas.SimilarMovie(
+                **schemas.Movie.from_orm(movies[other]).dict(), similarity=similarity
+            )
+            for other, similarity in neighbours
+            if other in movies
+        ]
+
+
+def load_ratings(session: SessionType) -> Iterator[Sequence[Rating]]:
+    """
+    :return: partitions of (user_id, movie_id, rating) rows of all reviews
+    """
+
+    result = session.execute(
+        select(models.Review.user_id, models.Review.movie_id, models.Review.rating)
+        .filter(models.Review.user_id.isnot(None), models.Review.movie_id.isnot(None))
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+    return result.partitions()
@@ -0,0 +1,224 @@
+from dataclasses import dataclass
+from time import monotonic
+from typing import Iterable, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from app.api.services.pending_ratings import Rating
+
+# ratings are shifted, so a review rated 0 is not an empty cell of the matrix
+RATING_OFFSET = 1
+
+# movies whose similarities are computed by one product of matrices
+BLOCK_SIZE = 256
+
+# (movie_id, similarity) ordered by similarity
+Neighbours = list[tuple[int, float]]
+
+
+@dataclass(frozen=True)
+class SimilarityIndex:
+    """
+    Item-item cosine similarity over the users x movies matrix of ratings
+    and the ``top_k`` most similar movies of every movie. An index is never
+    changed, folding in ratings returns a new one
+    """
+
+    matrix: sparse.csc_matrix
+    # squared norms of the columns of the matrix
+    norms: np.ndarray
+    # rows of users and columns of movies of the matrix by their ids
+    users: dict[int, int]
+    movies: dict[int, int]
+    movie_ids: list[int]
+    neighbours: dict[int, Neighbours]
+    built_at: float
+
+
+def build_index(partitions: Iterable[Sequence[Rating]], top_k: int) -> SimilarityIndex:
+    """
+    :param partitions: (user_id, movie_id, rating) rows of all reviews
+    :param top_k: similar movies kept for every movie
+    """
+
+    chunks = [np.array(rows, dtype=np.int64).reshape(-1, 3) for rows in partitions]
+    ratings = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int64)
+
+    users, user_indices = np.unique(ratings[:, 0], return_inverse=True)
+    movies, movie_indices = np.unique(ratings[:, 1], return_inverse=True)
+    matrix = sparse.csc_matrix(
+        (
+            (ratings[:, 2] + RATING_OFFSET).astype(np.float64),
+            (user_indices, movie_indices),
+        ),
+        shape=(len(users), len(movies)),
+    )
+    norms = np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel()
+
+    movie_ids: list[int] = movies.tolist()
+    user_ids: list[int] = users.tolist()
+    neighbours = {}
+    for start in range(0, len(movie_ids), BLOCK_SIZE):
+        columns = range(start, min(start + BLOCK_SIZE, len(movie_ids)))
+        scores = similarities(matrix, norms, columns)
+        for row, column in enumerate(columns):
+            neighbours[movie_ids[column]] = top(scores, row, movie_ids, top_k)
+
+    return SimilarityIndex(
+        matrix=matrix,
+        norms=norms,
+        users={user_id: i for i, user_id in enumerate(user_ids)},
+        movies={movie_id: i for i, movie_id in enumerate(movie_ids)},
+        movie_ids=movie_ids,
+        neighbours=neighbours,
+        built_at=monotonic(),
+    )
+
+
+def fold_in(
+    index: SimilarityIndex, ratings: list[Rating], top_k: int
+) -> SimilarityIndex:
+    """
+    Computes the similarities of the movies of the ratings again and merges
+    them into the lists of the movies sharing users with them. Merged lists
+    may miss movies, which left the top of a list, until the next rebuild
+
+    :return: the index with the ratings of new reviews
+    """
+
+    # reviews committed while the index was rebuilt are already in it
+    ratings = [
+        (user_id, movie_id, rating)
+        for user_id, movie_id, rating in ratings
+        if user_id not in index.users
+        or movie_id not in index.movies
+        or not index.matrix[index.users[user_id], index.movies[movie_id]]
+    ]
+    if not ratings:
+        return index
+
+    users, movies, movie_ids = dict(index.users), dict(index.movies), index.movie_ids[:]
+    for user_id, movie_id, _ in ratings:
+        users.setdefault(user_id, len(users))
+        if movie_id not in movies:
+            movies[movie_id] = len(movie_ids)
+            movie_ids.append(movie_id)
+
+    shape = (len(users), len(movie_ids))
+    rows = [users[user_id] for user_id, _, _ in ratings]
+    columns = [movies[movie_id] for _, movie_id, _ in ratings]
+    values = np.array([rating + RATING_OFFSET for _, _, rating in ratings], float)
+
+    norms = np.zeros(shape[1])
+    norms[: len(index.norms)] = index.norms
+    np.add.at(norms, columns, values**2)
+
+    # new movies get empty columns, the matrix of the index is not changed
+    indptr = np.pad(index.matrix.indptr, (0, shape[1] - index.matrix.shape[1]), 'edge')
+    matrix = sparse.csc_matrix(
+        (index.matrix.data, index.matrix.indices, indptr), shape=shape
+    ) + sparse.csc_matrix((values, (rows, columns)), shape=shape)
+
+    neighbours = dict(index.neighbours)
+    changed = sorted(set(columns))
+    for start in range(0, len(changed), BLOCK_SIZE):
+        block = changed[start : start + BLOCK_SIZE]
+        scores = similarities(matrix, norms, block)
+        for row, column in enumerate(block):
+            neighbours[movie_ids[column]] = top(scores, row, movie_ids, top_k)
+        _merge(
+            neighbours,
+            scores,
+            [movie_ids[column] for column in block],
+            movie_ids,
+            top_k,
+        )
+
+    return SimilarityIndex(
+        matrix=matrix,
+        norms=norms,
+        users=users,
+        movies=movies,
+        movie_ids=movie_ids,
+        neighbours=neighbours,
+        built_at=index.built_at,
+    )
+
+
+def _merge(
+    neighbours: dict[int, Neighbours],
+    scores: sparse.csr_matrix,
+    changed: list[int],
+    movie_ids: list[int],
+    top_k: int,
+) -> None:
+    """
+    Replaces the similarities to the changed movies in the lists of the movies
+    sharing users with them
+
+    :param scores: similarities of the changed movies to all movies
+    :param changed: ids of the movies of the rows of the scores
+    """
+
+    by_column = scores.T.tocsr()
+    columns: list[int] = np.flatnonzero(np.diff(by_column.indptr)).tolist()
+    for column in columns:
+        start, end = by_column.indptr[column], by_column.indptr[column + 1]
+        rows: list[int] = by_column.indices[start:end].tolist()
+        values: list[float] = by_column.data[start:end].tolist()
+        updated = {changed[row]: value for row, value in zip(rows, values)}
+
+        other = movie_ids[column]
+        merged = [item for item in neighbours.get(other, []) if item[0] not in updated]
+        merged.extend(updated.items())
+        merged.sort(key=lambda item: item[1], reverse=True)
+        neighbours[other] = merged[:top_k]
+
+
+def similarities(
+    matrix: sparse.csc_matrix, norms: np.ndarray, columns: Iterable[int]
+) -> sparse.csr_matrix:
+    """
+    :param matrix: ratings, users x movies
+    :param norms: squared norms of the columns of the matrix
+    :param columns: columns of the movies
+    :return: cosine similarities of the movies to all movies, a row for every
+        movie, movies without common users and the movie itself are not stored
+    """
+
+    movies = np.fromiter(columns, dtype=np.int64)
+    product = (matrix[:, movies].T @ matrix).tocoo()
+
+    # a movie is not similar to itself
+    other = product.col != movies[product.row]
+    rows, cols = product.row[other], product.col[other]
+    # stored products are positive, so both norms are
+    scores = product.data[other] / np.sqrt(norms[movies][rows] * norms[cols])
+
+    return sparse.csr_matrix((scores, (rows, cols)), shape=product.shape)
+
+
+def top(
+    scores: sparse.csr_matrix, row: int, movie_ids: list[int], top_k: int
+) -> Neighbours:
+    """
+    :param scores: similarities of movies to all movies
+    :param row: row of the movie in the scores
+    :return: the most similar movies of the movie
+    """
+
+    start, end = scores.indptr[row], scores.indptr[row + 1]
+    data, indices = scores.data[start:end], scores.indices[start:end]
+
+    k = min(top_k, len(data))
+    if not k:
+        return []
+
+    best = np.argpartition(-data, k - 1)[:k]
+    best = best[np.argsort(-data[best], kind='stable')]
+
+    columns: list[int] = indices[best].tolist()
+    values: list[float] = data[best].tolist()
+
+    return [(movie_ids[column], value) for column, value in zip(columns, values)]
@@ -0,0 +1,244 @@
+import hmac
+import random
+import secrets
+import string
+from hashlib import pbkdf2_hmac, sha256
+from typing import Any, Optional
+
+from fastapi.security import HTTPBasicCredentials
+from loguru import logger
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.session import Session as SessionType
+from sqlalchemy.sql import Select
+
+from app.api import metrics, pagination, schemas
+from app.api.cache import TTLCache
+from app.api.exceptions import InvalidCredentials, ResourceAlreadyExists
+from app.config import settings
+from app.db import models
+from app.db.utils import use_session
+
+# digests of successfully verified credentials mapped to the user
+credentials_cache = TTLCache(
+    maxsize=settings.credentials_cache_size, ttl=settings.credentials_cache_ttl
+)
+
+# per-process key, so cache keys can not be reversed to passwords by brute force
+_CREDENTIALS_KEY = secrets.token_bytes(32)
+
+
+class UserService:
+    @staticmethod
+    def get_all(
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        session: Optional[SessionType] = None,
+    ) -> list[models.User]:
+        """
+        :param offset: number of skipped elements
+        :param limit: max number of returned elements
+        :param after: cursor of the page, users are ordered by id
+        :param session: session of the request, a new one is opened if not given
+        :return: list of users
+        """
+
+        with use_session(session) as db_session:
+            users = (
+                db_session.execute(UserService.select_all(offset, limit, after))
+                .scalars()
+                .all()
+            )
+
+        return users
+
+    @staticmethod
+    def select_all(
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Select:
+        users = select(models.User).order_by(models.User.id)
+
+        if after is not None:
+            users = pagination.seek(users, after, pagination.ORDER_BY_ID, models.User)
+
+        if limit is not None:
+            users = users.limit(limit)
+
+        if offset is not None:
+            users = users.offset(offset)
+
+        return users
+
+    @staticmethod
+    def find_by_id(user_id: int, session: Optional[SessionType] = None) -> models.User:
+        """
+        :param user_id: id of user
+        :param session: session of the request, a new one is opened if not given
+        :return: user entity
+        """
+
+        with use_session(session) as db_session:
+            user = (
+                db_session.query(models.User).filter(models.User.id == user_id).first()
+            )
+
+        return user
+
+    @staticmethod
+    def find_by_name(name: str, session: Optional[SessionType] = None) -> models.User:
+        """
+        :param name: name of user
+        :param session: session of the request, a new one is opened if not given
+        :return: user entity
+        """
+
+        with use_session(session) as db_session:
+            user = db_session.execute(UserService.select_by_name(name)).scalar()
+
+        return user
+
+    @staticmethod
+    def select_by_name(name: str) -> Select:
+        return (
+            select(models.User)
+            .options(raiseload('*'))
+            .filter(models.User.name == name)
+            .limit(1)
+        )
+
+    @staticmethod
+    def create(
+        user: schemas.UserCreate, session: Optional[SessionType] = None
+    ) -> models.User:
+        """
+        Creates a new user. Password is hashed with 'salt' adding
+
+        :param user: schema of userCreate
+        :param session: session of the request, a new one is opened if not given
+        :return: user entity
+        :raises ResourceAlreadyExists: if user already exists
+        """
+
+        with use_session(session) as db_session:
+            if UserService.find_by_name(user.name, db_session):
+                raise ResourceAlreadyExists(entity='user')
+
+            salt = SecurityService.generate_random_string()
+            hashed_password = SecurityService.hash_password(user.password, salt)
+
+            user = models.User(name=user.name, password=hashed_password, salt=salt)
+
+            db_session.add(user)
+            db_session.commit()
+
+        return UserService.created(user)
+
+    @staticmethod
+    def created(user: models.User) -> models.User:
+        """
+        Finishes creation of a committed user: credentials cached for
+        the name of the user are dropped
+
+        :param user: new user
+        :return: the same user
+        """
+
+        SecurityService.forget_user(user.name)
+
+        logger.info(f'{user} was created')
+
+        return user
+
+
+class SecurityService:
+    @staticmethod
+    def authenticate_user(
+        credentials: HTTPBasicCredentials, session: Optional[SessionType] = None
+    ) -> schemas.User:
+        """
+        Checks credentials of a user. Successfully verified credentials are
+        remembered in ``credentials_cache``, so repeated requests skip both
+        the database lookup and the password hashing
+
+        :param credentials: name and password of the user
+        :param session: session of the request, a new one is opened if not given
+        :return: authenticated user
+        :raises InvalidCredentials: if the user does not exist or password is wrong
+        """
+
+        key = SecurityService.credentials_digest(credentials)
+
+        if (cached_user := credentials_cache.get(key)) is not None:
+            return cached_user
+
+        user = UserService.find_by_name(credentials.username, session)
+
+        if not user or not SecurityService.validate_password(
+            hashed_password=user.password, password=credentials.password, salt=user.salt
+        ):
+            raise InvalidCredentials()
+
+        logger.info(f'{user} passed authentication')
+
+        return SecurityService.remember_user(key, user)
+
+    @staticmethod
+    def remember_user(key: str, user: models.User) -> schemas.User:
+        """
+        Caches verified credentials of the user
+
+        :param key: digest of the credentials
+        :param user: authenticated user
+        :return: detached copy of the user, safe to share between requests
+        """
+
+        authenticated_user = schemas.User.from_orm(user)
+        credentials_cache.set(key, authenticated_user)
+
+        return authenticated_user
+
+    @staticmethod
+    def credentials_digest(credentials: HTTPBasicCredentials) -> str:
+        message = f'{credentials.username}\0{credentials.password}'.encode()
+
+        return hmac.new(_CREDENTIALS_KEY, message, sha256).hexdigest()
+
+    @staticmethod
+    def forget_user(name: str) -> None:
+        """
+        Drops all cached credentials of the user
+
+        :param name: name of the user
+        """
+
+        credentials_cache.invalidate_where(lambda _, user: user.name == name)
+
+    @staticmethod
+    def hash_password(password: str, salt: str) -> str:
+        with metrics.password_hashing():
+            hashed_password = pbkdf2_hmac(
+                'sha256', password.encode(), salt.encode(), 10
+            )
+
+        return hashed_password.hex()
+
+    @staticmethod
+    def validate_password(password: str, hashed_password: str, salt: str) -> bool:
+        password_to_verify = SecurityService.hash_password(password, salt)
+
+        return secrets.compare_digest(hashed_password, password_to_verify)
+
+    @staticmethod
+    def generate_random_string(length: int = 10) -> str:
+        return ''.join(random.choice(string.ascii_letters) for _ in range(length))
+
+
+@event.listens_for(models.User, 'after_update')
+@event.listens_for(models.User, 'after_delete')
+def _forget_changed_user(_mapper: Any, _connection: Any, user: models.User) -> None:
+    # a renamed user must lose credentials cached under the previous name as well
+    for name in (user.name, *inspect(user).attrs.name.history.deleted):
+        SecurityService.forget_user(name)
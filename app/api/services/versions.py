@@ -0,0 +1,94 @@
+from itertools import chain
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm.session import Session as SessionType
+from sqlalchemy.sql import Insert, Select
+
+from app.db import models
+from app.db.utils import upsert, use_session
+
+# listing of all movies, it changes with every movie and every review
+CATALOG = 'movies'
+
+
+def reviews_key(movie_id: int) -> str:
+    """
+    :param movie_id: id of the movie
+    :return: key of the version of the listing of reviews of the movie
+    """
+
+    return f'movies/{movie_id}/reviews'
+
+
+class VersionService:
+    @staticmethod
+    def get(
+        keys: Iterable[str], session: Optional[SessionType] = None
+    ) -> dict[str, int]:
+        """
+        :param keys: keys of listings
+        :param session: session of the request, a new one is opened if not given
+        :return: versions of the listings, 0 if a listing has never changed
+        """
+
+        keys = list(keys)
+        with use_session(session) as db_session:
+            versions = dict(db_session.execute(VersionService.select(keys)).all())
+
+        return {key: versions.get(key, 0) for key in keys}
+
+    @staticmethod
+    def select(keys: Iterable[str]) -> Select:
+        return select(models.Version.key, models.Version.value).filter(
+            models.Version.key.in_(list(keys))
+        )
+
+    @staticmethod
+    def bump(session: SessionType, keys: Iterable[str]) -> None:
+        """
+        Increments versions of the listings in the transaction, which
+        changes them
+
+        :param session: session of the transaction
+        :param keys: keys of the changed listings
+        """
+
+        keys = sorted(set(keys))
+        if keys:
+            dialect = session.get_bind().dialect.name
+            session.execute(VersionService.increment(keys, dialect))
+
+    @staticmethod
+    def increment(keys: Iterable[str], dialect: str) -> Insert:
+        return upsert(
+            models.Version,
+            [{'key': key, 'value': 1} for key in keys],
+            index_elements=[models.Version.key],
+            set_={'value': models.Version.value + 1},
+            dialect=dialect,
+        )
+
+
+def changed_listings(instances: Iterable[Any]) -> set[str]:
+    """
+    :param instances: created, changed or deleted entities
+    :return: keys of the listings, which show the entities
+    """
+
+    keys = set()
+    for instance in instances:
+        if isinstance(instance, models.Movie):
+            keys.add(CATALOG)
+        elif isinstance(instance, models.Review):
+            # ratings of the movie change along with its reviews
+            keys.update((CATALOG, reviews_key(instance.movie_id)))
+
+    return keys
+
+
+@event.listens_for(SessionType, 'after_flush')
+def _bump_changed_listings(session: SessionType, _flush_context: Any) -> None:
+    # covers services and admin alike, in the transaction of the change
+    keys = changed_listings(chain(session.new, session.dirty, session.deleted))
+    VersionService.bump(session, keys)
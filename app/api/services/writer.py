@@ -0,0 +1,286 @@
+"""
+Group commit of reviews: one thread commits the reviews of all requests
+in batches, so writers do not queue for the lock of the database one by one
+and a batch pays for one transaction instead of one per review
+"""
+import asyncio
+import queue
+import threading
+from concurrent import futures
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional, Union
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.orm.session import Session as SessionType
+
+from app.api import schemas
+from app.api.exceptions import ResourceAlreadyExists, ResourceNotFound
+from app.api.services.batch import ReviewBatchService
+from app.api.services.reviews import REVIEW_COLUMNS, unique_reviews
+from app.config import settings
+from app.db import models
+from app.db.utils import use_session
+
+# created review or the error raised to its caller
+Result = Union[schemas.Review, Exception]
+
+
+@dataclass
+class PendingReview:
+    review: schemas.ReviewCreate
+    movie_id: int
+    user_id: int
+    # resolved after the batch of the review is committed
+    future: 'Future[schemas.Review]' = field(default_factory=Future)
+
+
+class ReviewWriter:
+    """
+    Takes reviews from a queue and commits them once ``max_batch`` reviews
+    are queued or the first one waited ``max_delay`` seconds. A writer,
+    which did not commit a review within ``timeout`` seconds, is unhealthy
+    and callers commit their reviews themselves until its batch gets through
+    or it is started again
+    """
+
+    def __init__(self, max_batch: int, max_delay: float, timeout: float) -> None:
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.batches = 0
+        self.healthy = True
+
+        self._queue: queue.Queue[Optional[PendingReview]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether reviews can be submitted: the thread is alive and healthy
+        """
+
+        thread = self._thread
+        return thread is not None and thread.is_alive() and self.healthy
+
+    def start(self) -> None:
+        """
+        Starts the thread, a thread, which died, is replaced
+        """
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.healthy = True
+                self._thread = threading.Thread(
+                    target=self._run, name='review-writer', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Commits the queued reviews and stops the thread
+        """
+
+        with self._lock:
+            if self._thread is None:
+                return
+
+            self._queue.put(None)
+            # a stalled thread is not waited for, it is a daemon
+            self._thread.join(None if self.healthy else self.timeout)
+            self._thread = None
+
+    def submit(
+        self, review: schemas.ReviewCreate, movie_id: int, user_id: int
+    ) -> 'Future[schemas.Review]':
+        """
+        :return: future of the created review, it fails with ResourceNotFound
+            if the movie does not exist or with ResourceAlreadyExists
+            if the movie has already been reviewed by the user
+        :raises RuntimeError: if the writer is not running
+        """
+
+        pending = PendingReview(review, movie_id, user_id)
+        with self._lock:
+            if not self.running:
+                raise RuntimeError('review writer is not running')
+
+            self._queue.put(pending)
+
+        return pending.future
+
+    def create(
+        self, review: schemas.ReviewCreate, movie_id: int, user_id: int
+    ) -> Optional[schemas.Review]:
+        """
+        Blocking version of ``submit``
+
+        :return: created review or None if it was not committed within
+            ``timeout``, the caller commits the review itself then
+            by ``ReviewService.create_or_get``
+        :raises ResourceAlreadyExists: if the movie has already been reviewed by a user.
+        :raises ResourceNotFound: if the movie does not exist
+        """
+
+        future = self.submit(review, movie_id, user_id)
+        try:
+            return future.result(timeout=self.timeout)
+        except futures.TimeoutError:
+            self.stalled(future)
+            return None
+
+    async def create_async(
+        self, review: schemas.ReviewCreate, movie_id: int, user_id: int
+    ) -> Optional[schemas.Review]:
+        """
+        Same as ``create``, but the event loop is not blocked meanwhile
+        """
+
+        future = self.submit(review, movie_id, user_id)
+        try:
+            created = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stalled(future)
+            return None
+
+        return created
+
+    def stalled(self, future: 'Future[schemas.Review]') -> None:
+        """
+        Marks the writer unhealthy after it did not resolve the future
+        in time. The review is dropped from its batch unless the batch
+        is being committed already, then the unique index of reviews keeps
+        the caller from creating it twice and ``ReviewService.create_or_get``
+        returns the review committed by the writer
+        """
+
+        future.cancel()
+        if self.healthy:
+            self.healthy = False
+            logger.error(
+                f'review writer did not commit a review in {self.timeout}s, '
+                'reviews are committed by requests'
+            )
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    pending = self._queue.get(timeout=max(deadline - monotonic(), 0))
+                except queue.Empty:
+                    break
+
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            # reviews given up by their callers are not committed
+            batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+            if batch:
+                self.commit(batch)
+
+    def commit(self, batch: list[PendingReview]) -> None:
+        """
+        Creates the reviews in one transaction and resolves their futures
+        """
+
+        results: list[Result]
+        # the database answered, whatever the results of the reviews are
+        answered = True
+        try:
+            with unique_reviews(), use_session() as session:
+                results = add_reviews(session, batch)
+        except ResourceAlreadyExists as e:
+            # a review was created past the writer, so the others are retried alone
+            if len(batch) > 1:
+                for pending in batch:
+                    self.commit([pending])
+                return
+            results = [e]
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f'batch of {len(batch)} reviews failed')
+            results = [e] * len(batch)
+            answered = False
+
+        self.batches += 1
+        if answered and not self.healthy:
+            # the stalled batch got through, so requests submit reviews again
+            self.healthy = True
+            logger.info('review writer recovered, reviews are committed in batches')
+        for pending, result in zip(batch, results):
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+
+def add_reviews(session: SessionType, batch: list[PendingReview]) -> list[Result]:
+    """
+    Adds reviews of several users as ``ReviewBatchService.add_many`` does,
+    counters of a movie are updated once per batch
+
+    :param session: session of the transaction, which creates the reviews
+    :return: created reviews or errors of the reviews in their order
+    """
+
+    user_ids = {pending.user_id for pending in batch}
+    movies = set(
+        session.execute(
+            select(models.Movie.id).filter(
+                models.Movie.id.in_({pending.movie_id for pending in batch})
+            )
+        ).scalars()
+    )
+    reviews = select(*REVIEW_COLUMNS).filter(
+        models.Review.movie_id.in_(movies), models.Review.user_id.in_(user_ids)
+    )
+    reviewed = {(row.movie_id, row.user_id) for row in session.execute(reviews)}
+
+    new: dict[tuple[int, int], PendingReview] = {}
+    for pending in batch:
+        key = (pending.movie_id, pending.user_id)
+        if pending.movie_id in movies and key not in reviewed:
+            new.setdefault(key, pending)
+
+    ReviewBatchService.insert_many(
+        session,
+        [
+            {**pending.review.dict(), 'movie_id': key[0], 'user_id': key[1]}
+            for key, pending in new.items()
+        ],
+    )
+    created = {
+        (row.movie_id, row.user_id): schemas.Review.from_orm(row)
+        for row in session.execute(reviews)
+        if (row.movie_id, row.user_id) in new
+    }
+
+    results: list[Result] = []
+    for pending in batch:
+        key = (pending.movie_id, pending.user_id)
+        if pending.movie_id not in movies:
+            results.append(ResourceNotFound(entity='movie'))
+        elif new.get(key) is not pending:
+            results.append(ResourceAlreadyExists(entity='review'))
+        else:
+            results.append(created[key])
+
+    return results
+
+
+review_writer = ReviewWriter(
+    max_batch=settings.review_batch_size,
+    max_delay=settings.review_batch_delay,
+    timeout=settings.review_writer_timeout,
+)
@@ -0,0 +1,62 @@
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+# rows fetched from the database at once while streaming
+STREAM_BATCH_SIZE = 500
+
+# documents the streamed alternative of a listing in OpenAPI
+NDJSON_RESPONSES: dict[Union[int, str], dict[str, Any]] = {
+    200: {'content': {NDJSON_MEDIA_TYPE: {}}}
+}
+
+
+def accepts_ndjson(request: Request) -> bool:
+    """
+    :param request: request of a listing
+    :return: whether the client asked to stream the listing as NDJSON
+    """
+
+    accept = request.headers.get('accept', '')
+
+    return any(
+        media_type.split(';')[0].strip() == NDJSON_MEDIA_TYPE
+        for media_type in accept.split(',')
+    )
+
+
+def ndjson_response(
+    rows: Union[Iterable[Any], AsyncIterable[Any]], schema: type[BaseModel]
+) -> StreamingResponse:
+    """
+    Serializes rows one by one as they are fetched, so memory does not
+    grow with the size of the listing. Cursor of the next page is not sent,
+    because headers go out before the last row is known
+
+    :param rows: ORM entities of the listing
+    :param schema: schema of a row
+    :return: response with one JSON document per line
+    """
+
+    if isinstance(rows, AsyncIterable):
+        content: Any = _async_lines(rows, schema)
+    else:
+        content = _lines(rows, schema)
+
+    return StreamingResponse(content, media_type=NDJSON_MEDIA_TYPE)
+
+
+def _lines(rows: Iterable[Any], schema: type[BaseModel]) -> Iterator[str]:
+    for row in rows:
+        yield schema.from_orm(row).json() + '\n'
+
+
+async def _async_lines(
+    rows: AsyncIterable[Any], schema: type[BaseModel]
+) -> AsyncIterator[str]:
+    async for row in rows:
+        yield schema.from_orm(row).json() + '\n'
@@ -0,0 +1,83 @@
+from typing import Literal, Optional
+
+from pydantic import BaseSettings, SecretStr
+
+
+class Settings(BaseSettings):
+    """
+    Settings of the app, read from ``KINOAPP_*`` environment variables
+    """
+
+    # serve the API with async routers, services and database sessions
+    async_mode: bool = False
+    # threads hashing passwords for the async routers
+    hash_workers: int = 4
+    # verified credentials remembered by SecurityService.authenticate_user
+    credentials_cache_size: int = 1024
+    # seconds after which verified credentials are checked against the database again
+    credentials_cache_ttl: float = 300.0
+    # key of access tokens, shared by all workers. If unset, every process
+    # signs tokens with a random key of its own, which works only when the app
+    # runs in a single process, and a warning is logged at startup
+    token_secret: Optional[SecretStr] = None
+    # seconds access tokens are valid
+    token_ttl: int = 900
+    # results of MovieService queries, 0 disables the cache
+    movies_cache_size: int = 4096
+    # seconds after which cached results are loaded from the database again,
+    # changes made by this process drop them at once
+    movies_cache_ttl: float = 60.0
+
+    # commit reviews of all requests in batches by one writer thread
+    review_group_commit: bool = False
+    # reviews committed together at most
+    review_batch_size: int = 100
+    # seconds the first review of a batch waits for more reviews
+    review_batch_delay: float = 0.005
+    # seconds a request waits for its review to be committed by the writer,
+    # then the writer is considered stalled and requests commit reviews directly
+    review_writer_timeout: float = 5.0
+
+    # most similar movies kept for every movie by GET /movies/{movie_id}/similar
+    similar_movies_top_k: int = 50
+    # seconds after which similar movies are computed from all reviews again,
+    # new reviews are folded in meanwhile
+    similar_movies_rebuild_interval: float = 3600.0
+    # new reviews folded in at most, the index is rebuilt instead past them
+    similar_movies_fold_in_limit: int = 100
+
+    # seconds numbers of rows shown by the admin are cached
+    admin_count_ttl: float = 60.0
+
+    # record metrics of requests and serve them at /metrics
+    metrics: bool = True
+    # send DB, password hashing and total time of requests in Server-Timing
+    server_timing: bool = False
+
+    # databases of the app and of the tests, any SQLAlchemy url
+    database_uri: str = 'sqlite:///app/db/primary.db'
+    database_uri_test: str = 'sqlite:///tests/app/test.db'
+    # connections kept by the pool, so SQLite pragmas and caches live on between
+    # requests, 0 opens a new connection for every checkout (NullPool)
+    pool_size: int = 5
+    # connections opened above pool_size under load
+    max_overflow: int = 10
+    # seconds after which a connection is reopened, -1 keeps them forever
+    pool_recycle: int = -1
+    # log every SQL statement
+    echo: bool = False
+
+    # pragmas of every new SQLite connection, WAL lets readers run next to a writer
+    sqlite_journal_mode: Literal['WAL', 'DELETE', 'TRUNCATE', 'MEMORY'] = 'WAL'
+    sqlite_synchronous: Literal['OFF', 'NORMAL', 'FULL'] = 'NORMAL'
+    # milliseconds a connection waits for a lock before failing
+    sqlite_busy_timeout: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # negative values are KiB, positive are pages
+    sqlite_cache_size: int = -64000
+
+    class Config:
+        env_prefix = 'KINOAPP_'
+
+
+settings = Settings()
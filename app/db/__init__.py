@@ -1,30 +1,189 @@
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Optional, Union
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
 
-DATA_BASE_URI = 'sqlite:///app/db/primary.db'
-DATA_BASE_URI_TEST = 'sqlite:///tests/app/test.db'
+from app.config import Settings, settings
 
-engine = create_engine(DATA_BASE_URI)
-engine_tests = create_engine(DATA_BASE_URI_TEST)
+DATA_BASE_URI = settings.database_uri
+DATA_BASE_URI_TEST = settings.database_uri_test
 
-Session = sessionmaker()
+# async drivers of the database backends, by the backend name of the url
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
+
+
+def engine_options(
+    url: Union[str, URL],
+    config: Settings = settings,
+    queue_pool: type[Pool] = QueuePool,
+) -> dict[str, Any]:
+    """
+    :param url: url of the database
+    :param config: settings of the pool
+    :param queue_pool: class of the pool, which keeps ``pool_size`` connections
+    :return: keyword arguments of create_engine
+    """
 
-Base = declarative_base()
+    url = make_url(url)
+    options: dict[str, Any] = {'echo': config.echo, 'pool_recycle': config.pool_recycle}
 
+    if url.get_backend_name() == 'sqlite':
+        # a request session may be used by several threads of the threadpool in turn
+        options['connect_args'] = {'check_same_thread': False}
+        if url.database in (None, '', ':memory:'):
+            # every connection opens its own in-memory database, so the pool
+            # of the driver, which shares one connection, is kept
+            return options
 
-def create_bd(mode: Optional[str] = None) -> None:
-    if mode == 'TESTING':
-        Session.configure(bind=engine_tests)
-        Base.metadata.create_all(engine_tests)
+    if config.pool_size:
+        options.update(
+            poolclass=queue_pool,
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+        )
     else:
-        Session.configure(bind=engine)
-        Base.metadata.create_all(engine)
+        options['poolclass'] = NullPool
+
+    return options
+
+
+def sqlite_pragmas(config: Settings = settings) -> list[str]:
+    return [
+        f'journal_mode = {config.sqlite_journal_mode}',
+        f'synchronous = {config.sqlite_synchronous}',
+        f'busy_timeout = {config.sqlite_busy_timeout:d}',
+        f'mmap_size = {config.sqlite_mmap_size:d}',
+        f'cache_size = {config.sqlite_cache_size:d}',
+    ]
+
+
+def set_sqlite_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas():
+        cursor.execute(f'PRAGMA {pragma}')
+    cursor.close()
+
+
+def make_engine(url: Union[str, URL], config: Settings = settings) -> Engine:
+    """
+    Creates an engine configured by the settings. Connections are kept
+    by a QueuePool unless ``pool_size`` is 0, SQLite connections get
+    the pragmas of the settings when they are opened
+
+    :param url: url of the database
+    :param config: settings of the engine
+    :return: engine
+    """
+
+    new_engine = create_engine(url, **engine_options(url, config))
+    if new_engine.dialect.name == 'sqlite':
+        event.listen(new_engine, 'connect', set_sqlite_pragmas)
+
+    return new_engine
+
+
+def get_engine(mode: Optional[str] = None) -> Engine:
+    """
+    :param mode: 'TESTING' for the database of the tests
+    :return: engine of the database, created on the first call
+    """
+
+    return cached_engine(DATA_BASE_URI_TEST if mode == 'TESTING' else DATA_BASE_URI)
+
+
+@lru_cache(maxsize=None)
+def cached_engine(url: str) -> Engine:
+    """
+    :return: the one engine of the process connected to the url
+    """
+
+    return make_engine(url)
+
+
+def __getattr__(name: str) -> Engine:
+    # engines are created on first use, so importing the package has no side effects
+    if name == 'engine':
+        return get_engine()
+    if name == 'engine_tests':
+        return get_engine('TESTING')
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+Session = sessionmaker()
+AsyncSession = sessionmaker(class_=AsyncSessionType, expire_on_commit=False)
+
+# declarative_base is untyped, the models in app.db.models derive from it
+Base: Any = declarative_base()
+
+
+def get_async_url(url: URL) -> URL:
+    """
+    :param url: url of a database with a sync driver
+    :return: url of the same database with the async driver of its backend
+    :raises ValueError: if the backend has no known async driver
+    """
+
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(
+            f'async mode supports {", ".join(ASYNC_DRIVERS)} databases, not {backend}'
+        )
+
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+@lru_cache(maxsize=None)
+def get_async_engine(url: URL) -> AsyncEngine:
+    """
+    :param url: url of a database with a sync driver
+    :return: engine connected to the same database through the async driver
+    """
+
+    async_url = get_async_url(url)
+    async_engine = create_async_engine(
+        async_url, **engine_options(async_url, queue_pool=AsyncAdaptedQueuePool)
+    )
+    if async_url.get_backend_name() == 'sqlite':
+        event.listen(async_engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+    return async_engine
+
+
+def create_bd(
+    mode: Optional[str] = None, async_mode: bool = settings.async_mode
+) -> None:
+    """
+    Binds the sessions to the database and brings its schema up to date,
+    running it again changes nothing
+
+    :param mode: 'TESTING' for the database of the tests
+    :param async_mode: bind the async sessions as well
+    """
+
+    # pylint: disable=import-outside-toplevel
+    # migrations need the models, which import Base from this module
+    from app.db.migrations import upgrade
+
+    bind = get_engine(mode)
+
+    Session.configure(bind=bind)
+    Base.metadata.create_all(bind)
+    upgrade(bind)
+
+    if async_mode:
+        AsyncSession.configure(bind=get_async_engine(bind.url))
 
 
 def clear_db(mode: Optional[str] = None) -> None:
-    if mode == 'TESTING':
-        Base.metadata.drop_all(engine_tests)
-    else:
-        Base.metadata.drop_all(engine)
+    Base.metadata.drop_all(get_engine(mode))
@@ -0,0 +1,164 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import (
+    Float,
+    MetaData,
+    cast,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+
+from app.db import Base, models
+from app.db.search import create_title_search
+
+
+def upgrade(bind: Engine) -> None:
+    """
+    Brings a database created by an older version of the app up to date.
+    ``create_all`` only creates missing tables, so changed columns and
+    indexes added to existing tables are handled here
+
+    :param bind: engine of the database
+    """
+
+    migrate_ratings_avg(bind)
+    remove_duplicate_reviews(bind)
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+    with bind.begin() as connection:
+        create_title_search(connection)
+
+    fill_rating_counts(bind)
+
+
+def remove_duplicate_reviews(bind: Engine) -> None:
+    """
+    Reviews were not unique before ``ix_reviews_movie_id_user_id``, so the
+    index can not be created over repeated reviews of a user. The first
+    review is kept and the counters of the movies, which lost reviews,
+    are computed again from the remaining ones
+    """
+
+    indexes = {index['name'] for index in inspect(bind).get_indexes('reviews')}
+    if 'ix_reviews_movie_id_user_id' in indexes:
+        return
+
+    review = models.Review
+    movie = models.Movie
+    duplicates = (
+        review.movie_id.isnot(None)
+        & review.user_id.isnot(None)
+        & review.id.notin_(
+            select(func.min(review.id)).group_by(review.movie_id, review.user_id)
+        )
+    )
+
+    with bind.begin() as connection:
+        movie_ids = (
+            connection.execute(select(review.movie_id).where(duplicates).distinct())
+            .scalars()
+            .all()
+        )
+        if not movie_ids:
+            return
+
+        connection.execute(delete(review).where(duplicates))
+        count_ratings(connection, movie_ids)
+
+        count = select(func.count()).where(review.movie_id == movie.id)
+        ratings_sum = select(func.sum(review.rating)).where(review.movie_id == movie.id)
+        connection.execute(
+            update(movie)
+            .where(movie.id.in_(movie_ids))
+            .values(
+                ratings_sum=ratings_sum.scalar_subquery(),
+                ratings_count=count.scalar_subquery(),
+                comments_count=count.scalar_subquery(),
+                ratings_avg=func.round(
+                    cast(ratings_sum.scalar_subquery(), Float)
+                    / count.scalar_subquery(),
+                    1,
+                ),
+            )
+        )
+
+
+def migrate_ratings_avg(bind: Engine) -> None:
+    """
+    ``movies.ratings_avg`` used to be stored as a string. SQLite can not
+    change the type of a column, so the table is rebuilt with a numeric one
+    and the averages are converted while being copied
+    """
+
+    columns = {column['name']: column for column in inspect(bind).get_columns('movies')}
+    if isinstance(columns['ratings_avg']['type'], Float):
+        return
+
+    table = models.Movie.__table__
+    new_table = table.to_metadata(MetaData(), name='movies_new')
+    names = [column.name for column in table.columns]
+    values = [
+        'CAST(ratings_avg AS REAL)' if name == 'ratings_avg' else name for name in names
+    ]
+
+    with bind.begin() as connection:
+        # indexes are created afterwards under the names of the final table
+        connection.execute(CreateTable(new_table))
+        connection.exec_driver_sql(
+            f'INSERT INTO movies_new ({", ".join(names)}) '
+            f'SELECT {", ".join(values)} FROM movies'
+        )
+        connection.exec_driver_sql('DROP TABLE movies')
+        connection.exec_driver_sql('ALTER TABLE movies_new RENAME TO movies')
+
+
+def fill_rating_counts(bind: Engine) -> None:
+    """
+    ``rating_counts`` is created empty, so movies reviewed before it
+    get their histograms counted from the reviews
+    """
+
+    with bind.begin() as connection:
+        if connection.execute(select(models.RatingCount.movie_id).limit(1)).first():
+            return
+
+        count_ratings(connection)
+
+
+def count_ratings(
+    connection: Connection, movie_ids: Optional[Iterable[int]] = None
+) -> None:
+    """
+    Counts histograms of ratings from the reviews again
+
+    :param connection: connection in a transaction
+    :param movie_ids: ids of the movies, all movies by default
+    """
+
+    review = models.Review
+    counts = models.RatingCount
+
+    stale = delete(counts)
+    query = (
+        select(review.movie_id, review.rating, func.count())
+        .where(review.movie_id.isnot(None))
+        .group_by(review.movie_id, review.rating)
+    )
+    if movie_ids is not None:
+        movie_ids = list(movie_ids)
+        stale = stale.where(counts.movie_id.in_(movie_ids))
+        query = query.where(review.movie_id.in_(movie_ids))
+
+    connection.execute(stale)
+    connection.execute(
+        insert(counts).from_select(['movie_id', 'rating', 'count'], query)
+    )
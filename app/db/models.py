@@ -1,10 +1,13 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Date, ForeignKey, Integer, String
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db import Base
 
+# relationships are never loaded eagerly by default, queries in app.api.services
+# opt in to the columns and relationships they actually need
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -14,9 +17,7 @@ class User(Base):
     password = Column(String)
     salt = Column(String)
 
-    reviews = relationship(
-        'Review', uselist=True, lazy='subquery', back_populates='user'
-    )
+    reviews = relationship('Review', uselist=True, back_populates='user')
 
     def __repr__(self) -> str:
         return f'user: id={self.id}, name={self.name}'
@@ -27,15 +28,13 @@ class Movie(Base):
 
     id = Column(Integer, primary_key=True)
     title = Column(String(50), unique=True, nullable=False)
-    realise_date = Column(Date, default=datetime.utcnow().date())
-    ratings_avg = Column(String(4), default='0.0')
+    realise_date = Column(Date, default=datetime.utcnow().date(), index=True)
+    ratings_avg = Column(Float, default=0.0, index=True)
     ratings_sum = Column(Integer, default=0)
     ratings_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
 
-    reviews = relationship(
-        'Review', uselist=True, lazy='subquery', back_populates='movie'
-    )
+    reviews = relationship('Review', uselist=True, back_populates='movie')
 
     def __repr__(self) -> str:
         return f'movie: id={self.id}, title={self.title}, avg-rating={self.ratings_avg}'
@@ -43,6 +42,14 @@ class Movie(Base):
 
 class Review(Base):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # a user can review a movie only once
+        Index('ix_reviews_movie_id_user_id', 'movie_id', 'user_id', unique=True),
+        # reviews of a movie in the order they are paginated
+        Index('ix_reviews_movie_id_id', 'movie_id', 'id'),
+        # reviews of a user, counted and filtered by the admin
+        Index('ix_reviews_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     rating = Column(Integer, nullable=False)
@@ -50,13 +57,35 @@ class Review(Base):
     movie_id = Column(Integer, ForeignKey(Movie.id))
     user_id = Column(Integer, ForeignKey(User.id))
 
-    user = relationship(User, lazy='subquery', uselist=False, back_populates='reviews')
-    movie = relationship(
-        Movie, lazy='subquery', uselist=False, back_populates='reviews'
-    )
+    user = relationship(User, uselist=False, back_populates='reviews')
+    movie = relationship(Movie, uselist=False, back_populates='reviews')
 
     def __repr__(self) -> str:
         return (
             f'review: id={self.id}, user-id={self.user_id}, '
             f'movie-id={self.movie_id}, rating={self.rating}, comment={self.comment}'
         )
+
+
+class RatingCount(Base):
+    """
+    Number of reviews of a movie with a rating, maintained by
+    app.api.services.ratings
+    """
+
+    __tablename__ = 'rating_counts'
+
+    movie_id = Column(Integer, ForeignKey(Movie.id), primary_key=True)
+    rating = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class Version(Base):
+    """
+    Counters of changes of listings, see app.api.services.versions
+    """
+
+    __tablename__ = 'versions'
+
+    key = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
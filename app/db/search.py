@@ -0,0 +1,100 @@
+import sqlite3
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import column, event, table
+from sqlalchemy.engine import Connection, Engine
+
+from app.db import models
+
+# FTS5 index over movies.title, its content is read from the movies table
+movies_fts = table('movies_fts', column('rowid'), column('title'), column('rank'))
+
+CREATE_INDEX = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5('
+    "title, content='movies', content_rowid='id', tokenize='trigram')"
+)
+
+# triggers live on the movies table, so they are recreated whenever it is
+CREATE_TRIGGERS = (
+    'CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN '
+    'INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title); END',
+    'CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN '
+    "INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title); END",
+    'CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title ON movies BEGIN '
+    "INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title); "
+    'INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title); END',
+)
+
+# the trigram tokenizer can not match shorter strings
+MIN_QUERY_LENGTH = 3
+
+
+@lru_cache(maxsize=None)
+def _trigram_tokenizer_available() -> bool:
+    try:
+        with sqlite3.connect(':memory:') as connection:
+            connection.execute(
+                "CREATE VIRTUAL TABLE test USING fts5(title, tokenize='trigram')"
+            )
+    except sqlite3.OperationalError:
+        return False
+
+    return True
+
+
+def title_search_available(bind: Engine) -> bool:
+    """
+    :param bind: engine of the database
+    :return: whether movies can be searched with the FTS5 index
+    """
+
+    return bind.dialect.name == 'sqlite' and _trigram_tokenizer_available()
+
+
+def create_title_search(connection: Connection) -> None:
+    """
+    Creates the FTS5 index and the triggers keeping it in sync with movies.
+    Does nothing if the index is already there or is not supported
+
+    :param connection: connection to the database
+    """
+
+    if not title_search_available(connection.engine):
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+    ).first()
+
+    connection.exec_driver_sql(CREATE_INDEX)
+    for trigger in CREATE_TRIGGERS:
+        connection.exec_driver_sql(trigger)
+
+    if not exists:
+        # index titles of movies inserted before the index was created
+        connection.exec_driver_sql(
+            "INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')"
+        )
+
+
+def match_phrase(substr: str) -> str:
+    """
+    :param substr: searched substring
+    :return: FTS5 query matching the substring literally
+    """
+
+    escaped = substr.replace('"', '""')
+
+    return f'"{escaped}"'
+
+
+@event.listens_for(models.Movie.__table__, 'after_create')
+def _create_title_search(_target: Any, connection: Connection, **_: Any) -> None:
+    create_title_search(connection)
+
+
+@event.listens_for(models.Movie.__table__, 'before_drop')
+def _drop_title_search(_target: Any, connection: Connection, **_: Any) -> None:
+    if title_search_available(connection.engine):
+        connection.exec_driver_sql('DROP TABLE IF EXISTS movies_fts')
@@ -1,9 +1,12 @@
-from contextlib import contextmanager
-from typing import Any
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Union
 
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
 from sqlalchemy.orm.session import Session as SessionType
+from sqlalchemy.sql import Insert
 
-from app.db import Session
+from app.db import AsyncSession, Session
 
 
 @contextmanager
@@ -17,3 +20,92 @@ def create_session(**kwargs: Any) -> SessionType:
         raise
     finally:
         session.close()
+
+
+@contextmanager
+def use_session(session: Optional[SessionType] = None) -> Iterator[SessionType]:
+    """
+    Yields the session of the caller, which is rolled back on error and
+    committed by the caller, or a new session committed on exit
+    """
+
+    if session is None:
+        with create_session(expire_on_commit=False) as new_session:
+            yield new_session
+        return
+
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+
+
+@asynccontextmanager
+async def create_async_session(**kwargs: Any) -> AsyncIterator[AsyncSessionType]:
+    session = AsyncSession(**kwargs)
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def use_async_session(
+    session: Optional[AsyncSessionType] = None,
+) -> AsyncIterator[AsyncSessionType]:
+    """
+    Async version of ``use_session``
+    """
+
+    if session is None:
+        async with create_async_session() as new_session:
+            yield new_session
+        return
+
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+
+
+def upsert(
+    table: Any,
+    rows: list[dict[str, Any]],
+    index_elements: list[Any],
+    set_: Union[dict[str, Any], Callable[[Any], dict[str, Any]]],
+    dialect: str,
+) -> Insert:
+    """
+    :param table: model or table of the rows
+    :param rows: values of the inserted rows
+    :param index_elements: columns of the unique index, which rows may conflict on
+    :param set_: values of an already existing row, or a function building
+        them from the columns of the row, which was not inserted
+    :param dialect: name of the dialect of the database
+    :return: INSERT updating rows, which already exist
+    :raises ValueError: if the dialect has no upsert
+    """
+
+    if dialect == 'mysql':
+        mysql_statement = mysql.insert(table).values(rows)
+        return mysql_statement.on_duplicate_key_update(
+            set_(mysql_statement.inserted) if callable(set_) else set_
+        )
+
+    if dialect == 'postgresql':
+        statement = postgresql.insert(table).values(rows)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(table).values(rows)
+    else:
+        raise ValueError(f'upsert is not supported by {dialect} databases')
+
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=set_(statement.excluded) if callable(set_) else set_,
+    )
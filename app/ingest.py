@@ -0,0 +1,54 @@
+"""
+Bulk import of movies and reviews from NDJSON or CSV files::
+
+    python -m app.ingest movies.ndjson reviews.csv
+"""
+import argparse
+from pathlib import Path
+from typing import Optional
+
+from app.api.services import IngestService
+from app.api.services.ingest import BATCH_SIZE, CSV, FORMATS, MAX_BATCH_SIZE, NDJSON
+from app.db import create_bd
+
+
+def batch_size(value: str) -> int:
+    """
+    Type of ``--batch-size``, bounded as ``batch_size`` of the bulk endpoint
+
+    :raises ArgumentTypeError: if the size is out of 1..MAX_BATCH_SIZE
+    """
+
+    size = int(value)
+    if not 0 < size <= MAX_BATCH_SIZE:
+        raise argparse.ArgumentTypeError(f'must be from 1 to {MAX_BATCH_SIZE}')
+
+    return size
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Imports movies and reviews')
+    parser.add_argument('files', nargs='+', type=Path)
+    parser.add_argument(
+        '--format', choices=FORMATS, help='by default taken from the file extension'
+    )
+    parser.add_argument('--batch-size', type=batch_size, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    create_bd()
+
+    for path in args.files:
+        fmt = args.format or (CSV if path.suffix == '.csv' else NDJSON)
+
+        with path.open(newline='', encoding='utf-8') as file:
+            report = IngestService.import_lines(file, fmt, args.batch_size)
+
+        print(
+            f'{path}: {report.rows} rows, {report.movies} movies, '
+            f'{report.reviews} reviews, {report.duplicates} duplicates, '
+            f'{report.invalid} invalid, {report.rows_per_second:.0f} rows/s'
+        )
+
+
+if __name__ == '__main__':
+    main()
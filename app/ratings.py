@@ -0,0 +1,36 @@
+"""
+Rebuilds histograms of ratings of movies from their reviews::
+
+    python -m app.ratings [--movie-id 1 --movie-id 2]
+
+Histograms are maintained by the review services, the rebuild fixes them
+after reviews were changed or deleted directly in the database.
+"""
+import argparse
+from typing import Optional
+
+from app.api.services import RatingService
+from app.db import create_bd
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Rebuilds histograms of ratings')
+    parser.add_argument(
+        '--movie-id',
+        dest='movie_ids',
+        type=int,
+        action='append',
+        help='movie to rebuild, all movies by default',
+    )
+    args = parser.parse_args(argv)
+
+    create_bd()
+
+    RatingService.rebuild(args.movie_ids)
+
+    movies = len(args.movie_ids) if args.movie_ids else 'all'
+    print(f'histograms of {movies} movies were rebuilt')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compares results of two runs of benchmarks.load::
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Exits with 1 if a benchmark got slower than the threshold in percent.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+# lower is better for latencies, higher for throughput
+METRICS = {'throughput': 1, 'p50_ms': -1, 'p95_ms': -1, 'p99_ms': -1}
+
+
+def load_results(path: Path) -> dict[tuple[str, str], dict[str, Any]]:
+    results = json.loads(path.read_text())['results']
+
+    return {(result['kind'], result['name']): result for result in results}
+
+
+def change(before: float, after: float) -> float:
+    """
+    :return: change in percent
+    """
+
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(
+    before: dict[tuple[str, str], dict[str, Any]],
+    after: dict[tuple[str, str], dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """
+    :param threshold: change in percent, which is a regression
+    :return: lines of the report, regressions are marked with '!'
+    """
+
+    lines = []
+    for key in sorted(before.keys() & after.keys()):
+        changes = {
+            metric: change(before[key][metric], after[key][metric])
+            for metric in METRICS
+        }
+        regressed = any(
+            -METRICS[metric] * value > threshold for metric, value in changes.items()
+        )
+        lines.append(
+            f'{"!" if regressed else " "} {key[1]:<40} '
+            + ' '.join(f'{metric} {value:+6.1f}%' for metric, value in changes.items())
+        )
+
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compares two benchmark runs')
+    parser.add_argument('before', type=Path)
+    parser.add_argument('after', type=Path)
+    parser.add_argument('--threshold', type=float, default=10.0)
+    args = parser.parse_args()
+
+    lines = compare(load_results(args.before), load_results(args.after), args.threshold)
+    print('\n'.join(lines))
+
+    if any(line.startswith('!') for line in lines):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
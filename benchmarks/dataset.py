@@ -0,0 +1,229 @@
+"""
+Seeded synthetic catalog of users, movies and reviews::
+
+    python -m benchmarks.dataset bench.db --users 1000 --movies 10000 --reviews 100000
+
+Popularity of movies and activity of users follow a Zipf-like law, so a few
+movies get most of the reviews, as in a real catalog. The same size and seed
+always give the same rows.
+"""
+import argparse
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from itertools import accumulate
+from typing import Any, Iterator
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.api.services import SecurityService
+from app.db import Base, make_engine, models
+from app.db.migrations import upgrade
+
+# password of every generated user, users are named user0, user1, ...
+PASSWORD = 'bench'
+
+# words of titles, so substr searches find many movies
+WORDS = (
+    'night',
+    'star',
+    'love',
+    'war',
+    'city',
+    'dark',
+    'last',
+    'king',
+    'dream',
+    'river',
+    'ghost',
+    'summer',
+    'blood',
+    'road',
+    'house',
+    'secret',
+    'world',
+)
+COMMENTS = ('great', 'ok', 'boring', 'must see', 'not bad', 'awful', 'loved it')
+
+# rows per INSERT statement
+CHUNK_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    users: int = 1000
+    movies: int = 10000
+    reviews: int = 100000
+    seed: int = 42
+    # exponent of the Zipf-like law, 0 spreads reviews evenly
+    skew: float = 1.1
+
+
+def zipf_weights(count: int, skew: float, rng: random.Random) -> list[float]:
+    """
+    :return: cumulative weights of ``count`` items, ranks are shuffled,
+        so the popular items are not the first ones
+    """
+
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+
+    return list(accumulate(1 / rank**skew for rank in ranks))
+
+
+def sample_reviews(size: DatasetSize, rng: random.Random) -> dict[tuple[int, int], int]:
+    """
+    :return: ratings by unique (movie_id, user_id) pairs
+    :raises ValueError: if there are more reviews than pairs of users and movies
+    """
+
+    if size.reviews > size.users * size.movies:
+        raise ValueError('every user can review a movie only once')
+
+    movie_weights = zipf_weights(size.movies, size.skew, rng)
+    user_weights = zipf_weights(size.users, size.skew, rng)
+    # average rating of a movie, ratings of its reviews are spread around it
+    quality = [rng.uniform(3, 9) for _ in range(size.movies)]
+
+    reviews: dict[tuple[int, int], int] = {}
+    while len(reviews) < size.reviews:
+        batch = size.reviews - len(reviews)
+        movies = rng.choices(range(size.movies), cum_weights=movie_weights, k=batch)
+        users = rng.choices(range(size.users), cum_weights=user_weights, k=batch)
+
+        for movie, user in zip(movies, users):
+            rating = min(10, max(0, round(rng.gauss(quality[movie], 1.5))))
+            reviews.setdefault((movie + 1, user + 1), rating)
+
+    return reviews
+
+
+def user_rows(size: DatasetSize, rng: random.Random) -> Iterator[dict[str, Any]]:
+    for i in range(size.users):
+        salt = ''.join(rng.choices(WORDS, k=2))
+        yield {
+            'id': i + 1,
+            'name': f'user{i}',
+            'salt': salt,
+            'password': SecurityService.hash_password(PASSWORD, salt),
+        }
+
+
+def movie_rows(
+    size: DatasetSize, rng: random.Random, reviews: dict[tuple[int, int], int]
+) -> Iterator[dict[str, Any]]:
+    ratings: dict[int, list[int]] = defaultdict(list)
+    for (movie_id, _), rating in reviews.items():
+        ratings[movie_id].append(rating)
+
+    for i in range(size.movies):
+        movie_ratings = ratings[i + 1]
+        # more movies are realised in recent years
+        year = max(1920, 2022 - int(rng.expovariate(1 / 15)))
+
+        yield {
+            'id': i + 1,
+            'title': f'{" ".join(rng.sample(WORDS, 2))} {i}',
+            'realise_date': date(year, rng.randint(1, 12), rng.randint(1, 28)),
+            'ratings_sum': sum(movie_ratings),
+            'ratings_count': len(movie_ratings),
+            'comments_count': len(movie_ratings),
+            'ratings_avg': (
+                round(sum(movie_ratings) / len(movie_ratings), 1)
+                if movie_ratings
+                else 0.0
+            ),
+        }
+
+
+def review_rows(
+    reviews: dict[tuple[int, int], int], rng: random.Random
+) -> Iterator[dict[str, Any]]:
+    for (movie_id, user_id), rating in reviews.items():
+        yield {
+            'movie_id': movie_id,
+            'user_id': user_id,
+            'rating': rating,
+            'comment': rng.choice(COMMENTS),
+        }
+
+
+def generate(engine: Engine, size: DatasetSize) -> None:
+    """
+    Fills an empty database with the catalog, counters of movies match
+    their reviews
+
+    :param engine: engine of the database, its tables must be created
+    :param size: numbers of rows and the seed
+    """
+
+    rng = random.Random(size.seed)
+    reviews = sample_reviews(size, rng)
+
+    with engine.begin() as connection:
+        for model, rows in (
+            (models.User, user_rows(size, rng)),
+            (models.Movie, movie_rows(size, rng, reviews)),
+            (models.Review, review_rows(reviews, rng)),
+        ):
+            for chunk in chunked(rows):
+                connection.execute(insert(model), chunk)
+
+
+def chunked(rows: Iterator[dict[str, Any]]) -> Iterator[list[dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def create_catalog(url: str, size: DatasetSize) -> Engine:
+    """
+    :param url: url of an empty database
+    :param size: numbers of rows and the seed
+    :return: engine of the database with the catalog
+    """
+
+    engine = make_engine(url)
+    Base.metadata.create_all(engine)
+    upgrade(engine)
+    generate(engine, size)
+
+    return engine
+
+
+def add_size_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = DatasetSize()
+    for name in ('users', 'movies', 'reviews', 'seed'):
+        parser.add_argument(f'--{name}', type=int, default=getattr(defaults, name))
+    parser.add_argument('--skew', type=float, default=defaults.skew)
+
+
+def size_from_arguments(args: argparse.Namespace) -> DatasetSize:
+    return DatasetSize(
+        users=args.users,
+        movies=args.movies,
+        reviews=args.reviews,
+        seed=args.seed,
+        skew=args.skew,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Generates a synthetic catalog')
+    parser.add_argument('database', help='path of a new SQLite database')
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    create_catalog(f'sqlite:///{args.database}', size_from_arguments(args))
+
+
+if __name__ == '__main__':
+    main()
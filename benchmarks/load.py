@@ -0,0 +1,267 @@
+"""
+Throughput and latency of endpoints and services on a synthetic catalog::
+
+    python -m benchmarks.load --movies 10000 --reviews 100000 --output after.json
+    python -m benchmarks.compare before.json after.json
+
+Every benchmark runs ``--operations`` operations by ``--concurrency`` threads
+and reports operations per second and p50/p95/p99 latencies. Results are
+written as JSON together with the commit and the size of the catalog.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Optional
+
+import sqlalchemy
+from fastapi.testclient import TestClient
+from loguru import logger
+from sqlalchemy.engine import Engine
+
+from app.api import create_app
+from app.api.services import movie_queries
+from app.db import AsyncSession, Session, get_async_engine, make_engine
+from benchmarks.dataset import (
+    DatasetSize,
+    add_size_arguments,
+    create_catalog,
+    size_from_arguments,
+)
+from benchmarks.scenarios import (
+    Operation,
+    endpoint_operations,
+    load_catalog,
+    service_operations,
+)
+
+ENDPOINT = 'endpoint'
+SERVICE = 'service'
+
+# operations run before the measured ones
+WARMUP = 10
+
+
+@dataclass
+class Result:  # pylint: disable=too-many-instance-attributes
+    name: str
+    kind: str
+    operations: int
+    errors: int
+    seconds: float
+    throughput: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def summarize(
+    name: str, kind: str, latencies: list[float], errors: int, seconds: float
+) -> Result:
+    """
+    :param latencies: seconds of every operation
+    :param errors: number of failed operations
+    :param seconds: wall time of all operations
+    """
+
+    # 99 cut points, the n-th one is the n-th percentile
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+
+    return Result(
+        name=name,
+        kind=kind,
+        operations=len(latencies),
+        errors=errors,
+        seconds=round(seconds, 6),
+        throughput=round(len(latencies) / seconds, 2),
+        mean_ms=round(statistics.fmean(latencies) * 1000, 3),
+        p50_ms=round(percentiles[49] * 1000, 3),
+        p95_ms=round(percentiles[94] * 1000, 3),
+        p99_ms=round(percentiles[98] * 1000, 3),
+        max_ms=round(max(latencies) * 1000, 3),
+    )
+
+
+def measure(
+    # pylint: disable=too-many-arguments
+    name: str,
+    kind: str,
+    operation: Operation,
+    operations: int,
+    concurrency: int = 1,
+    cold: bool = False,
+) -> Result:
+    """
+    :param operation: called with the number of the operation, fails by raising
+    :param operations: number of measured operations, at least 2
+    :param concurrency: number of threads running the operations
+    :param cold: drop cached results of MovieService before every operation
+    :return: summary of the measured operations
+    """
+
+    def timed(i: int) -> tuple[float, bool]:
+        """
+        :return: seconds of the operation and whether it failed
+        """
+
+        if cold:
+            movie_queries.clear()
+
+        started = perf_counter()
+        try:
+            operation(i)
+        except Exception:  # pylint: disable=broad-except
+            return perf_counter() - started, True
+
+        return perf_counter() - started, False
+
+    for i in range(WARMUP):
+        operation(operations + i)
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, range(operations)))
+    seconds = perf_counter() - started
+
+    latencies = [latency for latency, _ in outcomes]
+    errors = sum(failed for _, failed in outcomes)
+
+    return summarize(name, kind, latencies, errors, seconds)
+
+
+def run(
+    engine: Engine,
+    operations: int,
+    concurrency: int = 1,
+    cold: bool = False,
+    async_mode: bool = False,
+) -> list[Result]:
+    """
+    Runs every benchmark against the catalog
+
+    :param engine: engine of a catalog made by benchmarks.dataset
+    :param operations: measured operations per benchmark
+    :param concurrency: number of threads running the operations
+    :param cold: drop cached results of MovieService before every operation
+    :param async_mode: serve the endpoints with the async routers
+    :return: results of the benchmarks
+    """
+
+    Session.configure(bind=engine)
+    if async_mode:
+        AsyncSession.configure(bind=get_async_engine(engine.url))
+
+    # a movie per write, in the warmup as well, for each of the two write benchmarks
+    catalog = load_catalog(engine, 2 * (operations + WARMUP))
+    client = TestClient(create_app(async_mode=async_mode))
+
+    benchmarks = [
+        (ENDPOINT, endpoint_operations(client, catalog)),
+        (SERVICE, service_operations(catalog, offset=operations + WARMUP)),
+    ]
+
+    return [
+        measure(name, kind, operation, operations, concurrency, cold)
+        for kind, named_operations in benchmarks
+        for name, operation in named_operations.items()
+    ]
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(
+    results: list[Result], size: DatasetSize, args: argparse.Namespace
+) -> dict[str, Any]:
+    """
+    :return: machine readable results with everything they depend on
+    """
+
+    return {
+        'meta': {
+            'commit': current_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'database': str(args.database) if args.database else None,
+            'dataset': None if args.database else asdict(size),
+            'operations': args.operations,
+            'concurrency': args.concurrency,
+            'cold': args.cold,
+            'async_mode': args.async_mode,
+        },
+        'results': [asdict(result) for result in results],
+    }
+
+
+def print_results(results: list[Result]) -> None:
+    print(f'{"benchmark":<40} {"ops/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+    for result in results:
+        print(
+            f'{result.name:<40} {result.throughput:>10.1f} {result.p50_ms:>9.3f} '
+            f'{result.p95_ms:>9.3f} {result.p99_ms:>9.3f}'
+            + (f'  {result.errors} errors' if result.errors else '')
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks endpoints and services')
+    add_size_arguments(parser)
+    parser.add_argument(
+        '--database', type=Path, help='catalog made by benchmarks.dataset'
+    )
+    parser.add_argument('--operations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument(
+        '--cold', action='store_true', help='disable MovieService cache'
+    )
+    parser.add_argument('--async-mode', action='store_true')
+    parser.add_argument('--output', type=Path, help='JSON file of the results')
+    args = parser.parse_args()
+
+    # logging of every request would be measured as well
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    size = size_from_arguments(args)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            engine = make_engine(f'sqlite:///{args.database}')
+        else:
+            engine = create_catalog(f'sqlite:///{directory}/catalog.db', size)
+
+        results = run(
+            engine, args.operations, args.concurrency, args.cold, args.async_mode
+        )
+        engine.dispose()
+
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(report(results, size, args), indent=2))
+
+    if any(result.errors for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Operations measured by benchmarks.load: requests of a reader and a reviewer
+to the endpoints and the same reads and writes done by calling the services
+directly. They refer to the catalog through Catalog, which load_catalog reads
+from a database made by benchmarks.dataset.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from fastapi.security import HTTPBasicCredentials
+from fastapi.testclient import TestClient
+from requests.auth import HTTPBasicAuth
+from sqlalchemy import desc, insert, select
+from sqlalchemy.engine import Engine
+
+from app.api import schemas
+from app.api.services import (
+    MovieService,
+    ReviewService,
+    SecurityService,
+    credentials_cache,
+)
+from app.db import models
+from benchmarks.dataset import PASSWORD, WORDS
+
+# users of the catalog reading movies and writing reviews
+READER = 'user0'
+REVIEWER = 'user1'
+
+Operation = Callable[[int], Any]
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """
+    Data of the catalog the benchmarks refer to
+    """
+
+    # the most reviewed movies
+    popular_movie_ids: list[int]
+    year: int
+    # movies without reviews, each one is reviewed by a write benchmark
+    new_movie_ids: list[int]
+    # user writing the reviews
+    reviewer_id: int
+
+
+def load_catalog(engine: Engine, new_movies: int) -> Catalog:
+    """
+    Reads the data the benchmarks refer to and adds movies for the write ones
+
+    :param engine: engine of the catalog
+    :param new_movies: number of movies added without reviews
+    """
+
+    with engine.begin() as connection:
+        popular = connection.execute(
+            select(models.Movie.id, models.Movie.realise_date)
+            .order_by(desc(models.Movie.ratings_count))
+            .limit(20)
+        ).all()
+
+        stamp = datetime.now(timezone.utc).timestamp()
+        titles = [f'benchmark {stamp} {i}' for i in range(new_movies)]
+        connection.execute(insert(models.Movie), [{'title': t} for t in titles])
+        new_movie_ids = connection.execute(
+            select(models.Movie.id)
+            .filter(models.Movie.title.in_(titles))
+            .order_by(models.Movie.id)
+        ).scalars()
+
+        reviewer_id = connection.execute(
+            select(models.User.id).filter(models.User.name == REVIEWER)
+        ).scalar_one()
+
+        return Catalog(
+            popular_movie_ids=[row.id for row in popular],
+            year=popular[0].realise_date.year,
+            new_movie_ids=list(new_movie_ids),
+            reviewer_id=reviewer_id,
+        )
+
+
+def endpoint_operations(client: TestClient, catalog: Catalog) -> dict[str, Operation]:
+    """
+    :return: requests of a reader and of a reviewer by benchmark names
+    """
+
+    reader = HTTPBasicAuth(READER, PASSWORD)
+    reviewer = HTTPBasicAuth(REVIEWER, PASSWORD)
+    popular = catalog.popular_movie_ids
+
+    def get(url: str) -> Callable[[int], Any]:
+        return lambda i: client.get(
+            url.format(movie_id=popular[i % len(popular)], word=WORDS[i % len(WORDS)]),
+            auth=reader,
+        ).raise_for_status()
+
+    def post_review(i: int) -> None:
+        client.post(
+            f'/movies/{catalog.new_movie_ids[i]}/reviews',
+            json={'rating': i % 11, 'comment': 'benchmark'},
+            auth=reviewer,
+        ).raise_for_status()
+
+    return {
+        'GET /movies/?top=10': get('/movies/?top=10'),
+        'GET /movies/?year=': get(f'/movies/?year={catalog.year}&limit=50'),
+        'GET /movies/?substr=': get('/movies/?substr={word}&limit=50'),
+        'GET /movies/?limit=100': get('/movies/?limit=100'),
+        'GET /movies/{id}/reviews': get('/movies/{movie_id}/reviews?limit=50'),
+        'GET /movies/{id}/similar': get('/movies/{movie_id}/similar'),
+        'POST /movies/{id}/reviews': post_review,
+    }
+
+
+def service_operations(catalog: Catalog, offset: int) -> dict[str, Operation]:
+    """
+    :param offset: number of new movies already reviewed by endpoints
+    :return: calls of services by benchmark names
+    """
+
+    credentials = HTTPBasicCredentials(username=READER, password=PASSWORD)
+    popular = catalog.popular_movie_ids
+
+    def authenticate(_: int) -> None:
+        # every call verifies the password
+        credentials_cache.clear()
+        SecurityService.authenticate_user(credentials)
+
+    return {
+        'MovieService.get_all(top=10)': lambda _: MovieService.get_all(top=10),
+        'MovieService.get_all(year=)': lambda _: MovieService.get_all(
+            year=catalog.year, limit=50
+        ),
+        'MovieService.find_by_id': lambda i: MovieService.find_by_id(
+            popular[i % len(popular)]
+        ),
+        'ReviewService.get_by_movie_id': lambda i: ReviewService.get_by_movie_id(
+            popular[i % len(popular)], limit=50
+        ),
+        'ReviewService.create': lambda i: ReviewService.create(
+            schemas.ReviewCreate(rating=i % 11, comment='benchmark'),
+            movie_id=catalog.new_movie_ids[offset + i],
+            user_id=catalog.reviewer_id,
+        ),
+        'SecurityService.authenticate_user': authenticate,
+    }
@@ -0,0 +1,116 @@
+"""
+Import time and cold start of a worker, every sample runs a new interpreter::
+
+    python -m benchmarks.startup --repeats 20 --output startup.json
+    python -m benchmarks.compare before.json startup.json
+
+The cold start imports the app, creates it and runs its startup and
+shutdown against a SQLite database, as a uvicorn worker does before
+serving the first request.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from benchmarks.load import Result, current_commit, print_results, summarize
+
+STARTUP = 'startup'
+
+# scripts printing the seconds they measured
+IMPORT = '''
+from time import perf_counter
+started = perf_counter()
+import app.api
+print(perf_counter() - started)
+'''
+COLD_START = '''
+import asyncio
+from time import perf_counter
+started = perf_counter()
+from app.api import create_app
+app = create_app()
+
+async def start():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(start())
+print(perf_counter() - started)
+'''
+
+SCRIPTS = {'import app.api': IMPORT, 'create_app + lifespan': COLD_START}
+
+
+def sample(script: str, database: Path) -> float:
+    """
+    :param script: script printing the measured seconds
+    :param database: path of the SQLite database of the app
+    :return: seconds measured by the script in a new interpreter
+    """
+
+    env = {**os.environ, 'KINOAPP_DATABASE_URI': f'sqlite:///{database}'}
+    output = subprocess.run(
+        [sys.executable, '-c', script],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+    return float(output.split()[-1])
+
+
+def run(repeats: int, database: Path) -> list[Result]:
+    """
+    :param repeats: measured samples per benchmark, at least 2
+    :param database: path of the SQLite database, the first unmeasured
+        sample creates it
+    """
+
+    results = []
+    for name, script in SCRIPTS.items():
+        # fills caches of compiled modules and the schema of the database
+        sample(script, database)
+        latencies = [sample(script, database) for _ in range(repeats)]
+        results.append(summarize(name, STARTUP, latencies, 0, sum(latencies)))
+
+    return results
+
+
+def report(results: list[Result], repeats: int) -> dict[str, Any]:
+    return {
+        'meta': {
+            'commit': current_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeats': repeats,
+        },
+        'results': [asdict(result) for result in results],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks startup of workers')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--output', type=Path, help='JSON file of the results')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.repeats, Path(directory) / 'startup.db')
+
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(report(results, args.repeats), indent=2))
+
+
+if __name__ == '__main__':
+    main()
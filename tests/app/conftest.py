@@ -2,12 +2,19 @@ from base64 import b64encode
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
-from app import app
 from app.admin import create_admin
-from app.api import schemas
-from app.api.services import MovieService, ReviewService, UserService
-from app.db import clear_db, create_bd
+from app.api import create_app, schemas
+from app.api.services import (
+    MovieService,
+    ReviewService,
+    UserService,
+    credentials_cache,
+    movie_queries,
+    similar_movies,
+)
+from app.db import clear_db, create_bd, engine_tests, get_async_engine
 
 
 @pytest.fixture(autouse=True)
@@ -17,11 +24,18 @@ def _init_db():
     yield
 
     clear_db(mode='TESTING')
+    credentials_cache.clear()
+    movie_queries.clear()
+    similar_movies.clear()
 
 
-@pytest.fixture
-def client():
-    _client = TestClient(app)
+@pytest.fixture(params=['sync', 'async'])
+def client(request):
+    if request.param == 'async':
+        create_bd(mode='TESTING', async_mode=True)
+        return TestClient(create_app(async_mode=True))
+
+    _client = TestClient(create_app(async_mode=False))
 
     return _client
 
@@ -49,6 +63,18 @@ def create_test_movie():
     return movie
 
 
+@pytest.fixture(name='users')
+def create_users():
+    """
+    Twenty users named user0, user1, ... for tests of concurrent reviews
+    """
+
+    return [
+        UserService.create(schemas.UserCreate(name=f'user{i}', password='test'))
+        for i in range(20)
+    ]
+
+
 @pytest.fixture(name='test_review')
 def create_test_review(test_movie, test_user):
     review = ReviewService.create(
@@ -62,7 +88,7 @@ def create_test_review(test_movie, test_user):
 
 @pytest.fixture
 def client_admin():
-    admin_app = create_admin()
+    admin_app = create_admin(mode='TESTING')
 
     admin_app.config.update(
         {
@@ -71,3 +97,45 @@ def client_admin():
     )
 
     return admin_app.test_client()
+
+
+@pytest.fixture
+def sql_statements():
+    """
+    Collects every SQL statement executed against the test database
+    """
+
+    statements = []
+    engines = [engine_tests, get_async_engine(engine_tests.url).sync_engine]
+
+    def before_cursor_execute(*args):
+        statements.append(args[2])
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    yield statements
+
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture()
+def connection_checkouts():
+    """
+    Counts connections checked out from the pools of the test database
+    """
+
+    checkouts = []
+    engines = [engine_tests, get_async_engine(engine_tests.url).sync_engine]
+
+    def checkout(*args):
+        checkouts.append(args[0])
+
+    for engine in engines:
+        event.listen(engine.pool, 'checkout', checkout)
+
+    yield checkouts
+
+    for engine in engines:
+        event.remove(engine.pool, 'checkout', checkout)
@@ -1,4 +1,72 @@
+import re
+
+import pytest
+
+from app.admin.views import admin_counts
+
+
+@pytest.fixture(autouse=True)
+def _clear_admin_counts():
+    yield
+
+    admin_counts.clear()
+
+
 def test_admin_reachability(client_admin):
     res = client_admin.get('/admin/')
 
     assert res.status_code == 200
+
+
+def cell(column, value):
+    """
+    :return: pattern of a table cell of the list view
+    """
+
+    return rf'<td class="col-{column}">\s*{re.escape(str(value))}\s*</td>'
+
+
+@pytest.mark.usefixtures('test_review')
+@pytest.mark.parametrize(
+    'view, column, value',
+    [
+        ('user', 'name', 'test'),
+        ('movie', 'title', 'test_movie'),
+        ('review', 'comment', 'ok'),
+    ],
+)
+def test_admin_lists(client_admin, view, column, value):
+    res = client_admin.get(f'/admin/{view}/')
+
+    assert res.status_code == 200
+    assert re.search(cell(column, value), res.text)
+
+
+@pytest.mark.usefixtures('test_review')
+def test_admin_users_list_counts_reviews(client_admin, sql_statements):
+    res = client_admin.get('/admin/user/')
+
+    assert res.status_code == 200
+    assert re.search(cell('reviews_count', 1), res.text)
+    reviews = [sql for sql in sql_statements if 'FROM reviews' in sql]
+    assert len(reviews) == 1
+    assert 'GROUP BY reviews.user_id' in reviews[0]
+
+
+@pytest.mark.usefixtures('test_review')
+def test_admin_counts_are_cached(client_admin, sql_statements):
+    client_admin.get('/admin/review/')
+    client_admin.get('/admin/review/')
+
+    counts = [sql for sql in sql_statements if 'sum(movies.ratings_count)' in sql]
+    assert len(counts) == 1
+    assert admin_counts.get('reviews') == 1
+
+
+def test_admin_filtered_list_is_not_counted(client_admin, test_review, sql_statements):
+    res = client_admin.get(f'/admin/review/?flt0_0={test_review.movie_id}')
+
+    assert res.status_code == 200
+    assert re.search(cell('comment', test_review.comment), res.text)
+    assert re.search(cell('movie_id', test_review.movie_id), res.text)
+    assert not [sql for sql in sql_statements if 'count(' in sql.lower()]
@@ -1,5 +1,15 @@
+import json
 from http import HTTPStatus
 
+import pytest
+from fastapi.testclient import TestClient
+
+from app import api
+from app.api import create_app, schemas
+from app.api.pagination import ORDER_BY_ID, encode_cursor
+from app.api.services import MovieService, review_writer
+from app.config import settings
+
 
 def test_no_credentials(client):
     res = client.get('/users')
@@ -39,6 +49,7 @@ def test_fetch_movies(client, test_user, test_movie):
     movies = res.json()
     assert len(movies) == 1
     assert movies[0].get('title') == test_movie.title
+    assert movies[0].get('ratings_avg') == '0.0'
 
 
 def test_create_movie(client, test_user):
@@ -80,3 +91,176 @@ def test_get_movie_reviews(client, test_review, test_user):
     assert revs[0].get('rating') == test_review.rating
     assert revs[0].get('comment') == test_review.comment
     assert revs[0].get('movie_id') == test_review.movie_id
+
+
+def test_fetch_movies_by_relevance(client, test_user):
+    for title in ('Alien 3', 'Alien', 'Aliens'):
+        client.post(
+            '/movies/',
+            json={'title': title},
+            headers={'Authorization': f'Basic {test_user.base64}'},
+        )
+
+    res = client.get(
+        '/movies/?substr=alien&relevance=true',
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert [movie.get('title') for movie in res.json()] == [
+        'Alien',
+        'Aliens',
+        'Alien 3',
+    ]
+
+
+def fetch_pages(client, user, url):
+    pages, cursor = [], None
+    while True:
+        res = client.get(
+            url + (f'&after={cursor}' if cursor else ''),
+            headers={'Authorization': f'Basic {user.base64}'},
+        )
+        pages.append([item['id'] for item in res.json()])
+        cursor = res.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return pages
+
+
+def test_fetch_movies_pages(client, test_user):
+    for i in range(5):
+        client.post(
+            '/movies/',
+            json={'title': f'movie {i}'},
+            headers={'Authorization': f'Basic {test_user.base64}'},
+        )
+
+    pages = fetch_pages(client, test_user, '/movies/?limit=2')
+
+    assert pages == [[1, 2], [3, 4], [5]]
+
+
+def test_fetch_top_movies_pages(client, test_user):
+    for i, rating in enumerate((3, 9, 3, 5)):
+        movie = client.post(
+            '/movies/',
+            json={'title': f'movie {i}'},
+            headers={'Authorization': f'Basic {test_user.base64}'},
+        ).json()
+        client.post(
+            f'/movies/{movie["id"]}/reviews',
+            json={'rating': rating, 'comment': 'ok'},
+            headers={'Authorization': f'Basic {test_user.base64}'},
+        )
+
+    # pages of a top end with its last row
+    assert fetch_pages(client, test_user, '/movies/?top=3&limit=2') == [[2, 4], [3]]
+    assert fetch_pages(client, test_user, '/movies/?top=2&limit=1') == [[2], [4]]
+    assert fetch_pages(client, test_user, '/movies/?top=2&limit=5') == [[2, 4]]
+    assert fetch_pages(client, test_user, '/movies/?top=2') == [[2, 4]]
+    assert fetch_pages(client, test_user, '/movies/?top=3&limit=2&offset=2') == [[3]]
+
+
+def test_fetch_users_and_reviews_pages(client, test_user, test_review):
+    client.post('/users/', json={'name': 'test2', 'password': 'test'})
+
+    assert fetch_pages(client, test_user, '/users/?limit=1') == [[1], [2], []]
+    assert fetch_pages(
+        client, test_user, f'/movies/{test_review.movie_id}/reviews?limit=1'
+    ) == [[test_review.id], []]
+
+
+@pytest.mark.parametrize('cursor', ['wrong', encode_cursor(ORDER_BY_ID, 'x')])
+def test_fetch_movies_invalid_cursor(client, test_user, cursor):
+    res = client.get(
+        f'/movies/?after={cursor}',
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert res.status_code == 400
+
+
+@pytest.mark.parametrize('year', [0, -1, 9999])
+def test_fetch_movies_invalid_year(client, test_user, year):
+    res = client.get(
+        f'/movies/?year={year}', headers={'Authorization': f'Basic {test_user.base64}'}
+    )
+
+    assert res.status_code == 422
+
+
+@pytest.mark.usefixtures('test_review')
+@pytest.mark.parametrize(
+    'url, expected_statements',
+    # listings of movies and reviews also read the version of the listing
+    [('/users/', 2), ('/movies/', 3), ('/movies/1/reviews', 3)],
+)
+def test_statements_per_endpoint(
+    client, test_user, sql_statements, url, expected_statements
+):
+    res = client.get(url, headers={'Authorization': f'Basic {test_user.base64}'})
+
+    assert res.status_code == 200
+    assert len(sql_statements) == expected_statements
+
+
+@pytest.mark.usefixtures('test_movie')
+def test_review_request_uses_one_connection(client, test_user, connection_checkouts):
+    res = client.post(
+        '/movies/1/reviews',
+        json={'rating': 5, 'comment': 'ok'},
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert res.status_code == 200
+    assert len(connection_checkouts) == 1
+
+
+def test_fast_listings_match_schemas(client, test_user, test_review):
+    headers = {'Authorization': f'Basic {test_user.base64}'}
+    movie = MovieService.find_by_id(test_review.movie_id)
+    assert movie is not None
+
+    movies = client.get('/movies/', headers=headers)
+    reviews = client.get(f'/movies/{movie.id}/reviews', headers=headers)
+
+    assert movies.json() == [json.loads(schemas.Movie.from_orm(movie).json())]
+    assert movies.json()[0]['ratings_avg'] == '5.0'
+    assert reviews.json() == [json.loads(schemas.Review.from_orm(test_review).json())]
+
+
+def test_fast_listings_keep_openapi_schema(client):
+    paths = client.get('/openapi.json').json()['paths']
+
+    movies = paths['/movies/']['get']['responses']['200']['content']
+    assert movies['application/json']['schema']['items'] == {
+        '$ref': '#/components/schemas/Movie'
+    }
+
+
+def test_get_movie_ratings(client, test_user, test_review):
+    auth = {'Authorization': f'Basic {test_user.base64}'}
+
+    res = client.get(f'/movies/{test_review.movie_id}/ratings', headers=auth)
+
+    assert res.status_code == 200
+    assert res.json() == {
+        'movie_id': test_review.movie_id,
+        'counts': [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+        'total': 1,
+    }
+    assert client.get('/movies/42/ratings', headers=auth).status_code == 404
+
+
+def test_lifespan_sets_up_database_and_writer(monkeypatch):
+    calls = []
+    monkeypatch.setattr(api, 'create_bd', lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(settings, 'review_group_commit', True)
+
+    app = create_app(async_mode=True)
+    assert not calls
+
+    with TestClient(app):
+        assert calls == [{'async_mode': True}]
+        assert review_writer.running
+
+    assert not review_writer.running
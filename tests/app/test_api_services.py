@@ -1,10 +1,33 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from fastapi.security import HTTPBasicCredentials
 from pydantic import ValidationError
 
+from app import ratings
 from app.api import schemas
-from app.api.exceptions import InvalidCredentials, ResourceAlreadyExists
-from app.api.services import MovieService, ReviewService, SecurityService, UserService
+from app.api.exceptions import (
+    InvalidCredentials,
+    ResourceAlreadyExists,
+    ResourceNotFound,
+)
+from app.api.services import (
+    MovieService,
+    RatingService,
+    ReviewBatchService,
+    ReviewService,
+    SecurityService,
+    UserService,
+    VersionService,
+    credentials_cache,
+)
+from app.api.services.aio import AsyncSecurityService
+from app.api.services.versions import CATALOG, reviews_key
+from app.config import settings
+from app.db import engine_tests, models
+from app.db.utils import create_session
 
 
 def test_get_all_users():
@@ -58,74 +81,69 @@ def test_authenticate_invalid_user(test_user):
         )
 
 
-def test_movie_get_all(test_movie):
-    movies = MovieService.get_all(offset=0, limit=1)
-
-    assert len(movies) == 1
-    assert movies[0].title == test_movie.title
-
-
-@pytest.mark.usefixtures('test_movie')
-@pytest.mark.parametrize('year, expected_len', [(2022, 1), (2024, 0), (2000, 0)])
-def test_movie_get_all_with_year_filter(year, expected_len):
-    movies = MovieService.get_all(year=year)
-
-    assert len(movies) == expected_len
-
-
-@pytest.mark.usefixtures('test_movie')
-@pytest.mark.parametrize('substr, expected_len', [('test', 1), ('te', 1), ('wrong', 0)])
-def test_movie_get_all_with_substr_filter(substr, expected_len):
-    movies = MovieService.get_all(substr=substr)
-
-    assert len(movies) == expected_len
+def test_movie_params(test_review):
+    movie = MovieService.find_by_id(test_review.movie_id)
 
+    assert movie
+    assert movie.ratings_avg == 5.0
+    assert movie.comments_count == 1
+    assert movie.ratings_count == 1
 
-@pytest.mark.usefixtures('test_movie')
-@pytest.mark.parametrize(
-    'page, page_size, expected_len', [(0, 1, 1), (1, 10, 0), (2, 2, 0)]
-)
-def test_movie_get_all_with_pagesize_page_filter(page, page_size, expected_len):
-    movies = MovieService.get_all(offset=page, limit=page_size)
 
-    assert len(movies) == expected_len
+def test_create_existing_review(test_review):
+    with pytest.raises(ResourceAlreadyExists):
+        ReviewService.create(
+            schemas.ReviewCreate(rating=5, comment='ok'),
+            test_review.movie_id,
+            test_review.user_id,
+        )
 
 
-def test_create_existing_movie(test_movie):
+def test_existing_review_keeps_movie_params(test_review):
     with pytest.raises(ResourceAlreadyExists):
-        MovieService.create(schemas.MovieCreate(title=test_movie.title))
+        ReviewService.create(
+            schemas.ReviewCreate(rating=10, comment='again'),
+            test_review.movie_id,
+            test_review.user_id,
+        )
 
+    movie = MovieService.find_by_id(test_review.movie_id)
 
-def test_find_movie_by_title(test_movie):
-    movie = MovieService.find_by_title(test_movie.title)
+    assert movie is not None
+    assert movie.ratings_count == 1
+    assert movie.ratings_sum == 5
 
-    assert movie
-    assert movie.title == test_movie.title
 
+def test_review_of_missing_movie(test_user):
+    with pytest.raises(ResourceNotFound):
+        ReviewService.create(
+            schemas.ReviewCreate(rating=5, comment='ok'),
+            movie_id=42,
+            user_id=test_user.id,
+        )
 
-def test_find_movie_by_id(test_movie):
-    movie = MovieService.find_by_id(test_movie.id)
+    assert not ReviewService.movie_reviewed_by_user(movie_id=42, user_id=test_user.id)
 
-    assert movie
-    assert movie.id == test_movie.id
 
+def test_concurrent_reviews_keep_movie_params(test_movie, users):
+    def review(i):
+        return ReviewService.create(
+            schemas.ReviewCreate(rating=i % 11, comment='ok'),
+            movie_id=test_movie.id,
+            user_id=users[i].id,
+        )
 
-def test_movie_params(test_review):
-    movie = MovieService.find_by_id(test_review.movie_id)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(review, range(len(users))))
 
-    assert movie
-    assert movie.ratings_avg == '5.0'
-    assert movie.comments_count == 1
-    assert movie.ratings_count == 1
+    movie = MovieService.find_by_id(test_movie.id)
+    ratings_sum = sum(i % 11 for i in range(len(users)))
 
-
-def test_create_existing_review(test_review):
-    with pytest.raises(ResourceAlreadyExists):
-        ReviewService.create(
-            schemas.ReviewCreate(rating=5, comment='ok'),
-            test_review.movie_id,
-            test_review.user_id,
-        )
+    assert movie is not None
+    assert movie.ratings_count == len(users)
+    assert movie.comments_count == len(users)
+    assert movie.ratings_sum == ratings_sum
+    assert movie.ratings_avg == pytest.approx(ratings_sum / len(users), abs=0.05)
 
 
 def test_get_by_movie_id(test_review):
@@ -148,29 +166,101 @@ def test_invalid_rating_for_review(test_user, test_movie):
         )
 
 
-def test_get_top_movies(test_user, test_movie):
-    test_movie2 = MovieService.create(schemas.MovieCreate(title='test2'))
+def test_authenticate_user_uses_credentials_cache(test_user, monkeypatch):
+    credentials = HTTPBasicCredentials(
+        username=test_user.name, password=test_user.password_not_hashed
+    )
+    SecurityService.authenticate_user(credentials)
+
+    def fail(*_, **__):
+        raise AssertionError('credentials cache was bypassed')
+
+    monkeypatch.setattr(UserService, 'find_by_name', fail)
+    monkeypatch.setattr(SecurityService, 'hash_password', fail)
+    SecurityService.authenticate_user(credentials)
+
+    assert credentials_cache.hits == 1
+
+
+def test_credentials_cache_configured_from_settings():
+    assert credentials_cache.maxsize == settings.credentials_cache_size
+    assert credentials_cache.ttl == settings.credentials_cache_ttl
+
 
+def test_credentials_cache_invalidated_on_user_change(test_user):
+    credentials = HTTPBasicCredentials(
+        username=test_user.name, password=test_user.password_not_hashed
+    )
+    SecurityService.authenticate_user(credentials)
+
+    with create_session() as session:
+        user = session.query(models.User).filter(models.User.id == test_user.id).one()
+        user.salt = 'changed'
+
+    assert credentials_cache.stats['size'] == 0
+    with pytest.raises(InvalidCredentials):
+        SecurityService.authenticate_user(credentials)
+
+
+def test_async_hash_password_runs_in_executor(monkeypatch):
+    threads = []
+    hash_password = SecurityService.hash_password
+
+    def tracked_hash_password(password, salt):
+        threads.append(threading.current_thread().name)
+        return hash_password(password, salt)
+
+    monkeypatch.setattr(SecurityService, 'hash_password', tracked_hash_password)
+    hashed = asyncio.run(AsyncSecurityService.hash_password('test', 'salt'))
+
+    assert hashed == hash_password('test', 'salt')
+    assert threads[0].startswith('hash')
+
+
+def test_versions_bumped_by_changes(test_review):
+    keys = [CATALOG, reviews_key(test_review.movie_id)]
+    versions = VersionService.get(keys)
+    assert versions == {CATALOG: 2, reviews_key(test_review.movie_id): 1}
+
+    with create_session() as session:
+        session.get(models.Review, test_review.id).comment = 'edited'
+
+    assert VersionService.get(keys) == {
+        key: version + 1 for key, version in versions.items()
+    }
+
+
+def test_rating_histogram_follows_reviews(test_user, test_review):
+    other = MovieService.create(schemas.MovieCreate(title='other'))
+    user = UserService.create(schemas.UserCreate(name='other', password='test'))
     ReviewService.create(
-        schemas.ReviewCreate(rating=10, comment='ok'),
+        schemas.ReviewCreate(rating=5, comment='ok'), test_review.movie_id, user.id
+    )
+    ReviewBatchService.create_many(
+        [schemas.ReviewBatchItem(movie_id=other.id, rating=10, comment='ok')],
         user_id=test_user.id,
-        movie_id=test_movie2.id,
     )
 
-    movies = MovieService.get_all(top=2)
-
-    assert movies
-    assert len(movies) == 2
-    assert movies[0].title == test_movie2.title
-    assert movies[1].title == test_movie.title
+    assert RatingService.get_histogram(test_review.movie_id).counts[5] == 2
+    assert RatingService.get_histogram(other.id).counts == [0] * 10 + [1]
+    assert (
+        RatingService.get_histogram(
+            MovieService.create(schemas.MovieCreate(title='new')).id
+        ).total
+        == 0
+    )
+    with pytest.raises(ResourceNotFound):
+        RatingService.get_histogram(42)
 
 
-@pytest.mark.parametrize('limit, expected', [(1, 1), (2, 2), (3, 3)])
-def test_get_all_movies_limit(limit, expected):
-    MovieService.create(schemas.MovieCreate(title='test_1'))
-    MovieService.create(schemas.MovieCreate(title='test_2'))
-    MovieService.create(schemas.MovieCreate(title='test_3'))
+def test_rebuild_rating_histograms(test_review, monkeypatch, capsys):
+    with engine_tests.begin() as connection:
+        connection.exec_driver_sql('UPDATE reviews SET rating = 9')
+    assert RatingService.get_histogram(test_review.movie_id).counts[5] == 1
 
-    movies = MovieService.get_all(limit=limit)
+    monkeypatch.setattr(ratings, 'create_bd', lambda: None)
+    ratings.main(['--movie-id', str(test_review.movie_id)])
 
-    assert len(movies) == expected
+    assert '1 movies' in capsys.readouterr().out
+    histogram = RatingService.get_histogram(test_review.movie_id)
+    assert (histogram.counts[5], histogram.counts[9], histogram.total) == (0, 1, 1)
@@ -0,0 +1,63 @@
+import pytest
+
+from app.api import schemas
+from app.api.services import MovieService, ReviewBatchService
+
+
+def test_create_many_reviews_in_one_insert(test_user, sql_statements):
+    movies = [MovieService.create(schemas.MovieCreate(title=f'm{i}')) for i in range(3)]
+    sql_statements.clear()
+
+    results = ReviewBatchService.create_many(
+        [
+            schemas.ReviewBatchItem(movie_id=movie.id, rating=i, comment='ok')
+            for i, movie in enumerate(movies)
+        ],
+        user_id=test_user.id,
+    )
+
+    assert [result.status for result in results] == [201] * 3
+    reviews = [result.review for result in results]
+    assert [review.rating for review in reviews if review is not None] == [0, 1, 2]
+    inserts = [sql for sql in sql_statements if sql.startswith('INSERT INTO reviews')]
+    updates = [sql for sql in sql_statements if sql.startswith('UPDATE movies')]
+    assert (len(inserts), len(updates)) == (1, 3)
+
+
+def test_create_reviews_batch(client, test_user, test_review):
+    other = MovieService.create(schemas.MovieCreate(title='other'))
+
+    res = client.post(
+        '/movies/reviews/batch',
+        json=[
+            {'movie_id': other.id, 'rating': 8, 'comment': 'good'},
+            {'movie_id': 42, 'rating': 8, 'comment': 'missing'},
+            {'movie_id': test_review.movie_id, 'rating': 1, 'comment': 'again'},
+            {'movie_id': other.id, 'rating': 2, 'comment': 'twice'},
+        ],
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert res.status_code == 200
+    results = res.json()
+    assert [result['status'] for result in results] == [201, 404, 409, 409]
+    assert results[0]['review']['comment'] == 'good'
+    assert results[0]['review']['user_id'] == test_user.id
+
+    movie = MovieService.find_by_id(other.id)
+    assert movie is not None
+    assert (movie.ratings_count, movie.ratings_avg) == (1, 8.0)
+
+
+@pytest.mark.parametrize(
+    'body',
+    [[], [{'movie_id': 1, 'rating': 11, 'comment': 'bad'}]],
+)
+def test_create_reviews_batch_invalid(client, test_user, body):
+    res = client.post(
+        '/movies/reviews/batch',
+        json=body,
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert res.status_code == 422
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db import engine_tests, models
+from app.db.utils import create_session
+from benchmarks import compare, dataset, load, startup
+
+
+def test_dataset_is_seeded_and_skewed():
+    size = dataset.DatasetSize(users=20, movies=50, reviews=300, seed=7)
+
+    reviews = dataset.sample_reviews(size, random.Random(size.seed))
+
+    assert reviews == dataset.sample_reviews(size, random.Random(size.seed))
+    assert len(reviews) == 300
+
+    per_movie = sorted(
+        (sum(movie == movie_id for movie, _ in reviews) for movie_id in range(1, 51)),
+        reverse=True,
+    )
+    # the most popular tenth of movies gets much more than a tenth of reviews
+    assert sum(per_movie[:5]) > 0.2 * len(reviews)
+
+
+def test_dataset_too_many_reviews():
+    with pytest.raises(ValueError):
+        dataset.sample_reviews(
+            dataset.DatasetSize(users=2, movies=2, reviews=5), random.Random()
+        )
+
+
+def test_generated_counters_match_reviews():
+    dataset.generate(engine_tests, dataset.DatasetSize(users=5, movies=10, reviews=30))
+
+    with create_session() as session:
+        counts = dict(
+            session.execute(
+                select(models.Review.movie_id, func.count()).group_by(
+                    models.Review.movie_id
+                )
+            ).all()
+        )
+        movies = session.execute(select(models.Movie)).scalars().all()
+
+        assert sum(counts.values()) == 30
+        for movie in movies:
+            assert movie.ratings_count == counts.get(movie.id, 0)
+
+
+def test_summarize_percentiles():
+    result = load.summarize('a', load.SERVICE, [i / 1000 for i in range(1, 101)], 0, 1)
+
+    assert (result.p50_ms, result.p99_ms, result.max_ms) == (50.5, 99.01, 100)
+    assert result.throughput == 100
+
+
+def test_measure_counts_errors_of_threads():
+    def operation(i):
+        # the warmup operations are numbered after the measured ones
+        if i < 100 and i % 2:
+            raise ValueError(i)
+
+    result = load.measure('a', load.SERVICE, operation, 100, concurrency=4)
+
+    assert (result.operations, result.errors) == (100, 50)
+
+
+def test_compare_marks_regressions():
+    before = {
+        ('service', 'a'): {'throughput': 100, 'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30}
+    }
+    after = {
+        ('service', 'a'): {'throughput': 100, 'p50_ms': 12, 'p95_ms': 20, 'p99_ms': 30}
+    }
+
+    assert compare.compare(before, after, threshold=10)[0].startswith('!')
+    assert compare.compare(before, after, threshold=30)[0].startswith(' ')
+
+
+def test_import_does_not_touch_database(tmp_path):
+    database = tmp_path / 'startup.db'
+
+    seconds = startup.sample('import app, app.api, app.admin; print(0.5)', database)
+
+    assert seconds == 0.5
+    assert not database.exists()
+
+    startup.sample(startup.COLD_START, database)
+    assert database.exists()
@@ -0,0 +1,62 @@
+import time
+
+from app.api.cache import QueryCache, TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.stats == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_cache_entry_expires(monkeypatch):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+
+    now = time.monotonic()
+    monkeypatch.setattr('app.api.cache.time.monotonic', lambda: now + 11)
+
+    assert cache.get('a') is None
+    assert cache.stats['size'] == 0
+
+
+def test_cache_invalidate_where():
+    cache = TTLCache()
+    cache.set('a', 'user1')
+    cache.set('b', 'user2')
+    cache.set('c', 'user1')
+
+    removed = cache.invalidate_where(lambda _, value: value == 'user1')
+    cache.invalidate('b')
+
+    assert removed == 2
+    assert cache.stats['size'] == 0
+
+
+def test_query_cache_drops_result_loaded_during_invalidation():
+    cache = QueryCache(TTLCache())
+
+    generation = cache.generation
+    cache.invalidate_where(lambda *_: True)
+    cache.set('a', 1, generation)
+    cache.set('b', 2, cache.generation)
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert cache.stats['hit_rate'] == 0.5
@@ -0,0 +1,76 @@
+import pytest
+
+from app.api import schemas
+from app.api.services import MovieService, ReviewService, UserService, movie_cache
+
+
+@pytest.mark.usefixtures('test_review')
+@pytest.mark.parametrize('url', ['/movies/', '/movies/1/reviews'])
+def test_listing_not_modified(client, test_user, sql_statements, url):
+    headers = {'Authorization': f'Basic {test_user.base64}'}
+    etag = client.get(url, headers=headers).headers['ETag']
+
+    sql_statements.clear()
+    res = client.get(url, headers={**headers, 'If-None-Match': etag})
+
+    assert res.status_code == 304
+    assert res.headers['ETag'] == etag
+    assert res.content == b''
+    assert len(sql_statements) == 1
+    assert 'FROM versions' in sql_statements[0]
+
+
+def test_listing_etag_changes_with_data(client, test_user, test_review):
+    headers = {'Authorization': f'Basic {test_user.base64}'}
+    movies_etag = client.get('/movies/', headers=headers).headers['ETag']
+    reviews_etag = client.get('/movies/1/reviews', headers=headers).headers['ETag']
+
+    other = UserService.create(schemas.UserCreate(name='other', password='other'))
+    ReviewService.create(
+        schemas.ReviewCreate(rating=1, comment='bad'),
+        movie_id=test_review.movie_id,
+        user_id=other.id,
+    )
+
+    for url, etag in [('/movies/', movies_etag), ('/movies/1/reviews', reviews_etag)]:
+        res = client.get(url, headers={**headers, 'If-None-Match': etag})
+        assert res.status_code == 200
+        assert res.headers['ETag'] != etag
+
+    MovieService.create(schemas.MovieCreate(title='new'))
+    res = client.get('/movies/', headers={**headers, 'If-None-Match': movies_etag})
+    assert res.status_code == 200
+
+
+def test_listing_etag_matches_data_of_other_processes(
+    client, test_user, test_movie, monkeypatch
+):
+    headers = {'Authorization': f'Basic {test_user.base64}'}
+    etag = client.get('/movies/', headers=headers).headers['ETag']
+
+    # another process commits the review, the cache of this one is not invalidated
+    monkeypatch.setattr(movie_cache, 'invalidate_movies', lambda *_, **__: 0)
+    ReviewService.create(
+        schemas.ReviewCreate(rating=7, comment='ok'),
+        movie_id=test_movie.id,
+        user_id=test_user.id,
+    )
+    res = client.get('/movies/', headers={**headers, 'If-None-Match': etag})
+
+    assert res.status_code == 200
+    assert res.headers['ETag'] != etag
+    assert res.json()[0]['ratings_count'] == 1
+    movie = MovieService.find_by_id(test_movie.id)
+    assert movie is not None
+    assert movie.ratings_count == 1
+
+
+@pytest.mark.usefixtures('test_movie')
+def test_listing_etag_depends_on_query(client, test_user):
+    headers = {'Authorization': f'Basic {test_user.base64}'}
+    etag = client.get('/movies/', headers=headers).headers['ETag']
+
+    res = client.get('/movies/?limit=1', headers={**headers, 'If-None-Match': etag})
+
+    assert res.status_code == 200
+    assert res.headers['ETag'] != etag
@@ -1,10 +1,214 @@
 import pytest
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm.exc import UnmappedInstanceError
+from sqlalchemy.pool import NullPool, QueuePool
 
-from app.db.utils import create_session
+from app import db
+from app.config import Settings
+from app.db import create_bd, engine_tests, get_async_url, make_engine
+from app.db.models import Movie, RatingCount, Review, Version
+from app.db.utils import create_session, upsert
 
 
 def test_create_session_invalid_entity():
     with pytest.raises(UnmappedInstanceError):
         with create_session() as session:
             session.add('tet')
+
+
+def test_create_bd_adds_missing_indexes():
+    with engine_tests.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX ix_reviews_movie_id_user_id')
+
+    create_bd(mode='TESTING')
+
+    indexes = {
+        index['name']: index for index in inspect(engine_tests).get_indexes('reviews')
+    }
+    assert indexes['ix_reviews_movie_id_user_id']['column_names'] == [
+        'movie_id',
+        'user_id',
+    ]
+    assert indexes['ix_reviews_movie_id_user_id']['unique']
+
+
+def test_create_bd_removes_duplicate_reviews(test_review):
+    with engine_tests.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX ix_reviews_movie_id_user_id')
+        for rating in (9, 8):
+            connection.exec_driver_sql(
+                'INSERT INTO reviews (rating, comment, movie_id, user_id) '
+                f"VALUES ({rating}, 'again', {test_review.movie_id}, "
+                f'{test_review.user_id})'
+            )
+        connection.exec_driver_sql(
+            'UPDATE movies SET ratings_sum = 22, ratings_count = 3, '
+            'comments_count = 3, ratings_avg = 7.3'
+        )
+
+    create_bd(mode='TESTING')
+
+    with create_session() as session:
+        assert [review.id for review in session.query(Review)] == [test_review.id]
+
+        movie = session.get(Movie, test_review.movie_id)
+        assert (movie.ratings_sum, movie.ratings_count, movie.comments_count) == (
+            5,
+            1,
+            1,
+        )
+        assert movie.ratings_avg == 5.0
+
+
+def test_create_bd_converts_string_ratings_avg():
+    with engine_tests.begin() as connection:
+        connection.exec_driver_sql('DROP TABLE movies')
+        connection.exec_driver_sql(
+            'CREATE TABLE movies (id INTEGER NOT NULL, title VARCHAR(50) NOT NULL, '
+            'realise_date DATE, ratings_avg VARCHAR(4), ratings_sum INTEGER, '
+            'ratings_count INTEGER, comments_count INTEGER, PRIMARY KEY (id), '
+            'UNIQUE (title))'
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO movies VALUES (1, 'old', '2022-04-01', '7.5', 15, 2, 2)"
+        )
+
+    create_bd(mode='TESTING')
+
+    with create_session() as session:
+        movie = session.query(Movie).one()
+        assert movie.ratings_avg == 7.5
+        assert movie.ratings_sum == 15
+
+    indexes = [index['name'] for index in inspect(engine_tests).get_indexes('movies')]
+    assert 'ix_movies_ratings_avg' in indexes
+
+
+def test_one_engine_per_database():
+    assert db.get_engine() is db.get_engine(None) is db.engine
+    assert db.get_engine('TESTING') is db.engine_tests
+    # the tests bind the sessions in create_bd(mode='TESTING')
+    with db.Session() as session:
+        assert session.get_bind() is db.engine_tests
+
+
+def test_sqlite_connections_use_pragmas():
+    with engine_tests.connect() as connection:
+
+        def pragma(name):
+            return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1
+        assert pragma('busy_timeout') == 5000
+        assert pragma('cache_size') == -64000
+
+
+def test_make_engine_with_pool_settings(tmp_path):
+    config = Settings(pool_size=3, max_overflow=2, pool_recycle=60)
+
+    new_engine = make_engine(f'sqlite:///{tmp_path / "pool.db"}', config)
+
+    assert isinstance(new_engine.pool, QueuePool)
+    assert new_engine.pool.size() == 3
+    assert new_engine.pool._max_overflow == 2  # pylint: disable=protected-access
+    assert new_engine.pool._recycle == 60  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize(
+    'config, pool',
+    [(Settings(), QueuePool), (Settings(pool_size=0), NullPool)],
+)
+def test_make_engine_pools_file_databases(tmp_path, config, pool):
+    new_engine = make_engine(f'sqlite:///{tmp_path / "pool.db"}', config)
+
+    assert isinstance(new_engine.pool, pool)
+
+
+def test_make_engine_keeps_pool_of_memory_database():
+    new_engine = make_engine('sqlite://', Settings(pool_size=3))
+
+    assert not isinstance(new_engine.pool, (QueuePool, NullPool))
+
+
+def test_pooled_connections_are_reused(tmp_path):
+    new_engine = make_engine(f'sqlite:///{tmp_path / "pool.db"}')
+    connects = []
+    event.listen(new_engine, 'connect', lambda *_: connects.append(1))
+
+    for _ in range(10):
+        with new_engine.connect() as connection:
+            connection.exec_driver_sql('SELECT 1')
+
+    # pragmas run once per connection
+    assert len(connects) == 1
+
+
+@pytest.mark.parametrize(
+    'url, async_url',
+    [
+        ('sqlite:///app/db/primary.db', 'sqlite+aiosqlite:///app/db/primary.db'),
+        ('postgresql+psycopg2://kino@db/kino', 'postgresql+asyncpg://kino@db/kino'),
+        ('mysql://kino@db/kino', 'mysql+aiomysql://kino@db/kino'),
+    ],
+)
+def test_get_async_url(url, async_url):
+    assert str(get_async_url(make_url(url))) == async_url
+
+
+def test_get_async_url_unsupported_backend():
+    with pytest.raises(ValueError, match='oracle'):
+        get_async_url(make_url('oracle://kino@db/kino'))
+
+
+@pytest.mark.parametrize(
+    'dialect, clause',
+    [
+        (sqlite.dialect(), 'DO UPDATE SET value'),
+        (postgresql.dialect(), 'DO UPDATE SET value'),
+        (mysql.dialect(), 'ON DUPLICATE KEY UPDATE value'),
+    ],
+)
+def test_upsert(dialect, clause):
+    statement = upsert(
+        Version,
+        [{'key': 'movies', 'value': 1}],
+        index_elements=[Version.key],
+        set_={'value': Version.value + 1},
+        dialect=dialect.name,
+    )
+
+    assert clause in str(statement.compile(dialect=dialect))
+
+
+def test_upsert_with_values_of_conflicting_row():
+    statement = upsert(
+        RatingCount,
+        [{'movie_id': 1, 'rating': 5, 'count': 2}],
+        index_elements=[RatingCount.movie_id, RatingCount.rating],
+        set_=lambda new: {'count': RatingCount.count + new['count']},
+        dialect='sqlite',
+    )
+
+    assert 'count = (rating_counts.count + excluded.count)' in str(
+        statement.compile(dialect=sqlite.dialect())
+    )
+
+
+def test_create_bd_counts_ratings_of_existing_reviews(test_review):
+    with engine_tests.begin() as connection:
+        connection.exec_driver_sql('DELETE FROM rating_counts')
+
+    create_bd(mode='TESTING')
+
+    with create_session() as session:
+        assert [
+            (row.movie_id, row.rating, row.count) for row in session.query(RatingCount)
+        ] == [(test_review.movie_id, 5, 1)]
+
+
+def test_upsert_unsupported_dialect():
+    with pytest.raises(ValueError, match='oracle'):
+        upsert(Version, [], index_elements=[], set_={}, dialect='oracle')
@@ -0,0 +1,177 @@
+import json
+
+import pytest
+
+from app import ingest
+from app.api.services import IngestService, MovieService, RatingService, VersionService
+from app.api.services.ingest import CSV, MAX_BATCH_SIZE
+from app.api.services.versions import CATALOG, reviews_key
+from app.db import models
+from app.db.utils import create_session
+
+
+def ndjson(*rows):
+    return [json.dumps(row) + '\n' for row in rows]
+
+
+def test_import_movies_and_reviews(test_user):
+    report = IngestService.import_lines(
+        ndjson(
+            {'title': 'first', 'realise_date': '2001-02-03'},
+            {'title': 'second'},
+            {'title': 'first', 'rating': 4, 'user': test_user.name},
+            {'title': 'second', 'rating': 7, 'user': test_user.name, 'comment': 'ok'},
+        )
+    )
+
+    assert (report.rows, report.movies, report.reviews) == (4, 2, 2)
+    assert report.rows_per_second > 0
+
+    first = MovieService.find_by_title('first')
+    assert first is not None
+    assert str(first.realise_date) == '2001-02-03'
+    assert VersionService.get([CATALOG, reviews_key(first.id)]) == {
+        CATALOG: 2,
+        reviews_key(first.id): 1,
+    }
+    assert (first.ratings_count, first.ratings_sum, first.ratings_avg) == (1, 4, 4.0)
+
+
+def test_import_skips_duplicates_and_invalid_rows(test_review, test_user):
+    report = IngestService.import_lines(
+        ndjson(
+            {'title': 'test_movie'},
+            {'title': 'new'},
+            {'title': 'new'},
+            {'title': 'test_movie', 'rating': 1, 'user': test_user.name},
+            {'title': 'new', 'rating': 11, 'user': test_user.name},
+            {'title': 'new', 'rating': 3, 'user': 'nobody'},
+            {'title': 'new', 'rating': 3, 'user': test_user.name},
+            {'title': 'new', 'rating': 9, 'user': test_user.name},
+        )
+        + ['{broken\n', '\n'],
+        batch_size=3,
+    )
+
+    assert (report.rows, report.movies, report.reviews) == (9, 1, 1)
+    assert (report.duplicates, report.invalid) == (4, 3)
+
+    movie = MovieService.find_by_id(test_review.movie_id)
+    assert movie is not None
+    assert (movie.ratings_count, movie.ratings_sum) == (1, test_review.rating)
+
+    new = MovieService.find_by_title('new')
+    assert new is not None
+    assert (new.ratings_count, new.ratings_sum) == (1, 3)
+
+
+def test_import_csv(test_user):
+    report = IngestService.import_lines(
+        [
+            'title,realise_date,rating,user,comment\n',
+            'csv movie,2010-01-01,,,\n',
+            f'csv movie,,8,{test_user.name},"multi\n',
+            'line"\n',
+        ],
+        fmt=CSV,
+    )
+
+    assert (report.movies, report.reviews, report.invalid) == (1, 1, 0)
+
+    with create_session() as session:
+        assert session.query(models.Review.comment).scalar() == 'multi\nline'
+
+
+def test_import_reviews_with_one_update_per_movie(test_movie, sql_statements):
+    users = [models.User(name=f'user{i}', password='', salt='') for i in range(5)]
+    with create_session() as session:
+        session.add_all(users)
+
+    sql_statements.clear()
+    IngestService.import_lines(
+        ndjson(
+            *(
+                {'title': test_movie.title, 'rating': 2, 'user': f'user{i}'}
+                for i in range(5)
+            )
+        )
+    )
+
+    updates = [sql for sql in sql_statements if sql.startswith('UPDATE movies')]
+    assert len(updates) == 1
+
+    movie = MovieService.find_by_id(test_movie.id)
+    assert movie is not None
+    assert (movie.ratings_count, movie.ratings_avg) == (5, 2.0)
+    assert RatingService.get_histogram(test_movie.id).counts[2] == 5
+
+
+@pytest.mark.parametrize(
+    'content_type, body',
+    [
+        ('application/x-ndjson', '{"title": "a"}\n{"title": "b"}'),
+        ('text/csv; charset=utf-8', 'title\na\nb\n'),
+    ],
+)
+def test_bulk_endpoint(client, test_user, content_type, body):
+    res = client.post(
+        '/movies/bulk',
+        data=body,
+        headers={
+            'Authorization': f'Basic {test_user.base64}',
+            'Content-Type': content_type,
+        },
+    )
+
+    assert res.status_code == 200
+    assert res.json()['movies'] == 2
+    assert MovieService.find_by_title('b')
+
+
+def test_bulk_endpoint_unsupported_media_type(client, test_user):
+    res = client.post(
+        '/movies/bulk',
+        data='<movies/>',
+        headers={
+            'Authorization': f'Basic {test_user.base64}',
+            'Content-Type': 'application/xml',
+        },
+    )
+
+    assert res.status_code == 415
+
+
+@pytest.mark.parametrize('batch_size', [0, MAX_BATCH_SIZE + 1])
+def test_bulk_endpoint_invalid_batch_size(client, test_user, batch_size):
+    res = client.post(
+        f'/movies/bulk?batch_size={batch_size}',
+        data='{"title": "a"}',
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert res.status_code == 422
+    assert MovieService.find_by_title('a') is None
+
+
+def test_ingest_cli(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'movies.csv'
+    path.write_text('title\ncli movie\n')
+    monkeypatch.setattr(ingest, 'create_bd', lambda: None)
+
+    ingest.main([str(path)])
+
+    assert '1 movies' in capsys.readouterr().out
+    assert MovieService.find_by_title('cli movie')
+
+
+@pytest.mark.parametrize('batch_size', ['0', str(MAX_BATCH_SIZE + 1), 'many'])
+def test_ingest_cli_invalid_batch_size(tmp_path, monkeypatch, capsys, batch_size):
+    path = tmp_path / 'movies.csv'
+    path.write_text('title\ncli movie\n')
+    monkeypatch.setattr(ingest, 'create_bd', lambda: None)
+
+    with pytest.raises(SystemExit):
+        ingest.main(['--batch-size', batch_size, str(path)])
+
+    assert 'argument --batch-size' in capsys.readouterr().err
+    assert MovieService.find_by_title('cli movie') is None
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import create_app, metrics
+from app.config import settings
+from app.db import create_bd
+
+
+@pytest.mark.usefixtures('test_movie')
+def test_metrics_of_requests(client, test_user):
+    client.get('/movies/', headers={'Authorization': f'Basic {test_user.base64}'})
+    client.get('/unknown')
+
+    res = client.get('/metrics')
+
+    assert res.status_code == 200
+    assert res.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert (
+        'kinoapp_request_duration_seconds_count{method="GET",route="/movies/"}'
+        in res.text
+    )
+    assert 'kinoapp_requests_total{method="GET",route="<unmatched>",status="404"}' in (
+        res.text
+    )
+    assert 'kinoapp_cache_hits_total{cache="movies"}' in res.text
+
+
+@pytest.mark.parametrize('async_mode', [False, True])
+def test_server_timing(monkeypatch, async_mode):
+    monkeypatch.setattr(settings, 'server_timing', True)
+    create_bd(mode='TESTING', async_mode=async_mode)
+    client = TestClient(create_app(async_mode=async_mode))
+
+    res = client.post('/users/', json={'name': 'timed', 'password': 'test'})
+
+    timing = dict(
+        metric.split(';', 1) for metric in res.headers['server-timing'].split(', ')
+    )
+    assert timing.keys() == {'db', 'hash', 'app'}
+    assert '"2 statements"' in timing['db']
+    assert float(timing['hash'].removeprefix('dur=')) > 0
+
+
+def test_server_timing_disabled(client):
+    res = client.get('/metrics')
+
+    assert 'server-timing' not in res.headers
+
+
+def test_histogram_render():
+    histogram = metrics.Histogram('latency', 'Latency', buckets=(1, 2))
+    for value in (0.5, 1, 3):
+        histogram.observe(('/a',), value)
+
+    assert histogram.render(('route',))[2:] == [
+        'latency_bucket{route="/a",le="1"} 2',
+        'latency_bucket{route="/a",le="2"} 2',
+        'latency_bucket{route="/a",le="+Inf"} 3',
+        'latency_sum{route="/a"} 4.5',
+        'latency_count{route="/a"} 3',
+    ]
@@ -0,0 +1,199 @@
+from datetime import date
+
+import pytest
+
+from app.api import schemas
+from app.api.exceptions import ResourceAlreadyExists
+from app.api.services import MovieService, ReviewService, movie_queries
+from app.api.services.movie_cache import listing_key
+from app.db import engine_tests, models, search
+from app.db.utils import create_session
+
+
+def test_movie_get_all(test_movie):
+    movies = MovieService.get_all(offset=0, limit=1)
+
+    assert len(movies) == 1
+    assert movies[0].title == test_movie.title
+
+
+@pytest.mark.usefixtures('test_movie')
+@pytest.mark.parametrize('year_offset, expected_len', [(0, 1), (2, 0), (-22, 0)])
+def test_movie_get_all_with_year_filter(year_offset, expected_len):
+    movies = MovieService.get_all(year=date.today().year + year_offset)
+
+    assert len(movies) == expected_len
+
+
+@pytest.mark.parametrize(
+    'date_from, date_to, expected',
+    [
+        (date(2000, 1, 1), None, ['b', 'c']),
+        (None, date(2000, 1, 1), ['a']),
+        (date(1999, 12, 31), date(2000, 12, 31), ['a', 'b']),
+    ],
+)
+def test_movie_get_all_with_date_range_filter(date_from, date_to, expected):
+    for title, realise_date in (
+        ('a', date(1999, 12, 31)),
+        ('b', date(2000, 1, 1)),
+        ('c', date(2000, 12, 31)),
+    ):
+        with create_session() as session:
+            session.add(models.Movie(title=title, realise_date=realise_date))
+
+    movies = MovieService.get_all(date_from=date_from, date_to=date_to)
+
+    assert [movie.title for movie in movies] == expected
+
+
+def test_movie_year_filter_uses_index(sql_statements):
+    MovieService.get_all(year=2000)
+
+    with engine_tests.connect() as connection:
+        plan = connection.exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {sql_statements[-1]}', ('2000-01-01', '2001-01-01')
+        ).all()
+
+    assert 'ix_movies_realise_date' in str(plan)
+
+
+@pytest.mark.usefixtures('test_movie')
+@pytest.mark.parametrize('substr, expected_len', [('test', 1), ('te', 1), ('wrong', 0)])
+def test_movie_get_all_with_substr_filter(substr, expected_len):
+    movies = MovieService.get_all(substr=substr)
+
+    assert len(movies) == expected_len
+
+
+@pytest.mark.usefixtures('test_movie')
+@pytest.mark.parametrize(
+    'page, page_size, expected_len', [(0, 1, 1), (1, 10, 0), (2, 2, 0)]
+)
+def test_movie_get_all_with_pagesize_page_filter(page, page_size, expected_len):
+    movies = MovieService.get_all(offset=page, limit=page_size)
+
+    assert len(movies) == expected_len
+
+
+@pytest.mark.parametrize('fts', [True, False])
+def test_movie_search_by_relevance(monkeypatch, fts):
+    monkeypatch.setattr(search, 'title_search_available', lambda _: fts)
+    for title in ('The Matrix Reloaded', 'Matrix', 'Spider-Man'):
+        MovieService.create(schemas.MovieCreate(title=title))
+
+    movies = MovieService.get_all(substr='matrix', relevance=True)
+
+    assert [movie.title for movie in movies] == ['Matrix', 'The Matrix Reloaded']
+
+
+def test_movie_search_index_follows_title_changes(test_movie):
+    with create_session() as session:
+        movie = session.query(models.Movie).filter(models.Movie.id == test_movie.id)
+        movie.one().title = 'renamed'
+
+    assert not MovieService.get_all(substr='test_movie')
+    assert len(MovieService.get_all(substr='renamed')) == 1
+
+
+def test_create_existing_movie(test_movie):
+    with pytest.raises(ResourceAlreadyExists):
+        MovieService.create(schemas.MovieCreate(title=test_movie.title))
+
+
+def test_find_movie_by_title(test_movie):
+    movie = MovieService.find_by_title(test_movie.title)
+
+    assert movie
+    assert movie.title == test_movie.title
+
+
+def test_find_movie_by_id(test_movie):
+    movie = MovieService.find_by_id(test_movie.id)
+
+    assert movie
+    assert movie.id == test_movie.id
+
+
+def test_get_top_movies(test_user, test_movie):
+    test_movie2 = MovieService.create(schemas.MovieCreate(title='test2'))
+
+    ReviewService.create(
+        schemas.ReviewCreate(rating=10, comment='ok'),
+        user_id=test_user.id,
+        movie_id=test_movie2.id,
+    )
+
+    movies = MovieService.get_all(top=2)
+
+    assert movies
+    assert len(movies) == 2
+    assert movies[0].title == test_movie2.title
+    assert movies[1].title == test_movie.title
+
+
+@pytest.mark.parametrize('limit, expected', [(1, 1), (2, 2), (3, 3)])
+def test_get_all_movies_limit(limit, expected):
+    MovieService.create(schemas.MovieCreate(title='test_1'))
+    MovieService.create(schemas.MovieCreate(title='test_2'))
+    MovieService.create(schemas.MovieCreate(title='test_3'))
+
+    movies = MovieService.get_all(limit=limit)
+
+    assert len(movies) == expected
+
+
+def test_movie_queries_are_cached(test_movie, sql_statements):
+    for _ in range(2):
+        assert MovieService.get_all(top=10)[0].title == test_movie.title
+        movie = MovieService.find_by_id(test_movie.id)
+        assert movie is not None
+        assert movie.title == test_movie.title
+
+    # cached results cost the lookups of the version of the catalog only
+    assert len(sql_statements) == 6
+    assert sum('FROM versions' in statement for statement in sql_statements) == 4
+    assert movie_queries.stats['hits'] == 2
+
+
+def test_review_invalidates_cached_movie_queries(test_user, test_movie):
+    other = MovieService.create(schemas.MovieCreate(title='other'))
+    MovieService.get_all(substr='other')
+    MovieService.get_all(year=date.today().year)
+    MovieService.get_all(top=1)
+    MovieService.find_by_id(test_movie.id)
+
+    ReviewService.create(
+        schemas.ReviewCreate(rating=7, comment='ok'),
+        movie_id=test_movie.id,
+        user_id=test_user.id,
+    )
+
+    # only the listing without the reviewed movie and out of a top is kept
+    assert movie_queries.stats['size'] == 1
+    assert MovieService.get_all(substr='other')[0].id == other.id
+    assert MovieService.get_all(top=1)[0].ratings_avg == 7.0
+    movie = MovieService.find_by_id(test_movie.id)
+    assert movie is not None
+    assert movie.ratings_count == 1
+
+
+def test_created_movie_invalidates_cached_listings(test_movie):
+    MovieService.get_all(substr='test')
+    MovieService.find_by_id(test_movie.id)
+
+    MovieService.create(schemas.MovieCreate(title='test2'))
+
+    assert len(MovieService.get_all(substr='test')) == 2
+    assert movie_queries.stats['size'] == 2
+
+
+def test_listing_key_normalises_filters():
+    assert listing_key(1, top=None, substr='', relevance=True, limit=10) == listing_key(
+        1, limit=10
+    )
+    assert listing_key(1, top=5, substr='a', relevance=True) == listing_key(
+        1, top=5, substr='a'
+    )
+    assert listing_key(1, limit=0) != listing_key(1)
+    assert listing_key(1) != listing_key(2)
@@ -0,0 +1,54 @@
+import pytest
+
+from app.api.exceptions import InvalidCursor
+from app.api.pagination import (
+    ORDER_BY_ID,
+    ORDER_BY_TOP,
+    decode_cursor,
+    encode_cursor,
+    top_left,
+)
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor(ORDER_BY_TOP, 7.5, 42, 3)
+
+    assert decode_cursor(cursor, ORDER_BY_TOP) == [7.5, 42, 3]
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not a cursor',
+        encode_cursor(ORDER_BY_TOP, 7.5, 42),
+        encode_cursor('id'),
+        encode_cursor('id', 'x'),
+        encode_cursor('id', None),
+        encode_cursor('id', True),
+        encode_cursor('id', 4.2),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, ORDER_BY_ID)
+
+
+@pytest.mark.parametrize(
+    'values', [('x', 42, 0), (7.5, '42', 0), ([], 42, 0), (7.5, 42), (7.5, 42, 0.5)]
+)
+def test_invalid_top_cursor(values):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(ORDER_BY_TOP, *values), ORDER_BY_TOP)
+
+
+@pytest.mark.parametrize(
+    'offset, after, left',
+    [
+        (None, None, 10),
+        (3, None, 7),
+        (None, encode_cursor(ORDER_BY_TOP, 7.5, 42, 5), 5),
+        (None, encode_cursor(ORDER_BY_TOP, 7.5, 42, 12), 0),
+    ],
+)
+def test_top_left(offset, after, left):
+    assert top_left(10, offset, after) == left
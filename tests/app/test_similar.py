@@ -0,0 +1,194 @@
+import asyncio
+import subprocess
+import sys
+from typing import Optional
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from scipy import sparse
+
+from app.api import create_app, schemas
+from app.api.exceptions import ResourceNotFound
+from app.api.services import (
+    MovieService,
+    ReviewBatchService,
+    ReviewService,
+    SimilarMovieService,
+    similar_index,
+    similar_movies,
+)
+from app.api.services.similar_index import build_index, similarities
+from app.db import create_bd
+
+
+@pytest.fixture(name='catalog')
+def create_catalog(users):
+    """
+    Movies a and b are rated alike by the same users, c by one of them only
+    """
+
+    movies = {
+        title: MovieService.create(schemas.MovieCreate(title=title))
+        for title in ('a', 'b', 'c', 'd')
+    }
+    reviews: list[dict[str, int]] = [{'a': 9, 'b': 8, 'c': 1}, {'a': 7, 'b': 7}]
+    for user, ratings in zip(users, reviews):
+        for title, rating in ratings.items():
+            ReviewService.create(
+                schemas.ReviewCreate(rating=rating, comment='ok'),
+                movie_id=movies[title].id,
+                user_id=user.id,
+            )
+
+    return movies, users
+
+
+def test_similarities_are_cosine():
+    dense = np.array([[1.0, 2.0, 0.0], [3.0, 0.0, 4.0], [0.0, 5.0, 6.0]])
+    matrix = sparse.csc_matrix(dense)
+    norms = (dense**2).sum(axis=0)
+
+    scores = similarities(matrix, norms, [0, 2])
+
+    cosine = dense.T @ dense / np.sqrt(np.outer(norms, norms))
+    np.fill_diagonal(cosine, 0)
+    assert sparse.issparse(scores)
+    assert np.allclose(scores.toarray(), cosine[[0, 2]])
+    # movies without common users and the movie itself are not stored
+    assert scores.nnz == np.count_nonzero(cosine[[0, 2]])
+
+
+def test_get_similar_movies(catalog):
+    movies, _ = catalog
+
+    similar = SimilarMovieService.get_similar(movies['a'].id)
+
+    assert [movie.title for movie in similar] == ['b', 'c']
+    assert similar[0].similarity > similar[1].similarity
+    assert SimilarMovieService.get_similar(movies['d'].id) == []
+    with pytest.raises(ResourceNotFound):
+        SimilarMovieService.get_similar(42)
+
+
+def test_new_reviews_are_folded_in(catalog):
+    movies, users = catalog
+    SimilarMovieService.get_similar(movies['a'].id)
+
+    ReviewBatchService.create_many(
+        [
+            schemas.ReviewBatchItem(movie_id=movies['d'].id, rating=9, comment='ok'),
+            schemas.ReviewBatchItem(movie_id=movies['c'].id, rating=9, comment='ok'),
+        ],
+        user_id=users[1].id,
+    )
+    assert not similar_movies.stale
+
+    folded = SimilarMovieService.get_similar(movies['a'].id)
+    rebuilt = build_index(
+        [
+            [
+                (user.id, movies[title].id, rating)
+                for user, ratings in zip(
+                    users,
+                    [{'a': 9, 'b': 8, 'c': 1}, {'a': 7, 'b': 7, 'c': 9, 'd': 9}],
+                )
+                for title, rating in ratings.items()
+            ]
+        ],
+        top_k=10,
+    )
+
+    assert [(movie.id, movie.similarity) for movie in folded] == pytest.approx(
+        rebuilt.neighbours[movies['a'].id]
+    )
+    assert 'd' in [movie.title for movie in folded]
+
+
+def test_many_new_reviews_rebuild_index(catalog, monkeypatch):
+    movies, users = catalog
+    SimilarMovieService.get_similar(movies['a'].id)
+
+    def fail(*_):
+        raise AssertionError('folded in')
+
+    monkeypatch.setattr(similar_index, 'fold_in', fail)
+    monkeypatch.setattr(similar_movies.pending, 'limit', 1)
+    ReviewBatchService.create_many(
+        [
+            schemas.ReviewBatchItem(movie_id=movies['d'].id, rating=9, comment='ok'),
+            schemas.ReviewBatchItem(movie_id=movies['c'].id, rating=9, comment='ok'),
+        ],
+        user_id=users[1].id,
+    )
+
+    similar = SimilarMovieService.get_similar(movies['a'].id)
+
+    assert [movie.title for movie in similar] == ['b', 'c', 'd']
+    assert not similar_movies.pending
+
+
+def test_app_does_not_import_numpy():
+    code = "import sys, app.api; print('numpy' in sys.modules, 'scipy' in sys.modules)"
+
+    out = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, check=True, text=True
+    ).stdout
+
+    assert out.split() == ['False', 'False']
+
+
+def test_similar_movies_endpoint(client, test_user, catalog):
+    movies, _ = catalog
+    auth = {'Authorization': f'Basic {test_user.base64}'}
+
+    res = client.get(f'/movies/{movies["a"].id}/similar?limit=1', headers=auth)
+
+    assert res.status_code == 200
+    assert [movie['title'] for movie in res.json()] == ['b']
+    assert client.get('/movies/42/similar', headers=auth).status_code == 404
+
+
+def test_async_similar_movies_match_sync_app(test_user, catalog):
+    movies, _ = catalog
+    auth = {'Authorization': f'Basic {test_user.base64}'}
+    sync_client = TestClient(create_app(async_mode=False))
+    create_bd(mode='TESTING', async_mode=True)
+    async_client = TestClient(create_app(async_mode=True))
+
+    for movie in movies.values():
+        url = f'/movies/{movie.id}/similar?limit=2'
+        res = async_client.get(url, headers=auth)
+
+        assert res.status_code == 200
+        assert res.json() == sync_client.get(url, headers=auth).json()
+
+    res = async_client.get(f'/movies/{movies["a"].id}/similar', headers=auth)
+    assert [movie['title'] for movie in res.json()] == ['b', 'c']
+    assert res.json()[0]['similarity'] > res.json()[1]['similarity'] > 0
+    assert async_client.get('/movies/42/similar', headers=auth).status_code == 404
+
+
+def test_async_similar_movies_run_in_worker_thread(test_user, catalog, monkeypatch):
+    movies, _ = catalog
+    loops: list[Optional[asyncio.AbstractEventLoop]] = []
+    get_similar = SimilarMovieService.get_similar
+
+    def record_loop(*args, **kwargs):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+
+        return get_similar(*args, **kwargs)
+
+    monkeypatch.setattr(SimilarMovieService, 'get_similar', record_loop)
+    create_bd(mode='TESTING', async_mode=True)
+    res = TestClient(create_app(async_mode=True)).get(
+        f'/movies/{movies["a"].id}/similar',
+        headers={'Authorization': f'Basic {test_user.base64}'},
+    )
+
+    assert res.status_code == 200
+    # the event loop is not blocked by the computation of the index
+    assert loops == [None]
@@ -0,0 +1,75 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import create_app, schemas
+from app.api.services import MovieService, ReviewService, UserService
+from app.db import create_bd
+
+
+def test_fetch_movies_as_ndjson(client, test_user):
+    for title in ('first', 'second', 'third'):
+        MovieService.create(schemas.MovieCreate(title=title))
+
+    res = client.get(
+        '/movies/?limit=2',
+        headers={
+            'Authorization': f'Basic {test_user.base64}',
+            'Accept': 'application/x-ndjson, application/json;q=0.5',
+        },
+    )
+
+    assert res.status_code == 200
+    assert res.headers['content-type'] == 'application/x-ndjson'
+    lines = res.text.splitlines()
+    assert [json.loads(line)['title'] for line in lines] == ['first', 'second']
+
+
+def test_fetch_movie_reviews_as_ndjson(client, test_user, test_review):
+    res = client.get(
+        f'/movies/{test_review.movie_id}/reviews',
+        headers={
+            'Authorization': f'Basic {test_user.base64}',
+            'Accept': 'application/x-ndjson',
+        },
+    )
+
+    assert res.status_code == 200
+    assert [json.loads(line) for line in res.text.splitlines()] == [
+        schemas.Review.from_orm(test_review).dict()
+    ]
+
+
+@pytest.mark.parametrize('url', ['/movies/?limit=2', '/movies/1/reviews?limit=2'])
+def test_async_ndjson_lines_match_listing(test_user, url):
+    for title in ('first', 'second', 'third'):
+        MovieService.create(schemas.MovieCreate(title=title))
+        user = UserService.create(schemas.UserCreate(name=title, password='x'))
+        ReviewService.create(
+            schemas.ReviewCreate(rating=5, comment=title), movie_id=1, user_id=user.id
+        )
+    create_bd(mode='TESTING', async_mode=True)
+    client = TestClient(create_app(async_mode=True))
+    auth = {'Authorization': f'Basic {test_user.base64}'}
+
+    listing = client.get(url, headers=auth)
+    res = client.get(url, headers={**auth, 'Accept': 'application/x-ndjson'})
+
+    assert res.status_code == 200
+    assert res.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in res.text.splitlines()] == listing.json()
+    assert len(listing.json()) == 2
+
+    res = client.get(
+        url,
+        headers={
+            **auth,
+            'Accept': 'application/x-ndjson',
+            'If-None-Match': res.headers['ETag'],
+        },
+    )
+
+    assert res.status_code == HTTPStatus.NOT_MODIFIED
+    assert not res.content
@@ -0,0 +1,91 @@
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+from pydantic import SecretStr
+
+from app import api
+from app.api import create_app, schemas
+from app.api.exceptions import InvalidToken
+from app.api.services import SecurityService, TokenService, UserService
+from app.config import settings
+
+
+def test_token_round_trip():
+    user = schemas.User(id=7, name='test')
+
+    token = TokenService.create(user)
+
+    assert token.token_type == 'bearer'
+    assert TokenService.verify(token.access_token) == user
+
+
+@pytest.mark.parametrize(
+    'token',
+    [
+        'garbage',
+        'abc.\xe9',
+        '\xe9.\xe9',
+        TokenService.create(schemas.User(id=1, name='test'), ttl=-1).access_token,
+        TokenService.create(schemas.User(id=1, name='test')).access_token + 'x',
+        # the payload of another user under the signature of the first one
+        TokenService.create(schemas.User(id=2, name='admin')).access_token.split('.')[0]
+        + '.'
+        + TokenService.create(schemas.User(id=1, name='test')).access_token.split('.')[
+            1
+        ],
+    ],
+)
+def test_invalid_tokens(token):
+    with pytest.raises(InvalidToken):
+        TokenService.verify(token)
+
+
+def test_token_endpoint(client, test_user, monkeypatch):
+    res = client.post(
+        '/users/token', headers={'Authorization': f'Basic {test_user.base64}'}
+    )
+    assert res.status_code == 200
+    token = res.json()['access_token']
+
+    def fail(*_, **__):
+        raise AssertionError('token was checked against the database')
+
+    monkeypatch.setattr(UserService, 'find_by_name', fail)
+    monkeypatch.setattr(SecurityService, 'hash_password', fail)
+    res = client.get('/users', headers={'Authorization': f'Bearer {token}'})
+
+    assert res.status_code == 200
+    assert res.json()[0]['name'] == test_user.name
+
+
+def test_token_endpoint_invalid_credentials(client, test_user):
+    res = client.post(
+        '/users/token',
+        headers={'Authorization': f'Basic {test_user.base64_invalid_password[0]}'},
+    )
+
+    assert res.status_code == 401
+
+
+@pytest.mark.parametrize('token', ['invalid', 'abc.\xe9'])
+def test_invalid_bearer_token(client, token):
+    res = client.get('/users', headers={'Authorization': f'Bearer {token}'})
+
+    assert res.status_code == 401
+    assert res.headers['WWW-Authenticate'] == 'Bearer'
+
+
+@pytest.mark.parametrize('secret, warnings', [(None, 1), (SecretStr('shared'), 0)])
+def test_missing_secret_is_logged_at_startup(monkeypatch, secret, warnings):
+    messages: list[str] = []
+    monkeypatch.setattr(api, 'create_bd', lambda **_: None)
+    monkeypatch.setattr(settings, 'token_secret', secret)
+    handler = logger.add(messages.append, level='WARNING')
+
+    try:
+        with TestClient(create_app(async_mode=False)):
+            pass
+    finally:
+        logger.remove(handler)
+
+    assert len([m for m in messages if 'KINOAPP_TOKEN_SECRET' in m]) == warnings
@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.api import schemas
+from app.api.exceptions import ResourceAlreadyExists, ResourceNotFound
+from app.api.services import MovieService, RatingService, review_writer
+from app.api.services.writer import ReviewWriter, add_reviews
+
+
+@pytest.fixture(name='writer')
+def create_writer():
+    writer = ReviewWriter(max_batch=50, max_delay=0.05, timeout=5)
+    writer.start()
+
+    yield writer
+
+    writer.stop()
+
+
+def test_concurrent_reviews_committed_in_batches(writer, test_movie, users):
+    def review(i):
+        return writer.create(
+            schemas.ReviewCreate(rating=i % 11, comment='ok'),
+            movie_id=test_movie.id,
+            user_id=users[i].id,
+        )
+
+    with ThreadPoolExecutor(max_workers=len(users)) as executor:
+        reviews = list(executor.map(review, range(len(users))))
+
+    assert [r.user_id if r else None for r in reviews] == [user.id for user in users]
+    assert writer.batches < len(users)
+
+    movie = MovieService.find_by_id(test_movie.id)
+    assert movie is not None
+    assert movie.ratings_count == len(users)
+    assert movie.ratings_sum == sum(i % 11 for i in range(len(users)))
+    assert RatingService.get_histogram(test_movie.id).total == len(users)
+
+
+def test_writer_rejects_duplicates_and_missing_movies(writer, test_review):
+    review = schemas.ReviewCreate(rating=7, comment='ok')
+    other = MovieService.create(schemas.MovieCreate(title='other'))
+
+    futures = [
+        writer.submit(review, movie_id=other.id, user_id=test_review.user_id),
+        writer.submit(review, movie_id=other.id, user_id=test_review.user_id),
+        writer.submit(
+            review, movie_id=test_review.movie_id, user_id=test_review.user_id
+        ),
+        writer.submit(review, movie_id=42, user_id=test_review.user_id),
+    ]
+    writer.stop()
+
+    assert futures[0].result().rating == 7
+    assert isinstance(futures[1].exception(), ResourceAlreadyExists)
+    assert isinstance(futures[2].exception(), ResourceAlreadyExists)
+    assert isinstance(futures[3].exception(), ResourceNotFound)
+    assert writer.batches == 1
+    with pytest.raises(RuntimeError):
+        writer.submit(review, movie_id=other.id, user_id=test_review.user_id)
+
+
+def test_create_movie_review_with_group_commit(client, test_movie, test_user):
+    review_writer.start()
+    try:
+        res = [
+            client.post(
+                f'/movies/{test_movie.id}/reviews',
+                json={'rating': 3, 'comment': 'ok'},
+                headers={'Authorization': f'Basic {test_user.base64}'},
+            )
+            for _ in range(2)
+        ]
+    finally:
+        review_writer.stop()
+
+    assert res[0].status_code == 200
+    assert res[0].json()['rating'] == 3
+    assert res[1].status_code == 409
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_dead_writer_falls_back_to_direct_commit(
+    client, test_movie, test_user, monkeypatch
+):
+    def die(_batch):
+        # ends the thread without resolving the futures of the batch
+        raise SystemExit
+
+    monkeypatch.setattr(review_writer, 'commit', die)
+    monkeypatch.setattr(review_writer, 'timeout', 0.1)
+    review_writer.start()
+    try:
+        res = [
+            client.post(
+                f'/movies/{test_movie.id}/reviews',
+                json={'rating': 3, 'comment': 'ok'},
+                headers={'Authorization': f'Basic {test_user.base64}'},
+            )
+            for _ in range(2)
+        ]
+        assert not review_writer.running
+
+        # the dead thread is replaced
+        monkeypatch.undo()
+        review_writer.start()
+        assert review_writer.running
+    finally:
+        review_writer.stop()
+
+    assert [r.status_code for r in res] == [200, 409]
+    movie = MovieService.find_by_id(test_movie.id)
+    assert movie is not None
+    assert movie.ratings_count == 1
+
+
+def test_stalled_writer_returns_committed_review_and_recovers(
+    client, test_movie, test_user, monkeypatch
+):
+    def add_late(session, batch):
+        # the batch is committed, but resolved after the request gave up waiting
+        results = add_reviews(session, batch)
+        session.commit()
+        time.sleep(0.5)
+        return results
+
+    monkeypatch.setattr('app.api.services.writer.add_reviews', add_late)
+    monkeypatch.setattr(review_writer, 'timeout', 0.1)
+    review_writer.start()
+    try:
+        res = client.post(
+            f'/movies/{test_movie.id}/reviews',
+            json={'rating': 3, 'comment': 'ok'},
+            headers={'Authorization': f'Basic {test_user.base64}'},
+        )
+        assert not review_writer.running
+
+        deadline = time.monotonic() + 5
+        while not review_writer.running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert review_writer.running
+    finally:
+        review_writer.stop()
+
+    assert res.status_code == 200
+    assert res.json()['rating'] == 3
+    movie = MovieService.find_by_id(test_movie.id)
+    assert movie is not None
+    assert movie.ratings_count == 1